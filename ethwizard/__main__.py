@@ -1,4 +1,8 @@
+import multiprocessing
+
 from ethwizard import wizard
 
 if __name__ == "__main__":
+    # Keystore verification uses a process pool which needs this in frozen builds
+    multiprocessing.freeze_support()
     wizard.run()
\ No newline at end of file
@@ -32,6 +32,7 @@ MIN_UP_MBS = 4.5
 MIN_AVAILABLE_RAM_GB = 12.0
 
 BN_MIN_FEW_PEERS = 10.0
+BN_SYNCED_MAX_DISTANCE = 1
 EXE_MIN_FEW_PEERS = 10.0
 
 PGP_KEY_SERVERS = [
@@ -46,6 +47,22 @@ PGP_KEY_SERVERS = [
 
 LINUX_SAVE_DIRECTORY = '/var/lib/ethwizard'
 STATE_FILE = 'wizardstate.json'
+SYNC_PROGRESS_FILE = 'syncprogress-{name}.json'
+SYNC_PROGRESS_MAX_AGE = 6 * 60 * 60
+HEALTH_HISTORY_FILE = 'healthhistory.sqlite'
+HEALTH_HISTORY_RECORD_INTERVAL = 60.0
+HEALTH_HISTORY_RAW_RETENTION = 2 * 24 * 60 * 60
+HEALTH_HISTORY_HOURLY_RETENTION = 90 * 24 * 60 * 60
+
+HEALTH_SERIES_EXECUTION_PEERS = 'execution.peers'
+HEALTH_SERIES_EXECUTION_SYNC_DISTANCE = 'execution.sync_distance'
+HEALTH_SERIES_EXECUTION_DB_SIZE = 'execution.db_size'
+HEALTH_SERIES_EXECUTION_VERSION = 'execution.version'
+HEALTH_SERIES_CONSENSUS_PEERS = 'consensus.peers'
+HEALTH_SERIES_CONSENSUS_SYNC_DISTANCE = 'consensus.sync_distance'
+HEALTH_SERIES_CONSENSUS_DB_SIZE = 'consensus.db_size'
+HEALTH_SERIES_CONSENSUS_VERSION = 'consensus.version'
+HEALTH_SERIES_DISK_FREE = 'disk.free'
 
 CTX_SELECTED_DIRECTORY = 'selected_directory'
 CTX_SELECTED_EXECUTION_CLIENT = 'selected_execution_client'
@@ -97,6 +114,35 @@ MAINTENANCE_RESTART_SERVICE = 'restart_service'
 MAINTENANCE_UPGRADE_CLIENT = 'upgrade_client'
 MAINTENANCE_CHECK_AGAIN_SOON = 'check_again_soon'
 MAINTENANCE_REINSTALL_CLIENT = 'reinstall_client'
+MAINTENANCE_ROLLBACK_CLIENT = 'rollback_client'
+
+MAINTENANCE_TASKS_DESCRIPTION = {
+    MAINTENANCE_DO_NOTHING: 'Nothing to perform here. Everything is good.',
+    MAINTENANCE_RESTART_SERVICE: 'Service needs to be restarted.',
+    MAINTENANCE_UPGRADE_CLIENT: 'Client needs to be upgraded.',
+    MAINTENANCE_CHECK_AGAIN_SOON: 'Check again. Client update should be available soon.',
+    MAINTENANCE_START_SERVICE: 'Service needs to be started.',
+    MAINTENANCE_REINSTALL_CLIENT: 'Client needs to be reinstalled.',
+    MAINTENANCE_ROLLBACK_CLIENT: 'Client will be rolled back to a previous version.',
+}
+
+MAINTENANCE_SNAPSHOT_FILE = 'maintenancestatus.json'
+MAINTENANCE_SNAPSHOT_MAX_AGE = 20 * 60
+
+MONITOR_SYSTEMD_SERVICE_NAME = 'ethwizard-monitor.service'
+MONITOR_SYSTEMD_TIMER_NAME = 'ethwizard-monitor.timer'
+
+SYSTEMD_UNIT_SUFFIXES = ('.service', '.socket', '.device', '.mount', '.automount', '.swap',
+    '.target', '.path', '.timer', '.slice', '.scope')
+DBUS_SYSTEM_BUS_SOCKET = '/run/dbus/system_bus_socket'
+DBUS_TIMEOUT = 5.0
+MONITOR_PREFERENCE_FILE = 'monitor.json'
+
+PROBE_TIMEOUT = 30.0
+APT_PROBE_TIMEOUT = 180.0
+APT_UPDATE_TIMEOUT = APT_PROBE_TIMEOUT - 30.0
+PROCESS_KILL_TIMEOUT = 5.0
+CLIENT_DETAILS_TIMEOUT = APT_PROBE_TIMEOUT + 30.0
 
 UNKNOWN_VALUE = 'Unknown'
 
@@ -123,6 +169,54 @@ BN_VERSION_EP = '/eth/v1/node/version'
 BN_PEERS_EP = '/eth/v1/node/peers'
 BN_PEER_COUNT_EP = '/eth/v1/node/peer_count'
 BN_SYNCING_EP = '/eth/v1/node/syncing'
+BN_GENESIS_EP = '/eth/v1/beacon/genesis'
+BN_EVENTS_EP = '/eth/v1/events'
+BN_VALIDATORS_EP = '/eth/v1/beacon/states/head/validators'
+BN_PROPOSER_DUTIES_EP = '/eth/v1/validator/duties/proposer/{epoch}'
+BN_ATTESTER_DUTIES_EP = '/eth/v1/validator/duties/attester/{epoch}'
+BN_SYNC_DUTIES_EP = '/eth/v1/validator/duties/sync/{epoch}'
+BN_VALIDATORS_BATCH_SIZE = 50
+
+SECONDS_PER_SLOT = 12
+SLOTS_PER_EPOCH = 32
+
+GETH_METRICS_URL = 'http://127.0.0.1:6060/debug/metrics/prometheus'
+LIGHTHOUSE_BN_METRICS_URL = 'http://127.0.0.1:5054/metrics'
+LIGHTHOUSE_VC_METRICS_URL = 'http://127.0.0.1:5064/metrics'
+TEKU_METRICS_URL = 'http://127.0.0.1:8008/metrics'
+
+METRIC_KIND_COUNT = 'count'
+METRIC_KIND_BYTES = 'bytes'
+METRIC_KIND_PERCENT = 'percent'
+METRIC_KIND_CPU_SECONDS = 'cpu_seconds'
+
+# Key series we surface from each client metrics endpoint: key -> (metric name, kind)
+GETH_METRICS_SERIES = {
+    'peers': ('p2p_peers', METRIC_KIND_COUNT),
+    'head': ('chain_head_block', METRIC_KIND_COUNT),
+    'db_size': ('eth_db_chaindata_disk_size', METRIC_KIND_BYTES),
+    'cpu': ('system_cpu_procload', METRIC_KIND_PERCENT),
+    'memory': ('system_memory_used', METRIC_KIND_BYTES)
+}
+LIGHTHOUSE_BN_METRICS_SERIES = {
+    'peers': ('libp2p_peers', METRIC_KIND_COUNT),
+    'head': ('beacon_head_state_slot', METRIC_KIND_COUNT),
+    'db_size': ('store_disk_db_size', METRIC_KIND_BYTES),
+    'cpu': ('process_cpu_seconds_total', METRIC_KIND_CPU_SECONDS),
+    'memory': ('process_resident_memory_bytes', METRIC_KIND_BYTES),
+    'attestation_hits': ('validator_monitor_prev_epoch_on_chain_attester_hit', METRIC_KIND_COUNT),
+    'attestation_misses': ('validator_monitor_prev_epoch_on_chain_attester_miss', METRIC_KIND_COUNT)
+}
+LIGHTHOUSE_VC_METRICS_SERIES = {
+    'cpu': ('process_cpu_seconds_total', METRIC_KIND_CPU_SECONDS),
+    'memory': ('process_resident_memory_bytes', METRIC_KIND_BYTES)
+}
+TEKU_METRICS_SERIES = {
+    'peers': ('beacon_peer_count', METRIC_KIND_COUNT),
+    'head': ('beacon_head_slot', METRIC_KIND_COUNT),
+    'cpu': ('process_cpu_seconds_total', METRIC_KIND_CPU_SECONDS),
+    'memory': ('process_resident_memory_bytes', METRIC_KIND_BYTES)
+}
 
 BN_CHAIN_IDS = {
     NETWORK_MAINNET: 1,
@@ -134,6 +228,15 @@ BN_DEPOSIT_CONTRACTS = {
     NETWORK_PRATER: '0xff50ed3d0ec03ac01d4c79aad74928bff48a7b2b'
 }
 
+GENESIS_FORK_VERSIONS = {
+    NETWORK_MAINNET: '00000000',
+    NETWORK_PRATER: '00001020'
+}
+
+DEPOSIT_AMOUNT_GWEI = 32000000000
+DOMAIN_DEPOSIT = '03000000'
+DEPOSIT_SIGNATURE_POOL_MIN_COUNT = 8
+
 NETWORK_CURRENCY = {
     NETWORK_MAINNET: 'ETH',
     NETWORK_PRATER: 'GöETH',
@@ -151,6 +254,14 @@ ETH1_NETWORK_CHAINID = {
 
 BEACONCHA_VALIDATOR_DEPOSITS_API_URL = '/api/v1/validator/{indexOrPubkey}/deposits'
 BEACONCHA_VALIDATOR_QUEUE_API_URL = '/api/v1/validators/queue'
+BEACONCHA_IN_MAX_VALIDATORS_PER_REQUEST = 100
+BEACONCHA_IN_MAX_CONCURRENCY = 2
+BEACONCHA_IN_RETRY_COUNT = 5
+BEACONCHA_IN_RETRY_DELAY = 5.0
+BEACONCHA_IN_MAX_RETRY_DELAY = 60.0
+
+KEYSTORE_VERIFICATION_MEMORY_RATIO = 0.5
+KEYSTORE_VERIFICATION_MAX_WORKERS = 16
 
 ETHEREUM_APT_SOURCE_URL = 'http://ppa.launchpad.net/ethereum/ethereum/ubuntu'
 
@@ -172,16 +283,30 @@ GETH_BUILDS_BASE_URL = 'https://gethstore.blob.core.windows.net/builds/'
 
 GETH_WINDOWS_PGP_KEY_ID = '9417309ED2A67EAC'
 GETH_ARGUMENTS = {
-    NETWORK_MAINNET: ['--syncmode=snap', '--http', '--metrics', '--metrics.expensive', '--pprof'],
-    NETWORK_PRATER: ['--goerli', '--syncmode=snap', '--http', '--metrics', '--metrics.expensive', '--pprof']
+    NETWORK_MAINNET: ['--syncmode=snap', '--http', '--ws', '--metrics', '--metrics.expensive', '--pprof'],
+    NETWORK_PRATER: ['--goerli', '--syncmode=snap', '--http', '--ws', '--metrics', '--metrics.expensive', '--pprof']
 }
 
 GETH_SYSTEMD_SERVICE_NAME = 'geth.service'
+GETH_APT_PACKAGE = 'geth'
+
+APT_SOURCES_PARTS_DIRECTORY = '/etc/apt/sources.list.d'
+APT_LISTS_DIRECTORY = '/var/lib/apt/lists'
+ETHEREUM_PPA_SOURCE_GLOB = 'ethereum-ubuntu-ethereum-*'
+ETHEREUM_PPA_LISTS_GLOB = '*_ethereum_ethereum_ubuntu_dists_*'
+APT_LISTS_STAMP_FILE = 'aptlists-{name}.stamp'
+ETHEREUM_PPA_LISTS_STAMP_NAME = 'ethereum-ppa'
+APT_LISTS_MAX_AGE = 6 * 60 * 60
 
 LIGHTHOUSE_BN_SYSTEMD_SERVICE_NAME = 'lighthousebeacon.service'
 LIGHTHOUSE_VC_SYSTEMD_SERVICE_NAME = 'lighthousevalidator.service'
 LIGHTHOUSE_INSTALLED_DIRECTORY = '/usr/local/bin'
 LIGHTHOUSE_INSTALLED_PATH = f'{LIGHTHOUSE_INSTALLED_DIRECTORY}/lighthouse'
+LIGHTHOUSE_VERSIONS_DIRECTORY = '/usr/local/lib/ethwizard/lighthouse'
+SERVICE_RESTART_TIMEOUT = 120.0
+
+VERSION_STORE_KEEP = 3
+VERSION_STORE_STAGING_PREFIX = '.staging-'
 
 WINDOWS_SERVICE_RUNNING = 'SERVICE_RUNNING'
 WINDOWS_SERVICE_START_PENDING = 'SERVICE_START_PENDING'
@@ -41588,7 +41713,7 @@ Type=simple
 Restart=always
 RestartSec=5
 TimeoutStopSec=180
-ExecStart=geth --syncmode=snap --http --datadir /var/lib/goethereum --metrics --metrics.expensive --pprof{addparams}
+ExecStart=geth --syncmode=snap --http --ws --datadir /var/lib/goethereum --metrics --metrics.expensive --pprof{addparams}
 
 [Install]
 WantedBy=default.target
@@ -41607,7 +41732,7 @@ Type=simple
 Restart=always
 RestartSec=5
 TimeoutStopSec=180
-ExecStart=geth --goerli --syncmode=snap --http --datadir /var/lib/goethereum --metrics --metrics.expensive --pprof{addparams}
+ExecStart=geth --goerli --syncmode=snap --http --ws --datadir /var/lib/goethereum --metrics --metrics.expensive --pprof{addparams}
 
 [Install]
 WantedBy=default.target
@@ -41690,4 +41815,33 @@ ExecStart={LIGHTHOUSE_INSTALLED_PATH} vc --network prater --datadir /var/lib/lig
 [Install]
 WantedBy=multi-user.target
 ''')
-}
\ No newline at end of file
+}
+
+MONITOR_SERVICE_DEFINITION = (
+'''
+[Unit]
+Description=eth-wizard background maintenance monitor
+Wants=network-online.target
+After=network-online.target
+
+[Service]
+Type=oneshot
+WorkingDirectory={working_directory}
+ExecStart={command}
+'''
+)
+
+MONITOR_TIMER_DEFINITION = (
+'''
+[Unit]
+Description=Run the eth-wizard background maintenance monitor periodically
+
+[Timer]
+OnBootSec=5min
+OnUnitActiveSec=15min
+RandomizedDelaySec=1min
+
+[Install]
+WantedBy=timers.target
+'''
+)
@@ -173,4 +173,13 @@ def enter_maintenance(platform, context):
             enter_maintenance as windows10_enter_maintenance )
         return windows10_enter_maintenance(context)
     
-    return False
\ No newline at end of file
+    return False
+
+def run_monitor(platform, context):
+    if platform == PLATFORM_UBUNTU:
+        from ethwizard.platforms.ubuntu.maintain import run_monitor as ubuntu_run_monitor
+        return ubuntu_run_monitor(context)
+
+    # There is no background maintenance monitor for Windows 10 yet
+    
+    return False
@@ -6,13 +6,27 @@ import os
 import time
 import humanize
 import asyncio
+import threading
+import shutil
+import subprocess
+import tempfile
+import sqlite3
+import hashlib
+import importlib
+import unicodedata
 
 from rfc3986 import urlparse, builder as urlbuilder
 
 from datetime import timedelta
 
+from email.utils import parsedate_to_datetime
+
 from dataclasses import dataclass
 
+from collections import deque
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 from pathlib import Path
 
 from ethwizard.constants import *
@@ -23,12 +37,13 @@ from prompt_toolkit.formatted_text import HTML
 from prompt_toolkit.shortcuts import radiolist_dialog, button_dialog, input_dialog
 from prompt_toolkit.shortcuts.dialogs import _return_none, _create_app
 
-from typing import Optional, Callable, List
+from typing import Optional, Callable, List, Union
 
 from prompt_toolkit.application import Application
 from prompt_toolkit.application.current import get_app
 from prompt_toolkit.buffer import Buffer
 from prompt_toolkit.completion import Completer
+from prompt_toolkit.document import Document
 from prompt_toolkit.filters import FilterOrBool
 from prompt_toolkit.formatted_text import AnyFormattedText
 from prompt_toolkit.layout.containers import HSplit
@@ -812,6 +827,62 @@ def input_dialog_default(
 
     return _create_app(dialog, style)
 
+class LogRingBuffer():
+    # Fixed capacity line buffer used to keep the log pane of long running dialogs bounded.
+    # Lines evicted from the buffer can optionally be spilled to a file so nothing is lost.
+
+    def __init__(self, max_lines: int = 1000, spill_path: Optional[str] = None,
+        max_line_length: int = 4096):
+
+        self.max_lines = max_lines
+        self.max_line_length = max_line_length
+        self.spill_path = spill_path
+
+        self._lines = deque()
+        self._partial = ''
+        self._lock = threading.Lock()
+        self._spill_file = None
+
+        if spill_path is not None:
+            self._spill_file = open(spill_path, 'a', encoding='utf8')
+
+    def append(self, text: str) -> None:
+        with self._lock:
+            parts = (self._partial + text).split('\n')
+            self._partial = parts.pop()
+
+            # Force a split on very long lines without any line break
+            while len(self._partial) > self.max_line_length:
+                parts.append(self._partial[:self.max_line_length])
+                self._partial = self._partial[self.max_line_length:]
+
+            evicted = []
+            for line in parts:
+                self._lines.append(line)
+                if len(self._lines) > self.max_lines:
+                    evicted.append(self._lines.popleft())
+
+            if self._spill_file is not None and len(evicted) > 0:
+                self._spill_file.write('\n'.join(evicted) + '\n')
+                self._spill_file.flush()
+
+    def get_text(self) -> str:
+        with self._lock:
+            if len(self._lines) == 0:
+                return self._partial
+            return '\n'.join(self._lines) + '\n' + self._partial
+
+    def close(self) -> None:
+        with self._lock:
+            if self._spill_file is not None:
+                remaining = list(self._lines)
+                if self._partial != '':
+                    remaining.append(self._partial)
+                if len(remaining) > 0:
+                    self._spill_file.write('\n'.join(remaining) + '\n')
+                self._spill_file.close()
+                self._spill_file = None
+
 def progress_log_dialog(
     title: AnyFormattedText = "",
     text: AnyFormattedText = "",
@@ -823,10 +894,18 @@ def progress_log_dialog(
         lambda *a: None
     ),
     style: Optional[BaseStyle] = None,
+    log_max_lines: int = 1000,
+    log_spill_path: Optional[str] = None,
+    max_fps: float = 10.0,
 ) -> Application[None]:
     """
     :param run_callback: A function that receives as input a `set_percentage`
         function and it does the work.
+    :param log_max_lines: Maximum number of lines kept in the log pane.
+    :param log_spill_path: Optional file where all the log lines are written
+        as they are evicted from the log pane.
+    :param max_fps: Maximum number of times per second the dialog is redrawn
+        when the callback updates it.
     """
     loop = get_event_loop()
 
@@ -869,17 +948,67 @@ def progress_log_dialog(
     app.result = None
     app.exited = False
 
-    def set_percentage(value: int) -> None:
-        progressbar.percentage = int(value)
+    log_buffer = LogRingBuffer(max_lines=log_max_lines, spill_path=log_spill_path)
+
+    # Updates from the callback are accumulated here and applied on the event
+    # loop at most max_fps times per second.
+    frame_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+    redraw_lock = threading.Lock()
+    redraw_state = {
+        'scheduled': False,
+        'last_frame': 0.0,
+        'percentage': None,
+        'status': None,
+        'log_changed': False
+    }
+
+    def flush_updates() -> None:
+        with redraw_lock:
+            percentage = redraw_state['percentage']
+            status_content = redraw_state['status']
+            log_changed = redraw_state['log_changed']
+
+            redraw_state['percentage'] = None
+            redraw_state['status'] = None
+            redraw_state['log_changed'] = False
+            redraw_state['scheduled'] = False
+            redraw_state['last_frame'] = loop.time()
+
+        if percentage is not None:
+            progressbar.percentage = percentage
+        if status_content is not None:
+            status.formatted_text_control.text = status_content
+        if log_changed:
+            log_content = log_buffer.get_text()
+            text_area.buffer.set_document(Document(log_content, len(log_content)),
+                bypass_readonly=True)
+
         app.invalidate()
 
+    def schedule_flush() -> None:
+        delay = redraw_state['last_frame'] + frame_interval - loop.time()
+        if delay > 0:
+            loop.call_later(delay, flush_updates)
+        else:
+            flush_updates()
+
+    def request_redraw(**updates) -> None:
+        with redraw_lock:
+            redraw_state.update(updates)
+            if redraw_state['scheduled']:
+                return
+            redraw_state['scheduled'] = True
+        loop.call_soon_threadsafe(schedule_flush)
+
+    def set_percentage(value: int) -> None:
+        request_redraw(percentage=int(value))
+
     def log_text(text: str) -> None:
-        loop.call_soon_threadsafe(text_area.buffer.insert_text, text)
-        app.invalidate()
+        log_buffer.append(text)
+        request_redraw(log_changed=True)
     
     def change_status(text: str) -> None:
-        status.formatted_text_control.text = text
-        app.invalidate()
+        request_redraw(status=text)
     
     def set_result(new_result: dict) -> None:
         app.result = new_result
@@ -894,6 +1023,7 @@ def progress_log_dialog(
         try:
             result = run_callback(set_percentage, log_text, change_status, set_result, get_exited)
         finally:
+            log_buffer.close()
             if not app.exited:
                 app.exited = True
                 app.exit(result=result)
@@ -908,7 +1038,7 @@ def progress_log_dialog(
 def search_for_generated_keys(validator_keys_path):
     # Search for keys generated with the eth2.0-deposit-cli binary
 
-    deposit_data_path = None
+    deposit_data_paths = []
     keystore_paths = []
     password_paths = []
 
@@ -922,82 +1052,791 @@ def search_for_generated_keys(validator_keys_path):
                     continue
 
                 if name.startswith('deposit_data'):
-                    deposit_data_path = entry.path
+                    deposit_data_paths.append(entry.path)
                 elif name.startswith('keystore') and name.endswith('.json'):
                     keystore_paths.append(entry.path)
                 elif name.startswith('keystore') and name.endswith('.txt'):
                     password_paths.append(entry.path)
-    
+
+    # Keep the most recent deposit data file as the main one when there are many
+    deposit_data_paths.sort(key=lambda path: os.stat(path).st_mtime)
+    deposit_data_path = deposit_data_paths[-1] if len(deposit_data_paths) > 0 else None
+
     return {
         'validator_keys_path': str(validator_keys_path),
         'deposit_data_path': deposit_data_path,
+        'deposit_data_paths': deposit_data_paths,
         'keystore_paths': keystore_paths,
         'password_paths': password_paths
     }
 
-def get_bc_validator_deposits(network, public_keys, log):
-    # Return the validator deposits from the beaconcha.in API
+def iter_deposit_data(deposit_data_path, chunk_size=65536):
+    # Yield the entries of a deposit data file one at a time without loading the whole file in
+    # memory
 
-    pubkey_arg = ','.join(public_keys)
-    bc_api_query_url = (BEACONCHA_IN_URLS[network] +
-        BEACONCHA_VALIDATOR_DEPOSITS_API_URL.format(indexOrPubkey=pubkey_arg))
-    headers = {'accept': 'application/json'}
+    decoder = json.JSONDecoder()
 
-    keep_retrying = True
+    with open(deposit_data_path, 'r', encoding='utf8') as deposit_data_file:
+        buffer = ''
+        eof = False
 
-    retry_index = 0
-    retry_count = 5
-    retry_delay = 30
+        while True:
+            buffer = buffer.lstrip(' \t\r\n[,')
 
-    while keep_retrying and retry_index < retry_count:
-        try:
-            response = httpx.get(bc_api_query_url, headers=headers, follow_redirects=True)
-        except httpx.RequestError as exception:
-            log.error(f'Exception {exception} when trying to get {bc_api_query_url}')
+            if buffer.startswith(']') or (buffer == '' and eof):
+                return
 
-            retry_index = retry_index + 1
-            log.info(f'We will retry in {retry_delay} seconds (retry index = {retry_index})')
-            time.sleep(retry_delay)
-            continue
+            try:
+                entry, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = deposit_data_file.read(chunk_size)
+                if chunk == '':
+                    eof = True
+                buffer = buffer + chunk
+                continue
 
-        if response.status_code != 200:
-            log.error(f'Error code {response.status_code} when trying to get {bc_api_query_url}')
-            
-            retry_index = retry_index + 1
-            log.info(f'We will retry in {retry_delay} seconds (retry index = {retry_index})')
-            time.sleep(retry_delay)
-            continue
-        
-        response_json = response.json()
+            yield entry
+            buffer = buffer[end:]
 
-        if (
-            'status' not in response_json or
-            response_json['status'] != 'OK' or
-            'data' not in response_json
-            ):
-            log.error(f'Unexpected response data or structure from {bc_api_query_url}: '
-                f'{response_json}')
-            
-            retry_index = retry_index + 1
-            log.info(f'We will retry in {retry_delay} seconds (retry index = {retry_index})')
-            time.sleep(retry_delay)
+def read_keystore_public_key(keystore_path):
+    # Return the lowercase 0x prefixed public key of a keystore file
+
+    with open(keystore_path, 'r', encoding='utf8') as keystore_file:
+        keystore = json.load(keystore_file)
+
+    public_key = keystore['pubkey'].lower()
+    if not public_key.startswith('0x'):
+        public_key = '0x' + public_key
+    return public_key
+
+def read_deposit_public_keys(deposit_data_path):
+    # Return the lowercase 0x prefixed public keys of the entries in a deposit data file. Only
+    # the public keys are kept so that large deposit data files are not held in memory.
+
+    public_keys = []
+    for deposit in iter_deposit_data(deposit_data_path):
+        if not isinstance(deposit, dict) or type(deposit.get('pubkey')) is not str:
             continue
-        
-        keep_retrying = False
-    
-    if keep_retrying:
+
+        public_key = deposit['pubkey'].lower()
+        if not public_key.startswith('0x'):
+            public_key = '0x' + public_key
+        public_keys.append(public_key)
+
+    return public_keys
+
+key_file_cache = {}
+
+def get_cached_key_file(path, reader):
+    # Return the result of reader for this key file. It is cached and only read again when the
+    # file modification time or size changed.
+
+    path_stat = os.stat(path)
+    cache_key = (str(path), reader.__name__)
+    signature = (path_stat.st_mtime_ns, path_stat.st_size)
+
+    cached = key_file_cache.get(cache_key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    value = reader(path)
+    key_file_cache[cache_key] = (signature, value)
+    return value
+
+class KeyManifest():
+    # Keystore paths and deposit data file paths indexed by public key
+
+    def __init__(self, keystore_paths, deposit_data_paths, log):
+        self.keystores = {}
+        self.deposits = {}
+        self.duplicate_keystores = {}
+        self.duplicate_deposits = {}
+        self.invalid_paths = []
+        self.deposit_data_paths = list(deposit_data_paths)
+
+        for keystore_path in keystore_paths:
+            try:
+                public_key = get_cached_key_file(keystore_path, read_keystore_public_key)
+            except (OSError, ValueError, KeyError, TypeError, AttributeError) as exception:
+                log.error(f'Unable to read the public key from keystore {keystore_path}. '
+                    f'Exception: {exception}')
+                self.invalid_paths.append(keystore_path)
+                continue
+
+            if public_key in self.keystores:
+                self.duplicate_keystores.setdefault(public_key, []).append(keystore_path)
+            else:
+                self.keystores[public_key] = keystore_path
+
+        for deposit_data_path in self.deposit_data_paths:
+            try:
+                deposit_public_keys = get_cached_key_file(deposit_data_path,
+                    read_deposit_public_keys)
+            except (OSError, ValueError) as exception:
+                log.error(f'Unable to read deposit data file {deposit_data_path}. '
+                    f'Exception: {exception}')
+                self.invalid_paths.append(deposit_data_path)
+                continue
+
+            for public_key in deposit_public_keys:
+                if public_key in self.deposits:
+                    self.duplicate_deposits.setdefault(public_key, []).append(
+                        str(deposit_data_path))
+                else:
+                    self.deposits[public_key] = str(deposit_data_path)
+
+    @property
+    def public_keys(self) -> List[str]:
+        return list(dict.fromkeys(list(self.keystores) + list(self.deposits)))
+
+    @property
+    def deposit_public_keys(self) -> List[str]:
+        return list(self.deposits)
+
+    @property
+    def orphan_keystores(self) -> List[str]:
+        # Keystores without a deposit entry, only known when we have deposit data
+        if len(self.deposit_data_paths) == 0:
+            return []
+        return [public_key for public_key in self.keystores if public_key not in self.deposits]
+
+    @property
+    def orphan_deposits(self) -> List[str]:
+        # Deposit entries without a keystore, only known when we have keystores
+        if len(self.keystores) == 0:
+            return []
+        return [public_key for public_key in self.deposits if public_key not in self.keystores]
+
+    def get_keystore_paths(self, public_key: str) -> List[str]:
+        paths = self.duplicate_keystores.get(public_key, [])
+        if public_key in self.keystores:
+            paths = [self.keystores[public_key]] + paths
+        return paths
+
+    def get_issues(self) -> List[str]:
+        issues = []
+        if len(self.duplicate_keystores) > 0:
+            issues.append(f'{len(self.duplicate_keystores)} public key(s) with more than one '
+                f'keystore')
+        if len(self.duplicate_deposits) > 0:
+            issues.append(f'{len(self.duplicate_deposits)} public key(s) with more than one '
+                f'deposit data entry')
+        if len(self.orphan_keystores) > 0:
+            issues.append(f'{len(self.orphan_keystores)} keystore(s) without deposit data')
+        if len(self.orphan_deposits) > 0:
+            issues.append(f'{len(self.orphan_deposits)} deposit data entry(ies) without '
+                f'keystore')
+        if len(self.invalid_paths) > 0:
+            issues.append(f'{len(self.invalid_paths)} unreadable file(s)')
+        return issues
+
+    def log_issues(self, log):
+        for public_key in self.duplicate_keystores:
+            log.warning(f'Public key {public_key} has more than one keystore: '
+                f'{", ".join(self.get_keystore_paths(public_key))}')
+        for public_key, paths in self.duplicate_deposits.items():
+            log.warning(f'Public key {public_key} has more than one deposit data entry in: '
+                f'{", ".join([self.deposits[public_key]] + paths)}')
+        for public_key in self.orphan_keystores:
+            log.warning(f'Keystore {self.keystores[public_key]} has no deposit data entry.')
+        for public_key in self.orphan_deposits:
+            log.warning(f'Deposit data entry for {public_key} has no keystore.')
+
+    def format_summary(self) -> str:
+        lines = [
+            f'Number of validators: {len(self.public_keys)}',
+            f'Number of keystores: {len(self.keystores)}',
+            f'Number of deposit data entries: {len(self.deposits)} in '
+            f'{len(self.deposit_data_paths)} file(s)'
+        ]
+        issues = self.get_issues()
+        if len(issues) > 0:
+            lines.append('Issues: ' + ', '.join(issues))
+        return '\n'.join(lines)
+
+def get_key_manifest(keys, log):
+    # Return the key manifest for keys found with search_for_generated_keys
+
+    deposit_data_paths = keys.get('deposit_data_paths')
+    if deposit_data_paths is None:
+        deposit_data_paths = []
+        if keys.get('deposit_data_path') is not None:
+            deposit_data_paths.append(keys['deposit_data_path'])
+
+    return KeyManifest(keys.get('keystore_paths', []), deposit_data_paths, log)
+
+def hash_tree_root_bytes(value):
+    # Return the SSZ hash tree root of a fixed size byte vector
+
+    chunks = [value[offset:offset + 32].ljust(32, b'\x00')
+        for offset in range(0, max(len(value), 1), 32)]
+    return merkleize_chunks(chunks)
+
+def merkleize_chunks(chunks):
+    # Return the SSZ merkle root of these 32 bytes chunks
+
+    chunks = list(chunks)
+    while len(chunks) & (len(chunks) - 1) != 0:
+        chunks.append(b'\x00' * 32)
+
+    while len(chunks) > 1:
+        chunks = [hashlib.sha256(chunks[index] + chunks[index + 1]).digest()
+            for index in range(0, len(chunks), 2)]
+
+    return chunks[0]
+
+def get_deposit_roots(public_key, withdrawal_credentials, amount, signature):
+    # Return the SSZ hash tree roots of the DepositMessage and of the DepositData for a deposit
+
+    leaves = [
+        hash_tree_root_bytes(public_key),
+        withdrawal_credentials,
+        amount.to_bytes(8, 'little').ljust(32, b'\x00')
+    ]
+
+    deposit_message_root = merkleize_chunks(leaves)
+    deposit_data_root = merkleize_chunks(leaves + [hash_tree_root_bytes(signature)])
+
+    return deposit_message_root, deposit_data_root
+
+def get_deposit_signing_root(deposit_message_root, fork_version):
+    # Return the signing root of a deposit message. Deposits are signed for the genesis fork
+    # version with an empty genesis validators root.
+
+    fork_data_root = merkleize_chunks([fork_version.ljust(32, b'\x00'), b'\x00' * 32])
+    domain = bytes.fromhex(DOMAIN_DEPOSIT) + fork_data_root[:28]
+    return merkleize_chunks([deposit_message_root, domain])
+
+def verify_deposit_signature(index, public_key, signing_root, signature):
+    # Verify the BLS signature of a deposit. Return a tuple with the deposit index and whether
+    # the signature is valid. py_ecc returns False for malformed keys and signatures.
+
+    from py_ecc.bls import G2ProofOfPossession as bls
+
+    return index, bool(bls.Verify(public_key, signing_root, signature))
+
+def validate_deposit_data(deposit_data_path, network, expected_public_keys, log):
+    # Validate every entry of a deposit data file before it is used on the launchpad: public
+    # key, network fork version, amount, withdrawal credentials, SSZ roots and BLS signature.
+    # Signatures are slow to verify so they are checked in a process pool for large files.
+    # expected_public_keys can be None to skip the public keys check. Return a list of issues or
+    # None if the validation was cancelled.
+
+    fork_version = bytes.fromhex(GENESIS_FORK_VERSIONS[network])
+
+    def validating_callback(set_percentage, log_text, change_status, set_result, get_exited):
+        issues = []
+        signature_checks = []
+        public_keys = set()
+        entry_count = 0
+
+        def add_issue(index, message):
+            issue = f'Deposit #{index}: {message}'
+            issues.append(issue)
+            log_text(issue)
+
+        try:
+            for index, entry in enumerate(iter_deposit_data(deposit_data_path)):
+                if get_exited():
+                    return
+
+                entry_count = entry_count + 1
+
+                try:
+                    public_key = bytes.fromhex(entry['pubkey'])
+                    withdrawal_credentials = bytes.fromhex(entry['withdrawal_credentials'])
+                    amount = int(entry['amount'])
+                    signature = bytes.fromhex(entry['signature'])
+                    entry_fork_version = bytes.fromhex(entry['fork_version'])
+                    deposit_message_root = bytes.fromhex(entry['deposit_message_root'])
+                    deposit_data_root = bytes.fromhex(entry['deposit_data_root'])
+                except (KeyError, TypeError, ValueError) as exception:
+                    add_issue(index, f'missing or malformed field ({exception})')
+                    continue
+
+                public_key_hex = '0x' + public_key.hex()
+
+                if len(public_key) != 48:
+                    add_issue(index, 'public key is not 48 bytes')
+                    continue
+                if public_key_hex in public_keys:
+                    add_issue(index, f'duplicate deposit for {public_key_hex}')
+                public_keys.add(public_key_hex)
+                if (expected_public_keys is not None and
+                    public_key_hex not in expected_public_keys):
+                    add_issue(index, f'{public_key_hex} does not match any of your keys')
+
+                if entry_fork_version != fork_version:
+                    add_issue(index, f'fork version 0x{entry_fork_version.hex()} is not the '
+                        f'{network.capitalize()} fork version 0x{fork_version.hex()}')
+                if amount != DEPOSIT_AMOUNT_GWEI:
+                    add_issue(index, f'amount {amount} gwei is not {DEPOSIT_AMOUNT_GWEI} gwei')
+
+                if len(withdrawal_credentials) != 32:
+                    add_issue(index, 'withdrawal credentials are not 32 bytes')
+                    continue
+                if withdrawal_credentials[0] not in (0, 1):
+                    add_issue(index, f'unknown withdrawal credentials prefix '
+                        f'0x{withdrawal_credentials[:1].hex()}')
+                elif withdrawal_credentials[0] == 1 and any(withdrawal_credentials[1:12]):
+                    add_issue(index, 'execution withdrawal credentials are not padded with zeros')
+
+                if len(signature) != 96:
+                    add_issue(index, 'signature is not 96 bytes')
+                    continue
+
+                computed_message_root, computed_data_root = get_deposit_roots(public_key,
+                    withdrawal_credentials, amount, signature)
+                if computed_message_root != deposit_message_root:
+                    add_issue(index, 'deposit message root does not match its content')
+                if computed_data_root != deposit_data_root:
+                    add_issue(index, 'deposit data root does not match its content')
+
+                signature_checks.append((index, public_key,
+                    get_deposit_signing_root(computed_message_root, fork_version), signature))
+        except (OSError, ValueError) as exception:
+            issues.append(f'Unable to read deposit data file: {exception}')
+            return {
+                'issues': issues
+            }
+
+        if entry_count == 0:
+            issues.append('No deposit found in the deposit data file.')
+
+        log_text(f'Checked {entry_count} deposit(s) from {deposit_data_path}.')
+        set_percentage(10)
+
+        try:
+            importlib.import_module('py_ecc.bls')
+        except ImportError as exception:
+            issues.append(f'Unable to verify the deposit signatures. The py_ecc package cannot '
+                f'be loaded ({exception}).')
+            log_text(issues[-1])
+            signature_checks = []
+
+        start_time = time.monotonic()
+        verified_count = 0
+
+        def signature_verified(index, valid):
+            nonlocal verified_count
+
+            verified_count = verified_count + 1
+            if not valid:
+                add_issue(index, 'invalid signature')
+
+            elapsed = max(time.monotonic() - start_time, 0.001)
+            set_percentage(10 + int(verified_count * 90 / len(signature_checks)))
+            change_status(f'Verified signatures: {verified_count} / {len(signature_checks)} '
+                f'({verified_count / elapsed:.1f} signatures/s)')
+
+        if 0 < len(signature_checks) < DEPOSIT_SIGNATURE_POOL_MIN_COUNT:
+            for signature_check in signature_checks:
+                if get_exited():
+                    return
+                signature_verified(*verify_deposit_signature(*signature_check))
+        elif len(signature_checks) > 0:
+            try:
+                with ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1,
+                    len(signature_checks))) as executor:
+
+                    futures = [executor.submit(verify_deposit_signature, *signature_check)
+                        for signature_check in signature_checks]
+
+                    for future in as_completed(futures):
+                        if get_exited():
+                            for pending_future in futures:
+                                pending_future.cancel()
+                            return
+
+                        signature_verified(*future.result())
+            except (OSError, RuntimeError) as exception:
+                # Deposits with unverified signatures must not reach the launchpad
+                issues.append(f'Unable to verify the deposit signatures in a process pool '
+                    f'({exception}).')
+                log_text(issues[-1])
+
+        set_percentage(100)
+
+        return {
+            'issues': issues
+        }
+
+    result = progress_log_dialog(
+        title='Validating deposit data',
+        text=(
+f'''
+Validating your deposit data file before doing the deposit(s):
+
+{deposit_data_path}
+'''     ),
+        status_text='Checking deposits',
+        run_callback=validating_callback
+    ).run()
+
+    if not result:
+        log.warning('Deposit data validation was cancelled.')
+        return None
+
+    for issue in result['issues']:
+        log.error(f'Deposit data issue: {issue}')
+
+    return result['issues']
+
+def normalize_keystore_password(password):
+    # Normalize a keystore password as defined in EIP-2335: NFKD normalization, control codes
+    # removed and UTF-8 encoded
+
+    password = unicodedata.normalize('NFKD', password)
+    password = ''.join(character for character in password
+        if not (ord(character) <= 0x1f or 0x7f <= ord(character) <= 0x9f))
+    return password.encode('utf8')
+
+def get_keystore_kdf_memory(keystore_path):
+    # Return the memory in bytes needed to derive the decryption key of this keystore
+
+    try:
+        with open(keystore_path, 'r', encoding='utf8') as keystore_file:
+            kdf = json.load(keystore_file)['crypto']['kdf']
+        if kdf['function'] == 'scrypt':
+            return 128 * int(kdf['params']['n']) * int(kdf['params']['r'])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    return 0
+
+def verify_keystore_password(keystore_path, password):
+    # Decrypt the key of an EIP-2335 keystore far enough to verify its checksum with this
+    # password. Return a tuple with the keystore path and an error message, None if the password
+    # is correct.
+
+    # Read the parameters first so that a broken keystore is reported separately from a key
+    # derivation failure such as scrypt running out of memory.
+
+    try:
+        with open(keystore_path, 'r', encoding='utf8') as keystore_file:
+            crypto = json.load(keystore_file)['crypto']
+
+        kdf_function = crypto['kdf']['function']
+        kdf_params = crypto['kdf']['params']
+        salt = bytes.fromhex(kdf_params['salt'])
+        dklen = int(kdf_params['dklen'])
+        normalized_password = normalize_keystore_password(password)
+
+        if kdf_function == 'scrypt':
+            n = int(kdf_params['n'])
+            r = int(kdf_params['r'])
+            p = int(kdf_params['p'])
+        elif kdf_function == 'pbkdf2':
+            if kdf_params.get('prf', 'hmac-sha256') != 'hmac-sha256':
+                return keystore_path, f'Unsupported pbkdf2 prf {kdf_params["prf"]}'
+            c = int(kdf_params['c'])
+        else:
+            return keystore_path, f'Unsupported kdf function {kdf_function}'
+
+        checksum_function = crypto['checksum']['function']
+        if checksum_function != 'sha256':
+            return keystore_path, f'Unsupported checksum function {checksum_function}'
+
+        cipher_message = bytes.fromhex(crypto['cipher']['message'])
+        expected_checksum = crypto['checksum']['message'].lower()
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as exception:
+        return keystore_path, f'Unable to read keystore: {exception}'
+
+    try:
+        if kdf_function == 'scrypt':
+            decryption_key = hashlib.scrypt(normalized_password, salt=salt, n=n, r=r, p=p,
+                dklen=dklen, maxmem=128 * n * r * 2)
+        else:
+            decryption_key = hashlib.pbkdf2_hmac('sha256', normalized_password, salt, c, dklen)
+    except (ValueError, MemoryError) as exception:
+        return keystore_path, f'Unable to derive the decryption key: {exception}'
+
+    checksum = hashlib.sha256(decryption_key[16:32] + cipher_message).hexdigest()
+
+    if checksum != expected_checksum:
+        return keystore_path, 'Wrong password'
+
+    return keystore_path, None
+
+def get_available_memory():
+    # Return the available memory in bytes or None if it cannot be found
+
+    if os.name == 'nt':
+        import ctypes
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [
+                ('dwLength', ctypes.c_ulong),
+                ('dwMemoryLoad', ctypes.c_ulong),
+                ('ullTotalPhys', ctypes.c_ulonglong),
+                ('ullAvailPhys', ctypes.c_ulonglong),
+                ('ullTotalPageFile', ctypes.c_ulonglong),
+                ('ullAvailPageFile', ctypes.c_ulonglong),
+                ('ullTotalVirtual', ctypes.c_ulonglong),
+                ('ullAvailVirtual', ctypes.c_ulonglong),
+                ('ullAvailExtendedVirtual', ctypes.c_ulonglong)
+            ]
+
+        memory_status = MEMORYSTATUSEX()
+        memory_status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(memory_status)):
+            return memory_status.ullAvailPhys
+        return None
+
+    try:
+        with open('/proc/meminfo', 'r') as meminfo_file:
+            for line in meminfo_file:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+
+    return None
+
+def get_keystore_verification_workers(keystore_paths):
+    # Return the number of processes to use when verifying these keystores. Scrypt needs a
+    # large amount of memory per keystore so the pool is sized by the available memory as well
+    # as by the CPU count.
+
+    workers = min(os.cpu_count() or 1, KEYSTORE_VERIFICATION_MAX_WORKERS, len(keystore_paths))
+
+    kdf_memory = get_keystore_kdf_memory(keystore_paths[0]) if len(keystore_paths) > 0 else 0
+    available_memory = get_available_memory()
+
+    if kdf_memory > 0 and available_memory is not None:
+        workers = min(workers,
+            int(available_memory * KEYSTORE_VERIFICATION_MEMORY_RATIO / kdf_memory))
+
+    return max(workers, 1)
+
+def verify_keystores_password(keystore_paths, password, log):
+    # Verify the password against all these keystores in a process pool while showing the
+    # progress. Return a list of (keystore path, error message) tuples for the keystores that
+    # could not be decrypted or None if the verification was cancelled.
+
+    keystore_count = len(keystore_paths)
+    workers = get_keystore_verification_workers(keystore_paths)
+
+    def verifying_callback(set_percentage, log_text, change_status, set_result, get_exited):
+        start_time = time.monotonic()
+        verified_paths = set()
+        failures = []
+
+        def add_result(keystore_path, error):
+            verified_paths.add(keystore_path)
+            verified_count = len(verified_paths)
+            if error is not None:
+                failures.append((keystore_path, error))
+                log_text(f'{Path(keystore_path).name}: {error}')
+
+            elapsed = max(time.monotonic() - start_time, 0.001)
+            set_percentage(int(verified_count * 100 / keystore_count))
+            change_status(f'Verified keystores: {verified_count} / {keystore_count}, '
+                f'failures: {len(failures)} ({verified_count / elapsed:.1f} keystores/s with '
+                f'{workers} process(es))')
+
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(verify_keystore_password, keystore_path, password)
+                    for keystore_path in keystore_paths]
+
+                for future in as_completed(futures):
+                    if get_exited():
+                        for pending_future in futures:
+                            pending_future.cancel()
+                        return
+                    add_result(*future.result())
+        except (OSError, RuntimeError) as exception:
+            # Process pools are not available everywhere, verify the remaining keystores in
+            # this process
+            log_text(f'Unable to use a process pool ({exception}). Verifying keystores '
+                f'serially.')
+            for keystore_path in keystore_paths:
+                if get_exited():
+                    return
+                if keystore_path in verified_paths:
+                    continue
+                add_result(*verify_keystore_password(keystore_path, password))
+
+        elapsed = max(time.monotonic() - start_time, 0.001)
+        log_text(f'Verified {keystore_count} keystore(s) in {elapsed:.1f} seconds.')
+
+        return {
+            'failures': failures
+        }
+
+    result = progress_log_dialog(
+        title='Verifying keystore password',
+        text=(
+f'''
+Verifying your password against your {keystore_count} keystore(s) before
+importing them. This can take a while since keystores are designed to be
+slow to decrypt.
+'''     ),
+        status_text=f'Verified keystores: 0 / {keystore_count}',
+        run_callback=verifying_callback
+    ).run()
+
+    if not result:
+        log.warning('Keystore password verification was cancelled.')
+        return None
+
+    for keystore_path, error in result['failures']:
+        log.error(f'Keystore {keystore_path} could not be decrypted: {error}')
+
+    return result['failures']
+
+def get_bc_validator_deposits(network, public_keys, log):
+    # Return the validator deposits from the beaconcha.in API. Public keys are looked up
+    # concurrently in chunks the API accepts and results are merged with a single deposit per
+    # public key.
+
+    unique_public_keys = list(dict.fromkeys(public_key.lower() for public_key in public_keys))
+    chunks = [unique_public_keys[offset:offset + BEACONCHA_IN_MAX_VALIDATORS_PER_REQUEST]
+        for offset in range(0, len(unique_public_keys), BEACONCHA_IN_MAX_VALIDATORS_PER_REQUEST)]
+
+    if len(chunks) == 0:
+        return []
+
+    chunks_deposits = asyncio.run(_get_bc_validator_deposits_chunks(network, chunks, log))
+
+    if chunks_deposits is None:
         log.error(f'We failed to get the validator deposits from the beaconcha.in API after '
-            f'{retry_count} retries.')
+            f'{BEACONCHA_IN_RETRY_COUNT} retries.')
         time.sleep(5)
         return False
-    
-    validator_deposits = response_json['data']
-    # beaconcha.in API does not return a list for a single validator so
-    # we make it a list for ease of use
-    if type(validator_deposits) is not list:
-        validator_deposits = [validator_deposits]
 
-    return validator_deposits
+    # Keep a single deposit per public key, preferring one with a valid signature
+    deposits_by_public_key = {}
+    for chunk_deposits in chunks_deposits:
+        for deposit in chunk_deposits:
+            if not isinstance(deposit, dict) or 'publickey' not in deposit:
+                continue
+            public_key = deposit['publickey'].lower()
+            current_deposit = deposits_by_public_key.get(public_key)
+            if current_deposit is None or (
+                not current_deposit.get('valid_signature', True) and
+                deposit.get('valid_signature', True)):
+                deposits_by_public_key[public_key] = deposit
+
+    return list(deposits_by_public_key.values())
+
+async def _get_bc_validator_deposits_chunks(network, chunks, log):
+    # Fetch the deposits for each chunk of public keys with a limited concurrency. A 429
+    # response pauses every request until its Retry-After delay is over. Return the deposits by
+    # chunk or None if a chunk could not be fetched.
+
+    semaphore = asyncio.Semaphore(BEACONCHA_IN_MAX_CONCURRENCY)
+    rate_limit = {'not_before': 0.0}
+    progress = {'completed': 0}
+
+    headers = {'accept': 'application/json'}
+
+    async with httpx.AsyncClient(base_url=BEACONCHA_IN_URLS[network], headers=headers,
+        follow_redirects=True, timeout=30.0) as client:
+
+        async def fetch_chunk(chunk_index, chunk):
+            bc_api_query_url = BEACONCHA_VALIDATOR_DEPOSITS_API_URL.format(
+                indexOrPubkey=','.join(chunk))
+            retry_index = 0
+
+            while retry_index <= BEACONCHA_IN_RETRY_COUNT:
+                response = None
+
+                async with semaphore:
+                    delay = rate_limit['not_before'] - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+
+                    try:
+                        response = await client.get(bc_api_query_url)
+                    except httpx.RequestError as exception:
+                        log.error(f'Exception {exception} when trying to get deposits for chunk '
+                            f'{chunk_index + 1}/{len(chunks)} from beaconcha.in')
+
+                if response is not None and response.status_code == 429:
+                    retry_after = _parse_retry_after(response.headers.get('Retry-After'),
+                        BEACONCHA_IN_RETRY_DELAY)
+                    rate_limit['not_before'] = max(rate_limit['not_before'],
+                        time.monotonic() + retry_after)
+                    log.warning(f'beaconcha.in rate limit reached. We will wait '
+                        f'{retry_after:.0f} seconds before trying again.')
+                    retry_index = retry_index + 1
+                    continue
+
+                if response is not None:
+                    if response.status_code == 200:
+                        try:
+                            response_json = response.json()
+                        except ValueError:
+                            response_json = None
+
+                        if (
+                            isinstance(response_json, dict) and
+                            response_json.get('status') == 'OK' and
+                            'data' in response_json
+                            ):
+                            chunk_deposits = response_json['data']
+                            # beaconcha.in API does not return a list for a single validator so
+                            # we make it a list for ease of use
+                            if chunk_deposits is None:
+                                chunk_deposits = []
+                            elif type(chunk_deposits) is not list:
+                                chunk_deposits = [chunk_deposits]
+
+                            progress['completed'] = progress['completed'] + 1
+                            log.info(f'Got {len(chunk_deposits)} deposit(s) for chunk '
+                                f'{chunk_index + 1}/{len(chunks)} from beaconcha.in '
+                                f'({progress["completed"]}/{len(chunks)} chunks done)')
+                            return chunk_deposits
+
+                        log.error(f'Unexpected response data or structure from beaconcha.in '
+                            f'for chunk {chunk_index + 1}/{len(chunks)}: {response_json}')
+                    else:
+                        log.error(f'Error code {response.status_code} when trying to get '
+                            f'deposits for chunk {chunk_index + 1}/{len(chunks)} from '
+                            f'beaconcha.in')
+
+                retry_index = retry_index + 1
+                if retry_index > BEACONCHA_IN_RETRY_COUNT:
+                    break
+
+                retry_delay = min(BEACONCHA_IN_RETRY_DELAY * 2 ** (retry_index - 1),
+                    BEACONCHA_IN_MAX_RETRY_DELAY)
+                log.info(f'We will retry chunk {chunk_index + 1}/{len(chunks)} in '
+                    f'{retry_delay:.0f} seconds (retry index = {retry_index})')
+                await asyncio.sleep(retry_delay)
+
+            return None
+
+        chunks_deposits = await asyncio.gather(*(fetch_chunk(chunk_index, chunk)
+            for chunk_index, chunk in enumerate(chunks)))
+
+    if any(chunk_deposits is None for chunk_deposits in chunks_deposits):
+        return None
+
+    return chunks_deposits
+
+def _parse_retry_after(value, default):
+    # Return the delay in seconds from a Retry-After header, which can either be a number of
+    # seconds or an HTTP date
+
+    if value is None:
+        return default
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        retry_date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+
+    return max(retry_date.timestamp() - time.time(), 0.0)
 
 def test_open_ports(ports, log):
     # Test the selected ports to make sure they are opened and exposed to the internet
@@ -1288,4 +2127,1459 @@ def test_context_variable(context, variable, log):
             f'find it. Here is the full context: {json.dumps(context)}')
         return False
     
-    return True
\ No newline at end of file
+    return True
+
+class GethRPCError(Exception):
+    pass
+
+@dataclass
+class GethSyncStatus():
+    is_syncing: bool
+    starting_block: Union[int, str] = UNKNOWN_VALUE
+    current_block: Union[int, str] = UNKNOWN_VALUE
+    highest_block: Union[int, str] = UNKNOWN_VALUE
+
+@dataclass
+class GethStatus():
+    sync_status: GethSyncStatus
+    connected_peers: int
+
+class GethRPCClient():
+    # Small JSON-RPC client for geth. Requests are sent as a single batch over a reused
+    # connection and results are returned as typed values. Failures raise GethRPCError.
+
+    def __init__(self, url: str = 'http://127.0.0.1:8545', timeout: float = 5.0):
+        self.url = url
+        self.client = httpx.Client(timeout=timeout, headers={
+            'Content-Type': 'application/json'
+        })
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def close(self):
+        self.client.close()
+
+    def batch(self, calls: List[tuple]) -> list:
+        # Call multiple methods in a single round trip. Each call is a (method, params) tuple.
+        # Results are returned in the same order as the calls.
+
+        request_json = []
+        for index, (method, params) in enumerate(calls):
+            request_json.append({
+                'jsonrpc': '2.0',
+                'method': method,
+                'params': params,
+                'id': index + 1
+            })
+
+        try:
+            response = self.client.post(self.url, json=request_json)
+        except httpx.RequestError as exception:
+            raise GethRPCError(f'Exception: {exception}') from exception
+
+        if response.status_code != 200:
+            raise GethRPCError(f'Status code: {response.status_code}')
+
+        try:
+            response_json = response.json()
+        except ValueError as exception:
+            raise GethRPCError(f'Unexpected response: {exception}') from exception
+
+        if not isinstance(response_json, list):
+            # Geth returns a single object when it rejects the whole batch
+            raise GethRPCError(f'Unexpected response: {response_json}')
+
+        responses_by_id = {}
+        for item in response_json:
+            if isinstance(item, dict) and 'id' in item:
+                responses_by_id[item['id']] = item
+
+        results = []
+        for index, (method, params) in enumerate(calls):
+            item = responses_by_id.get(index + 1)
+            if item is None:
+                raise GethRPCError(f'No response for {method}')
+            if 'error' in item:
+                raise GethRPCError(f'Error for {method}: {item["error"]}')
+            if 'result' not in item:
+                raise GethRPCError(f'Unexpected response for {method}: {item}')
+            results.append(item['result'])
+
+        return results
+
+    def call(self, method: str, params: Optional[list] = None):
+        return self.batch([(method, params or [])])[0]
+
+    def get_client_version(self) -> str:
+        return self.call('web3_clientVersion')
+
+    def get_sync_status(self) -> GethSyncStatus:
+        return self._parse_sync_status(self.call('eth_syncing'))
+
+    def get_peer_count(self) -> int:
+        return self._parse_quantity(self.call('net_peerCount'), 0)
+
+    def get_status(self) -> GethStatus:
+        # Sync status and peer count in a single round trip
+
+        syncing_result, peer_count_result = self.batch([
+            ('eth_syncing', []),
+            ('net_peerCount', [])
+        ])
+
+        return GethStatus(
+            sync_status=self._parse_sync_status(syncing_result),
+            connected_peers=self._parse_quantity(peer_count_result, 0)
+        )
+
+    def _parse_sync_status(self, result) -> GethSyncStatus:
+        if not result:
+            return GethSyncStatus(is_syncing=False)
+
+        return GethSyncStatus(
+            is_syncing=True,
+            starting_block=self._parse_quantity(result.get('startingBlock')),
+            current_block=self._parse_quantity(result.get('currentBlock')),
+            highest_block=self._parse_quantity(result.get('highestBlock'))
+        )
+
+    def _parse_quantity(self, value, default=UNKNOWN_VALUE):
+        if not value:
+            return default
+        try:
+            return int(value, 16)
+        except (TypeError, ValueError):
+            return default
+
+class BeaconEventsSubscriber():
+    # Subscribe to the beacon node events stream (server-sent events) in a background thread and
+    # keep track of the latest head and finalized checkpoint. Sync distance is computed from the
+    # head slot and the current wall clock slot derived from the genesis time.
+
+    def __init__(self, base_url: str, topics: Optional[List[str]] = None,
+        reconnect_delay: float = 5.0, head_max_age: float = 3 * SECONDS_PER_SLOT):
+
+        if topics is None:
+            topics = ['head', 'finalized_checkpoint']
+
+        self.base_url = base_url
+        self.topics = topics
+        self.reconnect_delay = reconnect_delay
+        self.head_max_age = head_max_age
+
+        self.genesis_time = None
+        self.head_slot = None
+        self.head_received = None
+        self.finalized_epoch = None
+        self.error = None
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.stop()
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            # The thread might be blocked reading the stream. It is a daemon thread and it will
+            # notice the stop event on its next read.
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def get_syncing(self) -> Optional[dict]:
+        # Return syncing data in the same shape as the BN_SYNCING_EP data or None if we did not
+        # receive a recent head event
+
+        with self._lock:
+            head_slot = self.head_slot
+            head_received = self.head_received
+            genesis_time = self.genesis_time
+
+        if head_slot is None or genesis_time is None:
+            return None
+
+        if time.monotonic() - head_received > self.head_max_age:
+            return None
+
+        wall_slot = int((time.time() - genesis_time) // SECONDS_PER_SLOT)
+        sync_distance = wall_slot - head_slot
+
+        # The head block for the current slot is usually received a few seconds after the slot
+        # started so a small distance is not considered as syncing.
+        return {
+            'head_slot': head_slot,
+            'sync_distance': sync_distance,
+            'is_syncing': sync_distance > BN_SYNCED_MAX_DISTANCE
+        }
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                if self.genesis_time is None:
+                    self._get_genesis_time()
+                self._read_stream()
+            except httpx.HTTPError as exception:
+                self.error = f'Exception: {exception} while reading beacon node events.'
+            except (ValueError, KeyError) as exception:
+                self.error = f'Unexpected data: {exception} while reading beacon node events.'
+
+            self._stop_event.wait(self.reconnect_delay)
+
+    def _get_genesis_time(self):
+        response = httpx.get(self.base_url + BN_GENESIS_EP, headers={
+            'accept': 'application/json'
+        })
+        response.raise_for_status()
+
+        genesis_time = int(response.json()['data']['genesis_time'])
+        with self._lock:
+            self.genesis_time = genesis_time
+
+    def _read_stream(self):
+        params = {'topics': ','.join(self.topics)}
+        headers = {'accept': 'text/event-stream'}
+
+        # Head events are expected every slot. Use a read timeout so that we can notice when we
+        # should stop or when the stream is stale.
+        timeout = httpx.Timeout(10.0, read=2 * SECONDS_PER_SLOT)
+
+        with httpx.stream('GET', self.base_url + BN_EVENTS_EP, params=params, headers=headers,
+            timeout=timeout) as response:
+
+            response.raise_for_status()
+            self.error = None
+
+            event_type = None
+            data_lines = []
+
+            for line in response.iter_lines():
+                if self._stop_event.is_set():
+                    return
+
+                if line == '':
+                    if event_type is not None and len(data_lines) > 0:
+                        self._handle_event(event_type, '\n'.join(data_lines))
+                    event_type = None
+                    data_lines = []
+                elif line.startswith(':'):
+                    continue
+                elif line.startswith('event:'):
+                    event_type = line[len('event:'):].strip()
+                elif line.startswith('data:'):
+                    data_lines.append(line[len('data:'):].strip())
+
+    def _handle_event(self, event_type, data):
+        event_data = json.loads(data)
+
+        with self._lock:
+            if event_type == 'head':
+                self.head_slot = int(event_data['slot'])
+                self.head_received = time.monotonic()
+            elif event_type == 'finalized_checkpoint':
+                self.finalized_epoch = int(event_data['epoch'])
+
+class GethEventsSubscriber():
+    # Subscribe to geth newHeads and syncing events over its websocket endpoint in a background
+    # thread and keep an up to date sync status. This is optional and depends on the
+    # websocket-client package. When it is not available or when we cannot connect,
+    # get_sync_status returns None and callers should poll geth over HTTP instead.
+
+    def __init__(self, url: str = 'ws://127.0.0.1:8546', refresh_interval: float = 10.0,
+        reconnect_delay: float = 5.0):
+
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.reconnect_delay = reconnect_delay
+
+        self.error = None
+
+        self._sync_status = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._connection = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.stop()
+
+    def start(self):
+        try:
+            import websocket
+        except ImportError:
+            self.error = 'websocket-client is not installed, using HTTP polling for geth.'
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, args=(websocket,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+        connection = self._connection
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def get_sync_status(self) -> Optional[GethSyncStatus]:
+        with self._lock:
+            if self._connection is None:
+                return None
+            return self._sync_status
+
+    def _run(self, websocket):
+        while not self._stop_event.is_set():
+            try:
+                connection = websocket.create_connection(self.url, timeout=self.refresh_interval)
+            except (OSError, websocket.WebSocketException) as exception:
+                self.error = f'Exception: {exception} while connecting to geth websocket.'
+                self._stop_event.wait(self.reconnect_delay)
+                continue
+
+            with self._lock:
+                self._connection = connection
+
+            try:
+                self._read_events(websocket, connection)
+            except (OSError, ValueError, websocket.WebSocketException) as exception:
+                if not self._stop_event.is_set():
+                    self.error = f'Exception: {exception} while reading geth websocket.'
+            finally:
+                with self._lock:
+                    self._connection = None
+                    self._sync_status = None
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+
+            self._stop_event.wait(self.reconnect_delay)
+
+    def _send(self, connection, request_id, method, params):
+        connection.send(json.dumps({
+            'jsonrpc': '2.0',
+            'method': method,
+            'params': params,
+            'id': request_id
+        }))
+
+    def _read_events(self, websocket, connection):
+        # Request ids: 1 for the newHeads subscription, 2 for the syncing subscription and 3 for
+        # eth_syncing queries used to get the initial status and to refresh it.
+        self._send(connection, 1, 'eth_subscribe', ['newHeads'])
+        self._send(connection, 2, 'eth_subscribe', ['syncing'])
+        self._send(connection, 3, 'eth_syncing', [])
+
+        subscriptions = {}
+        self.error = None
+
+        while not self._stop_event.is_set():
+            try:
+                message = connection.recv()
+            except websocket.WebSocketTimeoutException:
+                # Nothing happened for a while, refresh the sync progress
+                self._send(connection, 3, 'eth_syncing', [])
+                continue
+
+            if not message:
+                return
+
+            message_json = json.loads(message)
+
+            if 'id' in message_json:
+                if 'error' in message_json:
+                    self.error = f'Error from geth websocket: {message_json["error"]}'
+                elif message_json['id'] in (1, 2):
+                    subscriptions[message_json['result']] = message_json['id']
+                elif message_json['id'] == 3:
+                    self._update_from_syncing(message_json['result'])
+                continue
+
+            if message_json.get('method') != 'eth_subscription':
+                continue
+
+            params = message_json.get('params', {})
+            subscription_id = subscriptions.get(params.get('subscription'))
+            result = params.get('result')
+
+            if subscription_id == 1 and result:
+                self._update_from_head(result)
+            elif subscription_id == 2:
+                # Syncing events are either false or an object with a syncing flag and a status
+                if isinstance(result, dict) and result.get('syncing'):
+                    self._update_from_syncing(result.get('status', {}))
+                else:
+                    self._update_from_syncing(False)
+
+    def _update_from_syncing(self, result):
+        if not result:
+            sync_status = GethSyncStatus(is_syncing=False)
+        else:
+            sync_status = GethSyncStatus(
+                is_syncing=True,
+                starting_block=self._parse_number(result.get('startingBlock')),
+                current_block=self._parse_number(result.get('currentBlock')),
+                highest_block=self._parse_number(result.get('highestBlock'))
+            )
+
+        with self._lock:
+            self._sync_status = sync_status
+
+    def _update_from_head(self, result):
+        head_number = self._parse_number(result.get('number'))
+        if head_number == UNKNOWN_VALUE:
+            return
+
+        with self._lock:
+            if self._sync_status is not None and self._sync_status.is_syncing:
+                highest_block = self._sync_status.highest_block
+                if type(highest_block) == int and head_number > highest_block:
+                    highest_block = head_number
+                self._sync_status = GethSyncStatus(
+                    is_syncing=True,
+                    starting_block=self._sync_status.starting_block,
+                    current_block=head_number,
+                    highest_block=highest_block
+                )
+
+    def _parse_number(self, value):
+        # Geth uses hex quantities in most places but plain numbers in syncing events
+        if isinstance(value, int):
+            return value
+        if not value:
+            return UNKNOWN_VALUE
+        try:
+            return int(value, 16)
+        except (TypeError, ValueError):
+            return UNKNOWN_VALUE
+
+class SyncProgressEstimator():
+    # Estimate the sync rate and the time remaining for a client from sampled progress. The rate
+    # is measured over a sliding window of samples and exponentially smoothed. Samples can be
+    # persisted so that estimates survive wizard restarts. The clients keep syncing while the
+    # wizard is not running so the last persisted sample is used as the start of the window for
+    # up to max_age. A stall is flagged when progress has not moved for a while.
+
+    def __init__(self, name: str, unit: str, save_directory: Optional[Path] = None,
+        window: float = 300.0, min_span: float = 10.0, smoothing: float = 0.2,
+        stall_after: float = 180.0, save_interval: float = 30.0,
+        max_age: float = SYNC_PROGRESS_MAX_AGE):
+
+        self.name = name
+        self.unit = unit
+        self.window = window
+        self.min_span = min_span
+        self.smoothing = smoothing
+        self.stall_after = stall_after
+        self.save_interval = save_interval
+        self.max_age = max_age
+
+        self.state_path = None
+        if save_directory is not None:
+            self.state_path = Path(save_directory, SYNC_PROGRESS_FILE.format(name=name))
+
+        self.rate = None
+        self.remaining = None
+        self.last_progress_time = None
+
+        self._samples = deque()
+        self._last_save_time = 0.0
+
+        self.load()
+
+    def add_sample(self, current, remaining, sample_time: Optional[float] = None) -> None:
+        # Add a progress sample. current is the current block or slot and remaining is how many
+        # blocks or slots are left to sync.
+
+        try:
+            current = int(current)
+            remaining = int(remaining)
+        except (TypeError, ValueError):
+            return
+
+        if sample_time is None:
+            sample_time = time.time()
+
+        if len(self._samples) > 0:
+            last_time, last_current = self._samples[-1]
+            if current < last_current:
+                # The client went backward (resync or reorg), start over
+                self._samples.clear()
+                self.rate = None
+            elif current > last_current:
+                self.last_progress_time = sample_time
+
+        if self.last_progress_time is None:
+            self.last_progress_time = sample_time
+
+        self._samples.append((sample_time, current))
+        self.remaining = remaining
+
+        # Keep the last sample older than the window as the start of the window so that the
+        # rate can be measured across a gap between samples
+        while len(self._samples) > 2 and sample_time - self._samples[1][0] >= self.window:
+            self._samples.popleft()
+
+        first_time, first_current = self._samples[0]
+        span = sample_time - first_time
+        if span >= self.min_span:
+            window_rate = (current - first_current) / span
+            if self.rate is None:
+                self.rate = window_rate
+            else:
+                self.rate = self.smoothing * window_rate + (1.0 - self.smoothing) * self.rate
+
+        if sample_time - self._last_save_time >= self.save_interval:
+            self.save()
+
+    def get_eta(self) -> Optional[timedelta]:
+        if self.remaining is None:
+            return None
+        if self.remaining <= 0:
+            return timedelta(0)
+        if self.rate is None or self.rate <= 0:
+            return None
+        return timedelta(seconds=self.remaining / self.rate)
+
+    def is_stalled(self, now: Optional[float] = None) -> bool:
+        if self.last_progress_time is None or self.remaining is None or self.remaining <= 0:
+            return False
+        if now is None:
+            now = time.time()
+        return now - self.last_progress_time > self.stall_after
+
+    def format_status(self) -> str:
+        # Return a status line for the progress dialogs or an empty string if we do not know
+        # enough yet
+
+        if self.rate is None:
+            return ''
+
+        status = f'Rate: {self.rate:.1f} {self.unit}/s'
+
+        if self.is_stalled():
+            stalled_td = timedelta(seconds=time.time() - self.last_progress_time)
+            return status + f', stalled for {humanize.naturaldelta(stalled_td)}'
+
+        eta = self.get_eta()
+        if eta is not None:
+            status = status + f', ETA: {humanize.naturaldelta(eta)}'
+
+        return status
+
+    def load(self) -> None:
+        if self.state_path is None or not self.state_path.is_file():
+            return
+
+        try:
+            with open(self.state_path, 'r', encoding='utf8') as input_file:
+                state = json.load(input_file)
+        except (OSError, ValueError):
+            return
+
+        now = time.time()
+        for sample_time, current in state.get('samples', []):
+            if now - sample_time <= self.max_age:
+                self._samples.append((sample_time, current))
+
+        if len(self._samples) > 0:
+            self.rate = state.get('rate')
+            self.last_progress_time = state.get('last_progress_time')
+
+    def save(self) -> None:
+        self._last_save_time = time.time()
+
+        if self.state_path is None:
+            return
+
+        state = {
+            'samples': list(self._samples),
+            'rate': self.rate,
+            'last_progress_time': self.last_progress_time
+        }
+
+        try:
+            with open(self.state_path, 'w', encoding='utf8') as output_file:
+                json.dump(state, output_file)
+        except OSError:
+            pass
+
+class PollingScheduler():
+    # Decide how long verification loops wait between probes. The interval backs off
+    # exponentially while progress is steady, whether the client keeps moving or stays put, and
+    # goes back to the minimum when we get close to a completion threshold or when the state
+    # changes: progress stalls or resumes, the syncing state flips or a service changes. Waiting is done in small slices so that we react right away when the
+    # dialog is exited or when the optional interrupt callable returns True. An optional
+    # on_tick callable, used to output logs, is called every tick_interval while waiting.
+
+    def __init__(self, get_exited: Callable[[], bool], min_interval: float = 1.0,
+        max_interval: float = 10.0, backoff_factor: float = 1.5, slice_interval: float = 0.1,
+        interrupt: Optional[Callable[[], bool]] = None, tick_interval: float = 0.5):
+
+        self.get_exited = get_exited
+        self.interrupt = interrupt
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.slice_interval = slice_interval
+        self.tick_interval = tick_interval
+
+        self.interval = min_interval
+
+        self._last_progress = None
+        self._last_moving = None
+        self._last_state = None
+
+    def wait(self, on_tick: Optional[Callable[[], None]] = None) -> bool:
+        # Wait for the current interval. Return False if the dialog was exited while waiting.
+
+        now = time.monotonic()
+        deadline = now + self.interval
+        next_tick = now + self.tick_interval
+        while True:
+            if self.get_exited():
+                return False
+            now = time.monotonic()
+            remaining = deadline - now
+            if remaining <= 0:
+                return True
+            if self.interrupt is not None and self.interrupt():
+                return True
+            if on_tick is not None and now >= next_tick:
+                on_tick()
+                next_tick = now + self.tick_interval
+            time.sleep(min(self.slice_interval, remaining))
+
+    def reset(self) -> None:
+        # Poll again quickly, for example after a service state change
+        self.interval = self.min_interval
+
+    def update(self, near_completion: bool, progress=None, state=None) -> None:
+        # progress is any value that changes when the client makes progress, like its head block
+        # or slot. state is any value describing the client state, like its syncing flag.
+
+        moving = (progress is not None and self._last_progress is not None and
+            progress != self._last_progress)
+        state_changed = self._last_moving is not None and (
+            moving != self._last_moving or state != self._last_state)
+
+        self._last_progress = progress
+        self._last_moving = moving
+        self._last_state = state
+
+        if near_completion or state_changed:
+            self.reset()
+        else:
+            self.interval = min(self.interval * self.backoff_factor, self.max_interval)
+
+def parse_prometheus_metrics(text: str) -> dict:
+    # Parse the Prometheus text exposition format. Return a dict of metric name to a list of
+    # (labels, value) tuples. Comments, type hints and timestamps are ignored.
+
+    metrics = {}
+
+    for line in text.splitlines():
+        line = line.strip()
+        if line == '' or line.startswith('#'):
+            continue
+
+        labels = {}
+        brace_index = line.find('{')
+        if brace_index != -1:
+            closing_index = line.rfind('}')
+            if closing_index < brace_index:
+                continue
+            name = line[:brace_index]
+            labels = _parse_prometheus_labels(line[brace_index + 1:closing_index])
+            remainder = line[closing_index + 1:].split()
+        else:
+            parts = line.split()
+            name = parts[0]
+            remainder = parts[1:]
+
+        if len(remainder) == 0:
+            continue
+
+        try:
+            value = float(remainder[0])
+        except ValueError:
+            continue
+
+        metrics.setdefault(name, []).append((labels, value))
+
+    return metrics
+
+def _parse_prometheus_labels(labels_text: str) -> dict:
+    labels = {}
+
+    index = 0
+    length = len(labels_text)
+    while index < length:
+        equal_index = labels_text.find('=', index)
+        if equal_index == -1:
+            break
+        label_name = labels_text[index:equal_index].strip().lstrip(',').strip()
+
+        # Label values are double quoted with backslash escapes
+        value_index = labels_text.find('"', equal_index)
+        if value_index == -1:
+            break
+        value_index = value_index + 1
+        value_chars = []
+        while value_index < length and labels_text[value_index] != '"':
+            if labels_text[value_index] == '\\' and value_index + 1 < length:
+                value_index = value_index + 1
+                escaped = labels_text[value_index]
+                value_chars.append('\n' if escaped == 'n' else escaped)
+            else:
+                value_chars.append(labels_text[value_index])
+            value_index = value_index + 1
+
+        labels[label_name] = ''.join(value_chars)
+        index = value_index + 1
+
+    return labels
+
+class MetricsScraper():
+    # Scrape a client Prometheus endpoint and extract the key series we care about. Values with
+    # multiple label sets are summed. CPU counters are turned into a usage percentage using the
+    # previous scrape.
+
+    def __init__(self, url: str, series: dict, timeout: float = 5.0):
+        self.url = url
+        self.series = series
+        self.timeout = timeout
+
+        self.error = None
+
+        self._previous_cpu = None
+
+    def scrape(self) -> Optional[dict]:
+        try:
+            response = httpx.get(self.url, timeout=self.timeout)
+        except httpx.RequestError as exception:
+            self.error = f'Exception: {exception} while scraping metrics from {self.url}.'
+            return None
+
+        if response.status_code != 200:
+            self.error = (f'Status code: {response.status_code} while scraping metrics from '
+                f'{self.url}.')
+            return None
+
+        self.error = None
+
+        metrics = parse_prometheus_metrics(response.text)
+        values = {}
+
+        for key, (metric_name, kind) in self.series.items():
+            if metric_name not in metrics:
+                continue
+
+            value = sum(sample_value for labels, sample_value in metrics[metric_name])
+
+            if kind == METRIC_KIND_CPU_SECONDS:
+                now = time.monotonic()
+                previous = self._previous_cpu
+                self._previous_cpu = (now, value)
+                if previous is None or now <= previous[0] or value < previous[1]:
+                    continue
+                value = (value - previous[1]) / (now - previous[0]) * 100.0
+
+            values[key] = value
+
+        return values
+
+    def format_status(self, values: Optional[dict], title: str = 'Metrics') -> str:
+        # Return a short summary of the scraped values or an empty string
+
+        if not values:
+            return ''
+
+        kinds = {key: kind for key, (metric_name, kind) in self.series.items()}
+        labels = {
+            'peers': 'Peers',
+            'head': 'Head',
+            'db_size': 'DB',
+            'cpu': 'CPU',
+            'memory': 'Memory'
+        }
+
+        parts = []
+        for key, label in labels.items():
+            if key not in values:
+                continue
+            value = values[key]
+            kind = kinds[key]
+            if kind == METRIC_KIND_BYTES:
+                parts.append(f'{label}: {humanize.naturalsize(value, binary=True)}')
+            elif kind in (METRIC_KIND_PERCENT, METRIC_KIND_CPU_SECONDS):
+                parts.append(f'{label}: {value:.0f}%')
+            else:
+                parts.append(f'{label}: {int(value)}')
+
+        if 'attestation_hits' in values and 'attestation_misses' in values:
+            hits = int(values['attestation_hits'])
+            total = hits + int(values['attestation_misses'])
+            if total > 0:
+                parts.append(f'Attestation hits: {hits}/{total}')
+
+        if len(parts) == 0:
+            return ''
+
+        return f'{title} - ' + ', '.join(parts)
+
+def get_bn_validators(base_url: str, public_keys: List[str], log,
+    batch_size: int = BN_VALIDATORS_BATCH_SIZE) -> Optional[dict]:
+    # Return the beacon node validator data for these public keys, by lowercase public key.
+    # Unknown public keys are missing from the result. Return None if the beacon node could not
+    # be queried.
+
+    validators = {}
+
+    with httpx.Client(base_url=base_url, timeout=30.0) as client:
+        for offset in range(0, len(public_keys), batch_size):
+            batch = public_keys[offset:offset + batch_size]
+
+            try:
+                response = client.get(BN_VALIDATORS_EP, params={'id': ','.join(batch)})
+            except httpx.RequestError as exception:
+                log.error(f'Cannot connect to the beacon node at {base_url}. '
+                    f'Exception: {exception}')
+                return None
+
+            if response.status_code != 200:
+                log.error(f'Unexpected status code from {base_url}{BN_VALIDATORS_EP}. Status '
+                    f'code: {response.status_code}')
+                return None
+
+            response_json = response.json()
+            if 'data' not in response_json or type(response_json['data']) is not list:
+                log.error(f'Unexpected JSON response from {base_url}{BN_VALIDATORS_EP}. data '
+                    f'not found.')
+                return None
+
+            for validator_data in response_json['data']:
+                try:
+                    public_key = validator_data['validator']['pubkey'].lower()
+                except (KeyError, TypeError, AttributeError):
+                    continue
+                validators[public_key] = validator_data
+
+    return validators
+
+def get_bn_activation_queue(base_url: str, log) -> Optional[int]:
+    # Return the number of validators waiting in the activation queue according to the beacon
+    # node. Return None if the beacon node could not be queried or if it is still syncing since
+    # its head state would not reflect the current queue.
+
+    with httpx.Client(base_url=base_url, timeout=30.0) as client:
+        try:
+            response = client.get(BN_SYNCING_EP)
+            if response.status_code != 200:
+                log.error(f'Unexpected status code from {base_url}{BN_SYNCING_EP}. Status '
+                    f'code: {response.status_code}')
+                return None
+            if response.json()['data']['is_syncing']:
+                return None
+
+            response = client.get(BN_VALIDATORS_EP, params={'status': 'pending_queued'})
+            if response.status_code != 200:
+                log.error(f'Unexpected status code from {base_url}{BN_VALIDATORS_EP}. Status '
+                    f'code: {response.status_code}')
+                return None
+            return len(response.json()['data'])
+        except httpx.RequestError as exception:
+            log.error(f'Cannot connect to the beacon node at {base_url}. Exception: {exception}')
+            return None
+        except (KeyError, TypeError, ValueError):
+            log.error(f'Unexpected JSON response from {base_url}.')
+            return None
+
+def get_validator_deposits(network: str, base_url: str, public_keys: List[str], log):
+    # Return the known deposits for these public keys. The local beacon node is queried first
+    # and beaconcha.in is only used for the public keys it does not know yet, which includes
+    # recent deposits the beacon node has not processed. Return False if the deposits could not
+    # be found.
+
+    bn_validators = get_bn_validators(base_url, public_keys, log)
+    if bn_validators is None:
+        log.warning('Unable to get validator(s) from the local beacon node. We will only use '
+            'beaconcha.in.')
+        bn_validators = {}
+
+    validator_deposits = []
+    missing_public_keys = []
+    status_count = {}
+
+    for public_key in public_keys:
+        validator_data = bn_validators.get(public_key.lower())
+        if validator_data is None:
+            missing_public_keys.append(public_key)
+            continue
+
+        status = validator_data.get('status', UNKNOWN_VALUE)
+        status_count[status] = status_count.get(status, 0) + 1
+        validator_deposits.append({
+            'publickey': public_key,
+            'validatorindex': validator_data.get('index'),
+            'status': status,
+            'source': 'beacon node'
+        })
+
+    if len(status_count) > 0:
+        log.info('Validator(s) known to the local beacon node: ' + ', '.join(
+            f'{count} {status}' for status, count in sorted(status_count.items())))
+
+    if len(missing_public_keys) == 0:
+        return validator_deposits
+
+    log.info(f'Looking up {len(missing_public_keys)} validator(s) unknown to the local beacon '
+        f'node on beaconcha.in')
+
+    bc_validator_deposits = get_bc_validator_deposits(network, missing_public_keys, log)
+    if type(bc_validator_deposits) is not list and not bc_validator_deposits:
+        return False
+
+    for deposit in bc_validator_deposits:
+        validator_deposits.append(dict(deposit, source='beaconcha.in'))
+
+    return validator_deposits
+
+@dataclass
+class RestartWindow():
+    start_slot: int
+    end_slot: int
+    start_time: float
+    end_time: float
+    has_sync_duty: bool = False
+
+    @property
+    def free_slots(self) -> int:
+        return self.end_slot - self.start_slot
+
+    def format(self) -> str:
+        start = time.strftime('%H:%M:%S', time.localtime(self.start_time))
+        end = time.strftime('%H:%M:%S', time.localtime(self.end_time))
+        return (f'slots {self.start_slot} to {self.end_slot - 1} ({start} - {end}, '
+            f'{self.free_slots} slots without duties)')
+
+def find_restart_window(base_url: str, public_keys: List[str], log,
+    min_slots: Optional[int] = None) -> Optional[RestartWindow]:
+    # Find the longest gap without proposer or attester duties for our validators in the
+    # current and next epoch. Duties further away are not known yet so the window ends at the
+    # end of the next epoch at the latest. Return None if the duties could not be queried or if
+    # the longest gap is shorter than min_slots, which defaults to the time needed to restart a
+    # service.
+
+    if min_slots is None:
+        min_slots = -(-int(SERVICE_RESTART_TIMEOUT) // SECONDS_PER_SLOT)
+
+    with httpx.Client(base_url=base_url, timeout=30.0) as client:
+        try:
+            response = client.get(BN_GENESIS_EP)
+            if response.status_code != 200:
+                log.error(f'Unexpected status code from {base_url}{BN_GENESIS_EP}. Status '
+                    f'code: {response.status_code}')
+                return None
+            genesis_time = int(response.json()['data']['genesis_time'])
+        except httpx.RequestError as exception:
+            log.error(f'Cannot connect to the beacon node at {base_url}. Exception: {exception}')
+            return None
+        except (KeyError, TypeError, ValueError):
+            log.error(f'Unexpected JSON response from {base_url}{BN_GENESIS_EP}.')
+            return None
+
+        validators = get_bn_validators(base_url, public_keys, log)
+        if validators is None:
+            return None
+
+        validator_indices = [str(validator_data['index'])
+            for validator_data in validators.values() if 'index' in validator_data]
+        our_public_keys = set(validators.keys())
+
+        now = time.time()
+        current_slot = int((now - genesis_time) // SECONDS_PER_SLOT)
+        current_epoch = current_slot // SLOTS_PER_EPOCH
+        horizon_slot = (current_epoch + 2) * SLOTS_PER_EPOCH
+
+        duty_slots = set()
+        has_sync_duty = False
+
+        if len(validator_indices) > 0:
+            try:
+                for epoch in (current_epoch, current_epoch + 1):
+                    response = client.get(BN_PROPOSER_DUTIES_EP.format(epoch=epoch))
+                    response.raise_for_status()
+                    for duty in response.json()['data']:
+                        if duty['pubkey'].lower() in our_public_keys:
+                            duty_slots.add(int(duty['slot']))
+
+                    response = client.post(BN_ATTESTER_DUTIES_EP.format(epoch=epoch),
+                        json=validator_indices)
+                    response.raise_for_status()
+                    for duty in response.json()['data']:
+                        duty_slots.add(int(duty['slot']))
+
+                    response = client.post(BN_SYNC_DUTIES_EP.format(epoch=epoch),
+                        json=validator_indices)
+                    response.raise_for_status()
+                    if len(response.json()['data']) > 0:
+                        has_sync_duty = True
+            except httpx.RequestError as exception:
+                log.error(f'Cannot connect to the beacon node at {base_url}. '
+                    f'Exception: {exception}')
+                return None
+            except httpx.HTTPStatusError as exception:
+                log.error(f'Unable to get validator duties from the beacon node. '
+                    f'Exception: {exception}')
+                return None
+            except (KeyError, TypeError, ValueError):
+                log.error('Unexpected validator duties response from the beacon node.')
+                return None
+
+    # Duties are performed during their slot so a gap starts on the slot after a duty
+
+    best_window = None
+
+    start_slot = current_slot
+    if current_slot in duty_slots:
+        start_slot = current_slot + 1
+
+    boundaries = sorted(slot for slot in duty_slots if slot >= start_slot) + [horizon_slot]
+    for end_slot in boundaries:
+        if best_window is None or end_slot - start_slot > best_window[1] - best_window[0]:
+            best_window = (start_slot, end_slot)
+        start_slot = max(start_slot, end_slot + 1)
+
+    start_slot, end_slot = best_window
+    if end_slot - start_slot < min_slots:
+        log.warning(f'The longest gap without validator duties is {end_slot - start_slot} '
+            f'slot(s), shorter than the {min_slots} slot(s) needed to restart a service.')
+        return None
+
+    start_time = max(genesis_time + start_slot * SECONDS_PER_SLOT, now)
+    end_time = genesis_time + end_slot * SECONDS_PER_SLOT
+
+    return RestartWindow(start_slot=start_slot, end_slot=end_slot, start_time=start_time,
+        end_time=end_time, has_sync_duty=has_sync_duty)
+
+class VersionStore():
+    # Keep the last verified versions of a client in a versioned directory. The active version
+    # is selected with a link, a symlink on Linux and a directory junction on Windows, so that
+    # switching to another version only takes a moment. Each version lives in its own
+    # directory under root and the link points to link_target inside that directory.
+
+    def __init__(self, root: Path, link_path: Path, link_target: str = '',
+        keep: int = VERSION_STORE_KEEP):
+
+        self.root = Path(root)
+        self.link_path = Path(link_path)
+        self.link_target = link_target
+        self.keep = keep
+
+    def get_version_path(self, version: str) -> Path:
+        return self.root.joinpath(version)
+
+    def get_versions(self) -> List[str]:
+        # Return the stored versions, most recently added first
+        if not self.root.is_dir():
+            return []
+
+        versions = []
+        with os.scandir(self.root) as it:
+            for diritem in it:
+                if diritem.name.startswith('.') or not diritem.is_dir(follow_symlinks=False):
+                    continue
+                versions.append((diritem.stat(follow_symlinks=False).st_mtime, diritem.name))
+
+        return [version for mtime, version in sorted(versions, reverse=True)]
+
+    def get_active_version(self) -> Optional[str]:
+        # Return the version the link points to or None if it does not point in the store
+        try:
+            target = Path(os.readlink(self.link_path))
+        except (OSError, ValueError):
+            return None
+
+        if not target.is_absolute():
+            target = self.link_path.parent.joinpath(target)
+
+        try:
+            relative_target = Path(os.path.normpath(target)).relative_to(
+                os.path.normpath(self.root))
+        except ValueError:
+            return None
+
+        if len(relative_target.parts) == 0:
+            return None
+
+        return relative_target.parts[0]
+
+    def get_rollback_versions(self) -> List[str]:
+        # Return the stored versions we can switch back to
+        active_version = self.get_active_version()
+        return [version for version in self.get_versions() if version != active_version]
+
+    def create_staging_directory(self) -> Path:
+        # Create a staging directory on the same filesystem as the stored versions so that
+        # adding a version is a simple rename
+        self.root.mkdir(parents=True, exist_ok=True)
+        return Path(tempfile.mkdtemp(prefix=VERSION_STORE_STAGING_PREFIX, dir=self.root))
+
+    def add_version(self, source_path: Path, version: str) -> Path:
+        # Move a verified version directory into the store
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        version_path = self.get_version_path(version)
+        if version_path.exists():
+            if version == self.get_active_version():
+                # Keep the active version in place and drop the new copy
+                shutil.rmtree(source_path, ignore_errors=True)
+                os.utime(version_path)
+                return version_path
+            shutil.rmtree(version_path)
+
+        os.replace(source_path, version_path)
+        os.utime(version_path)
+
+        return version_path
+
+    def adopt_installed(self, version: str) -> bool:
+        # Move an installed client that is not managed by the store yet into the store and
+        # replace it with a link
+        if not self.link_path.exists() or self.link_path.is_symlink() or self.is_junction():
+            return False
+
+        staging_path = self.create_staging_directory()
+        if self.link_target == '':
+            os.rmdir(staging_path)
+            shutil.move(str(self.link_path), str(staging_path))
+        else:
+            shutil.move(str(self.link_path), str(staging_path.joinpath(self.link_target)))
+
+        self.add_version(staging_path, version)
+        return self.activate(version)
+
+    def is_junction(self) -> bool:
+        if os.name != 'nt':
+            return False
+        try:
+            return bool(os.readlink(self.link_path)) and not self.link_path.is_symlink()
+        except (OSError, ValueError):
+            return False
+
+    def activate(self, version: str) -> bool:
+        # Point the link to this version
+        version_path = self.get_version_path(version)
+        if not version_path.is_dir():
+            return False
+
+        target = version_path
+        if self.link_target != '':
+            target = version_path.joinpath(self.link_target)
+
+        if os.name == 'nt':
+            # Directory junctions cannot be replaced atomically but removing one only takes a
+            # moment and it does not touch the target
+            if self.link_path.is_symlink() or self.is_junction():
+                os.rmdir(self.link_path)
+            process_result = subprocess.run([
+                'cmd', '/c', 'mklink', '/J', str(self.link_path), str(target)
+                ], capture_output=True, text=True)
+            return process_result.returncode == 0
+
+        temporary_link = self.link_path.with_name(f'.{self.link_path.name}.{os.getpid()}.link')
+        if temporary_link.is_symlink():
+            temporary_link.unlink()
+        os.symlink(target, temporary_link)
+        os.replace(temporary_link, self.link_path)
+
+        return True
+
+    def prune(self) -> List[str]:
+        # Remove the oldest versions beyond the ones we keep, never removing the active one
+        active_version = self.get_active_version()
+
+        removed = []
+        kept = 0
+        for version in self.get_versions():
+            if version == active_version or kept < self.keep - 1:
+                if version != active_version:
+                    kept = kept + 1
+                continue
+            shutil.rmtree(self.get_version_path(version), ignore_errors=True)
+            removed.append(version)
+
+        return removed
+
+SPARKLINE_CHARACTERS = '▁▂▃▄▅▆▇█'
+
+def format_sparkline(values: List[Optional[float]]) -> str:
+    # Return a sparkline for these values. Missing values are shown as spaces.
+
+    present_values = [value for value in values if value is not None]
+    if len(present_values) == 0:
+        return ''
+
+    minimum = min(present_values)
+    maximum = max(present_values)
+    scale = len(SPARKLINE_CHARACTERS) - 1
+
+    characters = []
+    for value in values:
+        if value is None:
+            characters.append(' ')
+        elif maximum == minimum:
+            characters.append(SPARKLINE_CHARACTERS[scale // 2])
+        else:
+            characters.append(
+                SPARKLINE_CHARACTERS[round((value - minimum) / (maximum - minimum) * scale)])
+
+    return ''.join(characters)
+
+class HealthHistory():
+    # Local time series store for node health values in a small SQLite file. Raw samples are
+    # kept for a short while and downsampled into hourly buckets as they are recorded, which are
+    # kept much longer. Text values like versions are only stored when they change. Each call
+    # opens its own connection so it can be used from verification loop threads and from the
+    # background monitor at the same time.
+
+    def __init__(self, save_directory: Optional[Path],
+        record_interval: float = HEALTH_HISTORY_RECORD_INTERVAL,
+        raw_retention: float = HEALTH_HISTORY_RAW_RETENTION,
+        hourly_retention: float = HEALTH_HISTORY_HOURLY_RETENTION):
+
+        self.record_interval = record_interval
+        self.raw_retention = raw_retention
+        self.hourly_retention = hourly_retention
+
+        self.path = None
+        if save_directory is not None:
+            self.path = Path(save_directory, HEALTH_HISTORY_FILE)
+
+        self.error = None
+
+        self._last_recorded = {}
+        self._last_prune = 0.0
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(str(self.path), timeout=5.0)
+        if not self._initialized:
+            connection.executescript(
+                '''
+                CREATE TABLE IF NOT EXISTS samples (
+                    series TEXT NOT NULL,
+                    timestamp REAL NOT NULL,
+                    value REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS samples_series_timestamp
+                    ON samples (series, timestamp);
+                CREATE TABLE IF NOT EXISTS hourly (
+                    series TEXT NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    total REAL NOT NULL,
+                    count INTEGER NOT NULL,
+                    minimum REAL NOT NULL,
+                    maximum REAL NOT NULL,
+                    PRIMARY KEY (series, bucket)
+                );
+                CREATE TABLE IF NOT EXISTS changes (
+                    series TEXT NOT NULL,
+                    timestamp REAL NOT NULL,
+                    value TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS changes_series_timestamp
+                    ON changes (series, timestamp);
+                ''')
+            self._initialized = True
+        return connection
+
+    def record(self, values: dict, timestamp: Optional[float] = None) -> bool:
+        # Record numeric values by series name. Values recorded less than record_interval
+        # seconds after the previous one for the same series are skipped.
+
+        if self.path is None:
+            return False
+
+        if timestamp is None:
+            timestamp = time.time()
+
+        rows = []
+        for series, value in values.items():
+            if value is None or isinstance(value, bool):
+                continue
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                continue
+            last_recorded = self._last_recorded.get(series)
+            if last_recorded is not None and timestamp - last_recorded < self.record_interval:
+                continue
+            rows.append((series, timestamp, value))
+
+        if len(rows) == 0:
+            return True
+
+        bucket = int(timestamp // 3600)
+
+        try:
+            connection = self._connect()
+            try:
+                with connection:
+                    connection.executemany(
+                        'INSERT INTO samples (series, timestamp, value) VALUES (?, ?, ?)', rows)
+                    connection.executemany(
+                        '''
+                        INSERT INTO hourly (series, bucket, total, count, minimum, maximum)
+                        VALUES (?, ?, ?, 1, ?, ?)
+                        ON CONFLICT (series, bucket) DO UPDATE SET
+                            total = total + excluded.total,
+                            count = count + 1,
+                            minimum = MIN(minimum, excluded.minimum),
+                            maximum = MAX(maximum, excluded.maximum)
+                        ''',
+                        [(series, bucket, value, value, value) for series, _, value in rows])
+                    if timestamp - self._last_prune > 3600:
+                        self._prune(connection, timestamp)
+            finally:
+                connection.close()
+        except sqlite3.Error as exception:
+            self.error = f'Unable to record health history. Exception: {exception}'
+            return False
+
+        for series, _, _ in rows:
+            self._last_recorded[series] = timestamp
+
+        return True
+
+    def record_change(self, series: str, value: str, timestamp: Optional[float] = None) -> bool:
+        # Record a text value like a version only when it differs from the last one
+
+        if self.path is None or value is None:
+            return False
+
+        if timestamp is None:
+            timestamp = time.time()
+
+        try:
+            connection = self._connect()
+            try:
+                with connection:
+                    row = connection.execute(
+                        '''
+                        SELECT value FROM changes WHERE series = ?
+                        ORDER BY timestamp DESC LIMIT 1
+                        ''', (series, )).fetchone()
+                    if row is None or row[0] != str(value):
+                        connection.execute(
+                            'INSERT INTO changes (series, timestamp, value) VALUES (?, ?, ?)',
+                            (series, timestamp, str(value)))
+            finally:
+                connection.close()
+        except sqlite3.Error as exception:
+            self.error = f'Unable to record health history. Exception: {exception}'
+            return False
+
+        return True
+
+    def _prune(self, connection: sqlite3.Connection, now: float) -> None:
+        connection.execute('DELETE FROM samples WHERE timestamp < ?',
+            (now - self.raw_retention, ))
+        connection.execute('DELETE FROM hourly WHERE bucket < ?',
+            (int((now - self.hourly_retention) // 3600), ))
+        self._last_prune = now
+
+    def get_hourly(self, series: str, hours: int = 24,
+        now: Optional[float] = None) -> List[Optional[float]]:
+        # Return the hourly averages for the last hours, oldest first. Hours without samples are
+        # None.
+
+        if self.path is None or not self.path.is_file():
+            return []
+
+        if now is None:
+            now = time.time()
+
+        last_bucket = int(now // 3600)
+        first_bucket = last_bucket - hours + 1
+
+        try:
+            connection = self._connect()
+            try:
+                rows = connection.execute(
+                    '''
+                    SELECT bucket, total / count FROM hourly
+                    WHERE series = ? AND bucket >= ? AND bucket <= ?
+                    ''', (series, first_bucket, last_bucket)).fetchall()
+            finally:
+                connection.close()
+        except sqlite3.Error as exception:
+            self.error = f'Unable to read health history. Exception: {exception}'
+            return []
+
+        averages = dict(rows)
+        return [averages.get(bucket) for bucket in range(first_bucket, last_bucket + 1)]
+
+    def get_changes(self, series: str, since: Optional[float] = None) -> List[tuple]:
+        # Return the (timestamp, value) changes for a text series, oldest first
+
+        if self.path is None or not self.path.is_file():
+            return []
+
+        if since is None:
+            since = 0.0
+
+        try:
+            connection = self._connect()
+            try:
+                return connection.execute(
+                    '''
+                    SELECT timestamp, value FROM changes
+                    WHERE series = ? AND timestamp >= ? ORDER BY timestamp
+                    ''', (series, since)).fetchall()
+            finally:
+                connection.close()
+        except sqlite3.Error as exception:
+            self.error = f'Unable to read health history. Exception: {exception}'
+            return []
+
+    def format_trend(self, series: str, label: str, hours: int = 24,
+        formatter: Optional[Callable[[float], str]] = None) -> str:
+        # Return a sparkline trend line for a series or an empty string without history
+
+        if formatter is None:
+            formatter = lambda value: f'{value:.0f}'
+
+        values = self.get_hourly(series, hours)
+        present_values = [value for value in values if value is not None]
+        if len(present_values) == 0:
+            return ''
+
+        return (f'{label}: {format_sparkline(values)} '
+            f'({formatter(present_values[0])} → {formatter(present_values[-1])})')
@@ -2,21 +2,45 @@ import sys
 import json
 import subprocess
 import re
+import queue
+import threading
+import time
+import tempfile
+import os
+import shutil
+import signal
+import socket
+import struct
 
 import logging
 import logging.handlers
 
+from dataclasses import dataclass
+
+from datetime import datetime
+
 from pathlib import Path
 
-from typing import Optional
+from typing import Optional, List
 
 from ethwizard import __version__
 
 from ethwizard.constants import (
     LINUX_SAVE_DIRECTORY,
-    STATE_FILE
+    STATE_FILE,
+    APT_SOURCES_PARTS_DIRECTORY,
+    APT_LISTS_DIRECTORY,
+    APT_LISTS_STAMP_FILE,
+    PROCESS_KILL_TIMEOUT,
+    SYSTEMD_UNIT_SUFFIXES,
+    DBUS_SYSTEM_BUS_SOCKET,
+    DBUS_TIMEOUT,
+    LIGHTHOUSE_INSTALLED_PATH,
+    LIGHTHOUSE_VERSIONS_DIRECTORY
 )
 
+from ethwizard.platforms.common import VersionStore
+
 log = logging.getLogger(__name__)
 
 def save_state(step_id: str, context: dict) -> bool:
@@ -37,6 +61,15 @@ def save_state(step_id: str, context: dict) -> bool:
 
     return True
 
+def get_save_directory() -> Optional[Path]:
+    # Return the directory where we can save files for the wizard
+
+    save_directory = Path(LINUX_SAVE_DIRECTORY)
+    if not save_directory.is_dir():
+        save_directory.mkdir(parents=True, exist_ok=True)
+
+    return save_directory
+
 def load_state() -> Optional[dict]:
     # Load wizard state
 
@@ -89,30 +122,311 @@ def init_logging():
 
     log.info(f'Starting eth-wizard version {__version__}')
 
+SYSTEMD_SERVICE_PROPERTIES = ('Description', 'LoadState', 'ActiveState', 'ExecMainStartTimestamp',
+    'FragmentPath', 'UnitFilePreset', 'SubState', 'ExecStart')
+
 def get_systemd_service_details(service):
     # Return some systemd service details
     
-    properties = ('Description', 'LoadState', 'ActiveState', 'ExecMainStartTimestamp',
-        'FragmentPath', 'UnitFilePreset', 'SubState', 'ExecStart')
+    return get_systemd_services_details([service])[service]
+
+def normalize_systemd_unit_name(unit):
+    # Add the .service suffix like systemctl does when a unit name has no unit type suffix
+    if unit.endswith(SYSTEMD_UNIT_SUFFIXES):
+        return unit
+    return unit + '.service'
+
+def get_systemd_services_details(services, properties=SYSTEMD_SERVICE_PROPERTIES):
+    # Return some systemd services details for multiple services with a single systemctl call.
+    # The details are keyed by the service names as they were given.
+
+    unit_names = [normalize_systemd_unit_name(service) for service in services]
 
     process_result = subprocess.run([
-        'systemctl', 'show', service,
-        '--property=' + ','.join(properties)
+        'systemctl', 'show', *unit_names,
+        '--property=' + ','.join(('Id', 'Names') + tuple(properties))
         ], capture_output=True, text=True)
     process_output = process_result.stdout
 
-    service_details = {}
+    # systemctl outputs one block of properties per unit separated by empty lines. Blocks are
+    # matched to units by their Id or, for aliases, by their Names.
+    blocks = []
+    current_block = {}
+    for line in process_output.splitlines():
+        if line.strip() == '':
+            if len(current_block) > 0:
+                blocks.append(current_block)
+                current_block = {}
+            continue
+        sproperty, separator, value = line.partition('=')
+        if separator:
+            current_block[sproperty] = value.strip()
+    if len(current_block) > 0:
+        blocks.append(current_block)
 
-    for sproperty in properties:
-        result = re.search(re.escape(sproperty) + r'=(.*?)\n', process_output)
-        if result:
-            service_details[sproperty] = result.group(1).strip()
-    
-    for sproperty in properties:
-        if sproperty not in service_details:
-            service_details[sproperty] = 'unknown'
+    blocks_by_name = {}
+    for block in blocks:
+        for name in block.get('Names', '').split() + [block.get('Id')]:
+            if name:
+                blocks_by_name[name] = block
+
+    services_details = {}
+
+    for service, unit_name in zip(services, unit_names):
+        block = blocks_by_name.get(unit_name, {})
+        services_details[service] = {sproperty: block.get(sproperty, 'unknown')
+            for sproperty in properties}
+
+    return services_details
+
+def escape_systemd_bus_path(unit):
+    # Escape a unit name the way systemd does for its D-Bus object paths
+    # (geth.service -> geth_2eservice)
+
+    escaped = []
+    for index, char in enumerate(unit):
+        if char.isascii() and (char.isalpha() or (char.isdigit() and index > 0)):
+            escaped.append(char)
+        else:
+            escaped.append('_{:02x}'.format(ord(char)))
+
+    return '/org/freedesktop/systemd1/unit/' + ''.join(escaped)
+
+def dbus_method_call_message(serial, destination, path, interface, member):
+    # Return a little endian D-Bus method call message without arguments
+
+    fields = bytearray()
+    for code, signature, value in ((1, 'o', path), (2, 's', interface), (3, 's', member),
+        (6, 's', destination)):
+        # Header fields are (byte, variant) structs aligned on 8 bytes. They start at offset 16
+        # so alignment relative to the fields is the same as in the message.
+        fields.extend(b'\x00' * (-len(fields) % 8))
+        fields.extend(bytes([code, 1]) + signature.encode() + b'\x00')
+        fields.extend(b'\x00' * (-len(fields) % 4))
+        encoded = value.encode()
+        fields.extend(struct.pack('<I', len(encoded)) + encoded + b'\x00')
+
+    message = struct.pack('<cBBBIII', b'l', 1, 0, 1, 0, serial, len(fields)) + fields
+    return message + b'\x00' * (-len(message) % 8)
+
+def dbus_read_message_type(connection):
+    # Read a whole D-Bus message and return its type
+
+    def read_exactly(size):
+        data = b''
+        while len(data) < size:
+            chunk = connection.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError('D-Bus connection closed')
+            data = data + chunk
+        return data
+
+    header = read_exactly(16)
+    byte_order = '<' if header[0:1] == b'l' else '>'
+    body_length, serial, fields_length = struct.unpack(byte_order + 'III', header[4:16])
+    read_exactly(fields_length + (-fields_length % 8) + body_length)
+    return header[1]
+
+def subscribe_systemd_manager(bus_socket=DBUS_SYSTEM_BUS_SOCKET):
+    # Subscribe to the systemd manager so that it emits the units PropertiesChanged signals.
+    # systemd drops the subscription when the subscriber disconnects, so a one shot busctl call
+    # is not enough. Return the connection that must stay open for as long as we watch, or None
+    # if we could not subscribe.
+
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.settimeout(DBUS_TIMEOUT)
+    try:
+        connection.connect(bus_socket)
+        connection.sendall(b'\x00AUTH EXTERNAL ' + str(os.getuid()).encode().hex().encode() +
+            b'\r\n')
+
+        response = b''
+        while not response.endswith(b'\r\n'):
+            chunk = connection.recv(256)
+            if not chunk:
+                raise ConnectionError('D-Bus connection closed during authentication')
+            response = response + chunk
+        if not response.startswith(b'OK'):
+            raise ConnectionError(f'D-Bus authentication failed: {response.strip()}')
+
+        connection.sendall(b'BEGIN\r\n' +
+            dbus_method_call_message(1, 'org.freedesktop.DBus', '/org/freedesktop/DBus',
+                'org.freedesktop.DBus', 'Hello') +
+            dbus_method_call_message(2, 'org.freedesktop.systemd1', '/org/freedesktop/systemd1',
+                'org.freedesktop.systemd1.Manager', 'Subscribe'))
+
+        # The bus replies to Hello before it forwards Subscribe to systemd. Signals like
+        # NameAcquired can come in between.
+        replies = []
+        while len(replies) < 2:
+            message_type = dbus_read_message_type(connection)
+            if message_type in (2, 3):
+                replies.append(message_type)
+        if replies[1] != 2:
+            raise ConnectionError('systemd refused the Subscribe call')
+    except (OSError, struct.error) as exception:
+        log.warning(f'Unable to subscribe to the systemd manager. Exception: {exception}')
+        connection.close()
+        return None
+
+    return connection
+
+class SystemdUnitWatcher():
+    # Watch systemd units state changes. Changes are received from the systemd manager
+    # PropertiesChanged D-Bus signals through busctl monitor. systemd only emits those signals
+    # while some client is subscribed to the manager, so we subscribe for as long as we watch.
+    # The units state is also polled with a single batched systemctl call, every poll_interval
+    # seconds when we could not subscribe or every subscribed_poll_interval seconds otherwise.
+
+    def __init__(self, units: List[str], poll_interval: float = 5.0,
+        subscribed_poll_interval: float = 60.0):
+        self.units = [normalize_systemd_unit_name(unit) for unit in units]
+        self.poll_interval = poll_interval
+        self.subscribed_poll_interval = subscribed_poll_interval
+
+        self.changes = queue.Queue()
+        self.error = None
+
+        self._states = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._process = None
+        self._subscription = None
+        self._threads = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.stop()
+
+    def start(self):
+        self._stop_event.clear()
+
+        # Initial state
+        self._poll_states()
 
-    return service_details
+        command = ['busctl', '--system', 'monitor', '--json=short']
+        for unit in self.units:
+            command.append(f"--match=type='signal',interface='org.freedesktop.DBus.Properties',"
+                f"member='PropertiesChanged',path='{escape_systemd_bus_path(unit)}'")
+
+        try:
+            self._process = subprocess.Popen(command, stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL, text=True, bufsize=1)
+        except OSError as exception:
+            self.error = f'Unable to start busctl to watch units. Exception: {exception}'
+            self._process = None
+
+        if self._process is not None:
+            self._subscription = subscribe_systemd_manager()
+
+            monitor_thread = threading.Thread(target=self._read_signals, daemon=True)
+            monitor_thread.start()
+            self._threads.append(monitor_thread)
+
+        poll_thread = threading.Thread(target=self._poll_loop, daemon=True)
+        poll_thread.start()
+        self._threads.append(poll_thread)
+
+    def stop(self):
+        self._stop_event.set()
+
+        if self._process is not None:
+            if self._process.poll() is None:
+                self._process.terminate()
+                try:
+                    self._process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    self._process.kill()
+                    self._process.wait()
+            self._process = None
+
+        if self._subscription is not None:
+            self._subscription.close()
+            self._subscription = None
+
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
+
+    def get_states(self) -> dict:
+        # Return the latest known (ActiveState, SubState) for each unit
+        with self._lock:
+            return dict(self._states)
+
+    def has_changes(self) -> bool:
+        return not self.changes.empty()
+
+    def get_changes(self) -> List[tuple]:
+        # Return the (unit, ActiveState, SubState) changes since the last call
+        changes = []
+        while True:
+            try:
+                changes.append(self.changes.get_nowait())
+            except queue.Empty:
+                break
+        return changes
+
+    def _update_state(self, unit, active_state, sub_state):
+        with self._lock:
+            previous = self._states.get(unit)
+            if previous is not None:
+                if active_state is None:
+                    active_state = previous[0]
+                if sub_state is None:
+                    sub_state = previous[1]
+            new_state = (active_state, sub_state)
+            if previous == new_state:
+                return
+            self._states[unit] = new_state
+
+        if previous is not None:
+            self.changes.put((unit, active_state, sub_state))
+
+    def _poll_states(self):
+        services_details = get_systemd_services_details(self.units,
+            properties=('ActiveState', 'SubState'))
+        for unit, details in services_details.items():
+            self._update_state(unit, details['ActiveState'], details['SubState'])
+
+    def _poll_loop(self):
+        while True:
+            poll_interval = self.poll_interval
+            if self._subscription is not None:
+                poll_interval = self.subscribed_poll_interval
+            if self._stop_event.wait(poll_interval):
+                break
+            self._poll_states()
+
+    def _read_signals(self):
+        paths = {escape_systemd_bus_path(unit): unit for unit in self.units}
+
+        for line in self._process.stdout:
+            if self._stop_event.is_set():
+                break
+
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+
+            unit = paths.get(message.get('path'))
+            if unit is None:
+                continue
+
+            payload_data = message.get('payload', {}).get('data', [])
+            if len(payload_data) < 2 or payload_data[0] != 'org.freedesktop.systemd1.Unit':
+                continue
+
+            changed = payload_data[1]
+            active_state = changed.get('ActiveState', {}).get('data')
+            sub_state = changed.get('SubState', {}).get('data')
+            if active_state is None and sub_state is None:
+                continue
+
+            self._update_state(unit, active_state, sub_state)
 
 def is_package_installed(package):
     process_result = subprocess.run(['apt', '-qq', 'list', '--installed', package],
@@ -128,4 +442,386 @@ def is_package_installed(package):
     result = re.search(re.escape(package) + r'/', process_output)
     package_is_installed = result is not None
 
-    return package_is_installed
\ No newline at end of file
+    return package_is_installed
+
+def get_apt_sources(source_glob: str) -> List[Path]:
+    # Return the apt source files in sources.list.d matching a glob pattern
+
+    sources_directory = Path(APT_SOURCES_PARTS_DIRECTORY)
+    if not sources_directory.is_dir():
+        return []
+
+    return sorted(
+        path for path in sources_directory.glob(source_glob)
+        if path.suffix in ('.list', '.sources') and path.is_file()
+    )
+
+def get_apt_lists_stamp_path(stamp_name: str) -> Path:
+    # Return the path of the stamp file we write after refreshing some apt lists. apt sets the
+    # list files modification time to the server Last-Modified header so we cannot use them to
+    # know when the lists were refreshed.
+
+    return get_save_directory().joinpath(APT_LISTS_STAMP_FILE.format(name=stamp_name))
+
+def get_apt_lists_age(stamp_name: str) -> Optional[float]:
+    # Return the age in seconds of our last successful refresh of some apt lists or None if we
+    # never refreshed them
+
+    try:
+        stamp_mtime = get_apt_lists_stamp_path(stamp_name).stat().st_mtime
+    except OSError:
+        return None
+
+    return max(time.time() - stamp_mtime, 0.0)
+
+def write_apt_lists_stamp(stamp_name: str) -> None:
+    # Record that some apt lists were just refreshed
+
+    try:
+        get_apt_lists_stamp_path(stamp_name).write_text(f'{time.time()}\n')
+    except OSError as exception:
+        log.warning(f'Unable to write the apt lists stamp file. Exception: {exception}')
+
+def run_process_group(command: List[str], timeout: Optional[float] = None) -> Optional[int]:
+    # Run a command in its own process group and return its return code. When it does not
+    # finish within timeout, the whole group is terminated, then killed, so that no child such
+    # as an apt method keeps running or holding a lock, and None is returned.
+
+    process = subprocess.Popen(command, start_new_session=True)
+    try:
+        return process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        log.error(f'{command[0]} did not finish within {timeout} seconds. Stopping it.')
+
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=PROCESS_KILL_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+    except ProcessLookupError:
+        pass
+
+    return None
+
+def update_apt_sources(sources: List[Path], stamp_name: Optional[str] = None,
+    timeout: Optional[float] = None) -> bool:
+    # Update the apt lists for only some sources without touching the other sources or lists.
+    # The stamp file for stamp_name is written when the update succeeds. The update is stopped
+    # if it takes longer than timeout.
+
+    if len(sources) == 0:
+        return False
+
+    with tempfile.TemporaryDirectory() as parts_directory:
+        # apt only reads deb822 .sources files from a source parts directory so we use a
+        # temporary one that only contains the sources we want to update.
+        for source in sources:
+            os.symlink(source, Path(parts_directory, source.name))
+
+        returncode = run_process_group([
+            'apt-get', '-q', 'update',
+            '-o', 'Dir::Etc::sourcelist=/dev/null',
+            '-o', f'Dir::Etc::sourceparts={parts_directory}',
+            '-o', 'APT::Get::List-Cleanup=0'
+        ], timeout=timeout)
+
+    if returncode is None:
+        return False
+
+    if returncode != 0:
+        log.error(f'Unexpected return code from apt-get update. Return code: {returncode}')
+        return False
+
+    if stamp_name is not None:
+        write_apt_lists_stamp(stamp_name)
+
+    return True
+
+def get_dpkg_architecture() -> Optional[str]:
+    process_result = subprocess.run(['dpkg', '--print-architecture'], capture_output=True,
+        text=True)
+
+    if process_result.returncode != 0:
+        return None
+
+    return process_result.stdout.strip()
+
+def get_apt_lists_package_versions(lists_glob: str, package: str) -> List[str]:
+    # Return all the versions of a package found in the apt Packages lists matching a glob
+    # pattern for the current architecture
+
+    lists_directory = Path(APT_LISTS_DIRECTORY)
+    if not lists_directory.is_dir():
+        return []
+
+    architecture = get_dpkg_architecture()
+
+    versions = []
+
+    for path in lists_directory.glob(lists_glob):
+        if not path.name.endswith('_Packages'):
+            continue
+        if architecture is not None and not (
+            path.name.endswith(f'_binary-{architecture}_Packages') or
+            path.name.endswith('_binary-all_Packages')):
+            continue
+
+        try:
+            with open(path, 'r', encoding='utf8', errors='replace') as packages_file:
+                # Packages files are made of stanzas separated by empty lines
+                stanza_package = None
+                for line in packages_file:
+                    if line.startswith('Package:'):
+                        stanza_package = line[len('Package:'):].strip()
+                    elif line.startswith('Version:') and stanza_package == package:
+                        versions.append(line[len('Version:'):].strip())
+                    elif line.strip() == '':
+                        stanza_package = None
+        except OSError as exception:
+            log.warning(f'Unable to read apt list {path}. Exception: {exception}')
+
+    return versions
+
+@dataclass
+class JournalEntry():
+    message: str
+    priority: int
+    timestamp: datetime
+    identifier: str
+    pid: str
+    hostname: str
+    cursor: str
+
+    def format(self) -> str:
+        # Format the entry like the default journalctl short output
+        return (f'{self.timestamp.strftime("%b %d %H:%M:%S")} {self.hostname} '
+            f'{self.identifier}[{self.pid}]: {self.message}')
+
+class JournalFollower():
+    # Follow the journal of a systemd unit with a single long-lived journalctl process. Entries
+    # are parsed from the JSON output in a reader thread and pushed into a thread-safe queue
+    # that can be drained from any other thread.
+
+    def __init__(self, unit: str, lines: int = 25, max_queued_entries: int = 10000):
+        self.unit = unit
+        self.lines = lines
+        self.entries = queue.Queue(maxsize=max_queued_entries)
+        self.last_cursor = None
+        self.error = None
+        self._process = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.stop()
+
+    def start(self) -> bool:
+        if self._process is not None:
+            return True
+
+        command = ['journalctl', '--no-pager', '-q', '-f', '-o', 'json', '-n', str(self.lines),
+            '-u', self.unit]
+
+        try:
+            self._process = subprocess.Popen(command, stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL, text=True, encoding='utf8', errors='replace')
+        except OSError as exception:
+            self.error = f'Exception: {exception} while calling journalctl.'
+            return False
+
+        self._thread = threading.Thread(target=self._read_entries, daemon=True)
+        self._thread.start()
+
+        return True
+
+    def stop(self):
+        if self._process is None:
+            return
+
+        if self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+
+        self._thread.join(timeout=5)
+        self._process = None
+        self._thread = None
+
+    def get_entries(self, max_priority: Optional[int] = None,
+        since: Optional[datetime] = None) -> List[JournalEntry]:
+        # Drain all the queued entries. max_priority keeps entries with a priority number lower
+        # or equal to it (0 is emergency, 7 is debug).
+
+        entries = []
+
+        while True:
+            try:
+                entry = self.entries.get_nowait()
+            except queue.Empty:
+                break
+
+            if max_priority is not None and entry.priority > max_priority:
+                continue
+            if since is not None and entry.timestamp < since:
+                continue
+
+            entries.append(entry)
+
+        return entries
+
+    def get_text(self, max_priority: Optional[int] = None,
+        since: Optional[datetime] = None) -> str:
+        # Drain all the queued entries and format them as text
+
+        entries = self.get_entries(max_priority=max_priority, since=since)
+        return '\n'.join(entry.format() for entry in entries)
+
+    def _read_entries(self):
+        process = self._process
+
+        for line in process.stdout:
+            entry = self._parse_entry(line)
+            if entry is None:
+                continue
+
+            self.last_cursor = entry.cursor
+
+            try:
+                self.entries.put_nowait(entry)
+            except queue.Full:
+                # Drop the oldest entry to make room for the newest one
+                try:
+                    self.entries.get_nowait()
+                except queue.Empty:
+                    pass
+                self.entries.put_nowait(entry)
+
+        returncode = process.wait()
+        if returncode not in (0, -15):
+            self.error = f'Return code: {returncode} while calling journalctl.'
+
+    def _parse_entry(self, line: str) -> Optional[JournalEntry]:
+        try:
+            fields = json.loads(line)
+        except ValueError:
+            return None
+
+        if not isinstance(fields, dict):
+            return None
+
+        message = fields.get('MESSAGE', '')
+        if isinstance(message, list):
+            # Non-UTF8 messages are serialized as an array of bytes
+            message = bytes(message).decode('utf8', errors='replace')
+        elif message is None:
+            message = ''
+
+        try:
+            priority = int(fields.get('PRIORITY', 6))
+        except (TypeError, ValueError):
+            priority = 6
+
+        try:
+            timestamp = datetime.fromtimestamp(int(fields['__REALTIME_TIMESTAMP']) / 1000000.0)
+        except (KeyError, TypeError, ValueError):
+            timestamp = datetime.now()
+
+        return JournalEntry(
+            message=message.rstrip(),
+            priority=priority,
+            timestamp=timestamp,
+            identifier=fields.get('SYSLOG_IDENTIFIER', fields.get('_COMM', self.unit)),
+            pid=fields.get('_PID', fields.get('SYSLOG_PID', '')),
+            hostname=fields.get('_HOSTNAME', ''),
+            cursor=fields.get('__CURSOR', '')
+        )
+
+def get_lighthouse_version_store() -> VersionStore:
+    # Return the store for the installed Lighthouse versions
+    return VersionStore(Path(LIGHTHOUSE_VERSIONS_DIRECTORY), Path(LIGHTHOUSE_INSTALLED_PATH),
+        'lighthouse')
+
+def get_lighthouse_binary_version(binary_path) -> Optional[str]:
+    # Return the version of this Lighthouse binary or None if it does not run properly
+
+    try:
+        process_result = subprocess.run([binary_path, '--version'], capture_output=True,
+            text=True)
+    except OSError:
+        return None
+
+    result = re.search(r'Lighthouse v?(?P<version>[^-\s]+)', process_result.stdout)
+    if process_result.returncode != 0 or not result:
+        return None
+
+    return result.group('version')
+
+def install_lighthouse_release(archive_path, expected_version=None) -> Optional[str]:
+    # Extract the Lighthouse binary from a release archive into the version store, make sure it
+    # runs and make it the active version. The installed binary is only replaced at the very end
+    # with an atomic link switch. Return the installed version or None if it failed.
+
+    store = get_lighthouse_version_store()
+
+    try:
+        staging_directory = store.create_staging_directory()
+    except OSError as exception:
+        log.error(f'Unable to create a staging directory for Lighthouse. Exception: {exception}')
+        return None
+
+    log.info('Extracting Lighthouse binary...')
+    process_result = subprocess.run([
+        'tar', 'xf', archive_path, '--directory', staging_directory])
+
+    staged_binary_path = staging_directory.joinpath('lighthouse')
+
+    if process_result.returncode != 0 or not staged_binary_path.is_file():
+        log.error('Unable to extract the Lighthouse binary from its archive.')
+        shutil.rmtree(staging_directory, ignore_errors=True)
+        return None
+
+    staged_binary_path.chmod(0o755)
+
+    staged_version = get_lighthouse_binary_version(staged_binary_path)
+    if staged_version is None:
+        log.error('The new Lighthouse binary does not run properly.')
+        shutil.rmtree(staging_directory, ignore_errors=True)
+        return None
+
+    if expected_version is not None and staged_version != expected_version.lstrip('v'):
+        log.error(f'The new Lighthouse binary version is {staged_version} while we expected '
+            f'{expected_version}.')
+        shutil.rmtree(staging_directory, ignore_errors=True)
+        return None
+
+    try:
+        # Keep a binary installed before we managed versions so we can roll back to it
+        installed_path = Path(LIGHTHOUSE_INSTALLED_PATH)
+        if installed_path.is_file() and not installed_path.is_symlink():
+            installed_version = get_lighthouse_binary_version(installed_path)
+            if installed_version is not None and installed_version != staged_version:
+                store.adopt_installed(installed_version)
+
+        store.add_version(staging_directory, staged_version)
+        if not store.activate(staged_version):
+            log.error(f'Unable to activate Lighthouse version {staged_version}.')
+            return None
+    except OSError as exception:
+        log.error(f'Unable to install Lighthouse version {staged_version}. '
+            f'Exception: {exception}')
+        shutil.rmtree(staging_directory, ignore_errors=True)
+        return None
+
+    for removed_version in store.prune():
+        log.info(f'Removed old Lighthouse version {removed_version}.')
+
+    log.info(f'Lighthouse version {staged_version} is installed.')
+
+    return staged_version
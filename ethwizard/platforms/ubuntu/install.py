@@ -22,20 +22,37 @@ from ethwizard.platforms.common import (
     select_consensus_checkpoint_provider,
     progress_log_dialog,
     search_for_generated_keys,
+    get_key_manifest,
+    KeyManifest,
+    verify_keystores_password,
+    validate_deposit_data,
     select_keys_directory,
-    get_bc_validator_deposits,
+    get_validator_deposits,
+    get_bn_activation_queue,
     test_open_ports,
     show_whats_next,
     show_public_keys,
     Step,
-    test_context_variable
+    test_context_variable,
+    GethRPCClient,
+    GethRPCError,
+    BeaconEventsSubscriber,
+    GethEventsSubscriber,
+    SyncProgressEstimator,
+    PollingScheduler,
+    MetricsScraper,
+    HealthHistory
 )
 
 from ethwizard.platforms.ubuntu.common import (
     log,
     quit_app,
     get_systemd_service_details,
-    is_package_installed
+    is_package_installed,
+    JournalFollower,
+    install_lighthouse_release,
+    SystemdUnitWatcher,
+    get_save_directory
 )
 
 from prompt_toolkit.formatted_text import HTML
@@ -1242,164 +1259,145 @@ $ sudo journalctl -ru {geth_service_name}
 
         set_percentage(10)
 
-        journalctl_cursor = None
+        exe_sync_estimator = SyncProgressEstimator('geth', 'blocks', get_save_directory())
+        health_history = HealthHistory(get_save_directory())
+        service_watcher = SystemdUnitWatcher([geth_service_name])
+        poller = PollingScheduler(get_exited, interrupt=service_watcher.has_changes)
+        exe_metrics = MetricsScraper(GETH_METRICS_URL, GETH_METRICS_SERIES)
+
+        log_displayed = False
+
+        with JournalFollower(geth_service_name) as journal, \
+                service_watcher, \
+                GethRPCClient() as geth_rpc, \
+                GethEventsSubscriber() as geth_events:
+            # Output logs, also called while waiting so that they are shown as they come
+            def output_logs():
+                nonlocal log_displayed
+
+                if journal.error is not None:
+                    log_text(journal.error)
+                    journal.error = None
+
+                journal_text = journal.get_text()
+                if len(journal_text) > 0:
+                    if log_displayed:
+                        journal_text = '\n' + journal_text
+                    log_text(journal_text)
+                    log_displayed = True
 
-        while True:
-
-            if get_exited():
-                return {
-                    'exe_is_working': exe_is_working,
-                    'exe_is_syncing': exe_is_syncing,
-                    'exe_starting_block': exe_starting_block,
-                    'exe_current_block': exe_current_block,
-                    'exe_highest_block': exe_highest_block,
-                    'exe_connected_peers': exe_connected_peers
-                }
+            while True:
 
-            # Output logs
-            command = []
-            first_display = True
-            if journalctl_cursor is None:
-                command = ['journalctl', '--no-pager', '--show-cursor', '-q', '-n', '25',
-                    '-u', geth_service_name]
-            else:
-                command = ['journalctl', '--no-pager', '--show-cursor', '-q',
-                    '--after-cursor=' + journalctl_cursor, '-u', geth_service_name]
-                first_display = False
+                if get_exited():
+                    return {
+                        'exe_is_working': exe_is_working,
+                        'exe_is_syncing': exe_is_syncing,
+                        'exe_starting_block': exe_starting_block,
+                        'exe_current_block': exe_current_block,
+                        'exe_highest_block': exe_highest_block,
+                        'exe_connected_peers': exe_connected_peers
+                    }
 
-            process_result = subprocess.run(command, capture_output=True, text=True)
+                # Output logs
+                output_logs()
 
-            process_output = ''
-            if process_result.returncode == 0:
-                process_output = process_result.stdout
-            else:
-                log_text(f'Return code: {process_result.returncode} while calling journalctl.')
-
-            # Parse journalctl cursor and remove it from process_output
-            log_length = len(process_output)
-            if log_length > 0:
-                result = re.search(r'-- cursor: (?P<cursor>[^\n]+)', process_output)
-                if result:
-                    journalctl_cursor = result.group('cursor')
-                    process_output = (
-                        process_output[:result.start()] +
-                        process_output[result.end():])
-                    process_output = process_output.rstrip()
-            
-                    log_length = len(process_output)
+                if not poller.wait(on_tick=output_logs):
+                    continue
 
-            if log_length > 0:
-                if not first_display and process_output[0] != '\n':
-                    process_output = '\n' + process_output
-                log_text(process_output)
+                # React right away when the service crashes or fails
+                service_failed = False
+                for unit, active_state, sub_state in service_watcher.get_changes():
+                    log_text(f'\nService {unit} is now {active_state} ({sub_state}).')
+                    poller.reset()
+                    if active_state == 'failed':
+                        service_failed = True
 
-            time.sleep(1)
+                if service_failed:
+                    return {
+                        'exe_is_working': exe_is_working,
+                        'exe_is_syncing': exe_is_syncing,
+                        'exe_starting_block': exe_starting_block,
+                        'exe_current_block': exe_current_block,
+                        'exe_highest_block': exe_highest_block,
+                        'exe_connected_peers': exe_connected_peers
+                    }
             
-            local_geth_jsonrpc_url = 'http://127.0.0.1:8545'
-            request_json = {
-                'jsonrpc': '2.0',
-                'method': 'eth_syncing',
-                'id': 1
-            }
-            headers = {
-                'Content-Type': 'application/json'
-            }
-            try:
-                response = httpx.post(local_geth_jsonrpc_url, json=request_json, headers=headers)
-            except httpx.RequestError as exception:
-                log_text(f'Exception: {exception} while querying Geth.')
-                continue
-
-            if response.status_code != 200:
-                log_text(
-                    f'Status code: {response.status_code} while querying Geth.')
-                continue
-        
-            response_json = response.json()
-            syncing_json = response_json
-
-            local_geth_jsonrpc_url = 'http://127.0.0.1:8545'
-            request_json = {
-                'jsonrpc': '2.0',
-                'method': 'net_peerCount',
-                'id': 1
-            }
-            headers = {
-                'Content-Type': 'application/json'
-            }
-            try:
-                response = httpx.post(local_geth_jsonrpc_url, json=request_json, headers=headers)
-            except httpx.RequestError as exception:
-                log_text(f'Exception: {exception} while querying Geth.')
-                continue
+                sync_status = geth_events.get_sync_status()
+                try:
+                    if sync_status is not None:
+                        exe_connected_peers = geth_rpc.get_peer_count()
+                    else:
+                        # Websocket events are not available, fallback on polling over HTTP
+                        geth_status = geth_rpc.get_status()
+                        sync_status = geth_status.sync_status
+                        exe_connected_peers = geth_status.connected_peers
+                except GethRPCError as exception:
+                    log_text(f'{exception} while querying Geth.')
+                    continue
 
-            if response.status_code != 200:
-                log_text(
-                    f'Status code: {response.status_code} while querying Geth.')
-                continue
+                exe_is_syncing = sync_status.is_syncing
+                exe_starting_block = sync_status.starting_block
+                exe_current_block = sync_status.current_block
+                exe_highest_block = sync_status.highest_block
+            
+                exe_has_few_peers = exe_connected_peers >= EXE_MIN_FEW_PEERS
 
-            response_json = response.json()
-            peer_count_json = response_json
+                if exe_is_syncing or exe_has_few_peers:
+                    set_percentage(100)
+                else:
+                    set_percentage(10 +
+                        round(min(exe_connected_peers / EXE_MIN_FEW_PEERS, 1.0) * 90.0))
 
-            exe_starting_block = UNKNOWN_VALUE
-            exe_current_block = UNKNOWN_VALUE
-            exe_highest_block = UNKNOWN_VALUE
-            if (
-                syncing_json and
-                'result' in syncing_json and
-                syncing_json['result']
-                ):
-                exe_is_syncing = True
-                if 'startingBlock' in syncing_json['result']:
-                    exe_starting_block = int(syncing_json['result']['startingBlock'], 16)
-                if 'currentBlock' in syncing_json['result']:
-                    exe_current_block = int(syncing_json['result']['currentBlock'], 16)
-                if 'highestBlock' in syncing_json['result']:
-                    exe_highest_block = int(syncing_json['result']['highestBlock'], 16)
-            else:
-                exe_is_syncing = False
+                if (
+                    exe_is_syncing and
+                    type(exe_current_block) == int and
+                    type(exe_highest_block) == int
+                    ):
+                    exe_sync_estimator.add_sample(exe_current_block,
+                        exe_highest_block - exe_current_block)
+
+                health_history.record({
+                    HEALTH_SERIES_EXECUTION_PEERS: exe_connected_peers,
+                    HEALTH_SERIES_EXECUTION_SYNC_DISTANCE: (exe_highest_block - exe_current_block
+                        if exe_is_syncing and type(exe_current_block) == int and
+                            type(exe_highest_block) == int
+                        else None)
+                })
 
-            exe_connected_peers = 0
-            if (
-                peer_count_json and
-                'result' in peer_count_json and
-                peer_count_json['result']
-                ):
-                exe_connected_peers = int(peer_count_json['result'], 16)
-            
-            exe_has_few_peers = exe_connected_peers >= EXE_MIN_FEW_PEERS
+                poller.update(exe_connected_peers >= EXE_MIN_FEW_PEERS / 2,
+                    exe_current_block, exe_is_syncing)
 
-            if exe_is_syncing or exe_has_few_peers:
-                set_percentage(100)
-            else:
-                set_percentage(10 +
-                    round(min(exe_connected_peers / EXE_MIN_FEW_PEERS, 1.0) * 90.0))
+                exe_details_status = '\n'.join(filter(None, [
+                    exe_sync_estimator.format_status(),
+                    exe_metrics.format_status(exe_metrics.scrape())
+                ]))
 
-            change_status((
+                change_status((
 f'''
 Syncing: {exe_is_syncing} (Starting: {exe_starting_block}, Current: {exe_current_block}, Highest: {exe_highest_block})
 Connected Peers: {exe_connected_peers}
+{exe_details_status}
 '''         ).strip())
 
-            if exe_is_syncing or exe_has_few_peers:
-                exe_is_working = True
-                return {
-                    'exe_is_working': exe_is_working,
-                    'exe_is_syncing': exe_is_syncing,
-                    'exe_starting_block': exe_starting_block,
-                    'exe_current_block': exe_current_block,
-                    'exe_highest_block': exe_highest_block,
-                    'exe_connected_peers': exe_connected_peers
-                }
-            else:
-                set_result({
-                    'exe_is_working': exe_is_working,
-                    'exe_is_syncing': exe_is_syncing,
-                    'exe_starting_block': exe_starting_block,
-                    'exe_current_block': exe_current_block,
-                    'exe_highest_block': exe_highest_block,
-                    'exe_connected_peers': exe_connected_peers
-                })
+                if exe_is_syncing or exe_has_few_peers:
+                    exe_is_working = True
+                    return {
+                        'exe_is_working': exe_is_working,
+                        'exe_is_syncing': exe_is_syncing,
+                        'exe_starting_block': exe_starting_block,
+                        'exe_current_block': exe_current_block,
+                        'exe_highest_block': exe_highest_block,
+                        'exe_connected_peers': exe_connected_peers
+                    }
+                else:
+                    set_result({
+                        'exe_is_working': exe_is_working,
+                        'exe_is_syncing': exe_is_syncing,
+                        'exe_starting_block': exe_starting_block,
+                        'exe_current_block': exe_current_block,
+                        'exe_highest_block': exe_highest_block,
+                        'exe_connected_peers': exe_connected_peers
+                    })
 
     result = progress_log_dialog(
         title='Verifying proper Geth service installation',
@@ -1738,14 +1736,18 @@ binary after {retry_count} retries.
                 'We will stop here to protect you.')
             return False
         
-        # Extracting the Lighthouse binary archive
-        subprocess.run([
-            'tar', 'xvf', binary_path, '--directory', LIGHTHOUSE_INSTALLED_DIRECTORY])
+        # Extracting the Lighthouse binary archive into the version store
+        installed_version = install_lighthouse_release(binary_path,
+            release_json.get('tag_name'))
         
         # Remove download leftovers
         binary_path.unlink()
         signature_path.unlink()
 
+        if installed_version is None:
+            log.error('We could not install the Lighthouse binary. We cannot continue.')
+            return False
+
     # Check if lighthouse beacon node user or directory already exists
     lighthouse_datadir_bn = Path('/var/lib/lighthouse/beacon')
     if lighthouse_datadir_bn.exists() and lighthouse_datadir_bn.is_dir():
@@ -2018,162 +2020,191 @@ $ sudo journalctl -ru {lighthouse_bn_service_name}
 
         set_percentage(10)
 
-        journalctl_cursor = None
+        bn_sync_estimator = SyncProgressEstimator('lighthouse_bn', 'slots', get_save_directory())
+        health_history = HealthHistory(get_save_directory())
+        service_watcher = SystemdUnitWatcher([lighthouse_bn_service_name])
+        poller = PollingScheduler(get_exited, interrupt=service_watcher.has_changes)
+        bn_metrics = MetricsScraper(LIGHTHOUSE_BN_METRICS_URL, LIGHTHOUSE_BN_METRICS_SERIES)
 
-        while True:
+        log_displayed = False
 
-            if get_exited():
-                return {
-                    'bn_is_working': bn_is_working,
-                    'bn_is_syncing': bn_is_syncing,
-                    'bn_head_slot': bn_head_slot,
-                    'bn_sync_distance': bn_sync_distance,
-                    'bn_connected_peers': bn_connected_peers
-                }
+        with JournalFollower(lighthouse_bn_service_name) as journal, \
+                service_watcher, \
+                BeaconEventsSubscriber(local_lighthouse_bn_http_base) as bn_events:
+            # Output logs, also called while waiting so that they are shown as they come
+            def output_logs():
+                nonlocal log_displayed
 
-            # Output logs
-            command = []
-            first_display = True
-            if journalctl_cursor is None:
-                command = ['journalctl', '--no-pager', '--show-cursor', '-q', '-n', '25',
-                    '-u', lighthouse_bn_service_name]
-            else:
-                command = ['journalctl', '--no-pager', '--show-cursor', '-q',
-                    '--after-cursor=' + journalctl_cursor, '-u', lighthouse_bn_service_name]
-                first_display = False
+                if journal.error is not None:
+                    log_text(journal.error)
+                    journal.error = None
 
-            process_result = subprocess.run(command, capture_output=True, text=True)
+                journal_text = journal.get_text()
+                if len(journal_text) > 0:
+                    if log_displayed:
+                        journal_text = '\n' + journal_text
+                    log_text(journal_text)
+                    log_displayed = True
 
-            process_output = ''
-            if process_result.returncode == 0:
-                process_output = process_result.stdout
-            else:
-                log_text(f'Return code: {process_result.returncode} while calling journalctl.')
-
-            # Parse journalctl cursor and remove it from process_output
-            log_length = len(process_output)
-            if log_length > 0:
-                result = re.search(r'-- cursor: (?P<cursor>[^\n]+)', process_output)
-                if result:
-                    journalctl_cursor = result.group('cursor')
-                    process_output = (
-                        process_output[:result.start()] +
-                        process_output[result.end():])
-                    process_output = process_output.rstrip()
-            
-                    log_length = len(process_output)
+            while True:
 
-            if log_length > 0:
-                if not first_display and process_output[0] != '\n':
-                    process_output = '\n' + process_output
-                log_text(process_output)
+                if get_exited():
+                    return {
+                        'bn_is_working': bn_is_working,
+                        'bn_is_syncing': bn_is_syncing,
+                        'bn_head_slot': bn_head_slot,
+                        'bn_sync_distance': bn_sync_distance,
+                        'bn_connected_peers': bn_connected_peers
+                    }
+
+                # Output logs
+                output_logs()
+
+                if not poller.wait(on_tick=output_logs):
+                    continue
 
-            time.sleep(1)
+                # React right away when the service crashes or fails
+                service_failed = False
+                for unit, active_state, sub_state in service_watcher.get_changes():
+                    log_text(f'\nService {unit} is now {active_state} ({sub_state}).')
+                    poller.reset()
+                    if active_state == 'failed':
+                        service_failed = True
+
+                if service_failed:
+                    return {
+                        'bn_is_working': bn_is_working,
+                        'bn_is_syncing': bn_is_syncing,
+                        'bn_head_slot': bn_head_slot,
+                        'bn_sync_distance': bn_sync_distance,
+                        'bn_connected_peers': bn_connected_peers
+                    }
             
-            lighthouse_bn_syncing_query = BN_SYNCING_EP
-            lighthouse_bn_query_url = local_lighthouse_bn_http_base + lighthouse_bn_syncing_query
-            headers = {
-                'accept': 'application/json'
-            }
-            try:
-                response = httpx.get(lighthouse_bn_query_url, headers=headers)
-            except httpx.RequestError as exception:
-                log_text(f'Exception: {exception} while querying Lighthouse beacon node.')
-                continue
+                syncing_data = bn_events.get_syncing()
+                if syncing_data is not None:
+                    syncing_json = {'data': syncing_data}
+                else:
+                    # No recent head event, fallback on polling the syncing endpoint
+                    lighthouse_bn_syncing_query = BN_SYNCING_EP
+                    lighthouse_bn_query_url = local_lighthouse_bn_http_base + lighthouse_bn_syncing_query
+                    headers = {
+                        'accept': 'application/json'
+                    }
+                    try:
+                        response = httpx.get(lighthouse_bn_query_url, headers=headers)
+                    except httpx.RequestError as exception:
+                        log_text(f'Exception: {exception} while querying Lighthouse beacon node.')
+                        continue
 
-            if response.status_code != 200:
-                log_text(
-                    f'Status code: {response.status_code} while querying Lighthouse beacon node.')
-                continue
+                    if response.status_code != 200:
+                        log_text(
+                            f'Status code: {response.status_code} while querying Lighthouse beacon node.')
+                        continue
         
-            response_json = response.json()
-            syncing_json = response_json
+                    response_json = response.json()
+                    syncing_json = response_json
 
-            lighthouse_bn_peer_count_query = BN_PEER_COUNT_EP
-            lighthouse_bn_query_url = (
-                local_lighthouse_bn_http_base + lighthouse_bn_peer_count_query)
-            headers = {
-                'accept': 'application/json'
-            }
-            try:
-                response = httpx.get(lighthouse_bn_query_url, headers=headers)
-            except httpx.RequestError as exception:
-                log_text(f'Exception: {exception} while querying Lighthouse beacon node.')
-                continue
+                lighthouse_bn_peer_count_query = BN_PEER_COUNT_EP
+                lighthouse_bn_query_url = (
+                    local_lighthouse_bn_http_base + lighthouse_bn_peer_count_query)
+                headers = {
+                    'accept': 'application/json'
+                }
+                try:
+                    response = httpx.get(lighthouse_bn_query_url, headers=headers)
+                except httpx.RequestError as exception:
+                    log_text(f'Exception: {exception} while querying Lighthouse beacon node.')
+                    continue
 
-            if response.status_code != 200:
-                log_text(
-                    f'Status code: {response.status_code} while querying Lighthouse beacon node.')
-                continue
+                if response.status_code != 200:
+                    log_text(
+                        f'Status code: {response.status_code} while querying Lighthouse beacon node.')
+                    continue
 
-            response_json = response.json()
-            peer_count_json = response_json
+                response_json = response.json()
+                peer_count_json = response_json
 
-            if (
-                syncing_json and
-                'data' in syncing_json and
-                'is_syncing' in syncing_json['data']
-                ):
-                bn_is_syncing = bool(syncing_json['data']['is_syncing'])
-            else:
-                bn_is_syncing = False
+                if (
+                    syncing_json and
+                    'data' in syncing_json and
+                    'is_syncing' in syncing_json['data']
+                    ):
+                    bn_is_syncing = bool(syncing_json['data']['is_syncing'])
+                else:
+                    bn_is_syncing = False
             
-            if (
-                syncing_json and
-                'data' in syncing_json and
-                'head_slot' in syncing_json['data']
-                ):
-                bn_head_slot = syncing_json['data']['head_slot']
-            else:
-                bn_head_slot = UNKNOWN_VALUE
+                if (
+                    syncing_json and
+                    'data' in syncing_json and
+                    'head_slot' in syncing_json['data']
+                    ):
+                    bn_head_slot = syncing_json['data']['head_slot']
+                else:
+                    bn_head_slot = UNKNOWN_VALUE
 
-            if (
-                syncing_json and
-                'data' in syncing_json and
-                'sync_distance' in syncing_json['data']
-                ):
-                bn_sync_distance = syncing_json['data']['sync_distance']
-            else:
-                bn_sync_distance = UNKNOWN_VALUE
+                if (
+                    syncing_json and
+                    'data' in syncing_json and
+                    'sync_distance' in syncing_json['data']
+                    ):
+                    bn_sync_distance = syncing_json['data']['sync_distance']
+                else:
+                    bn_sync_distance = UNKNOWN_VALUE
 
-            bn_connected_peers = 0
-            if (
-                peer_count_json and
-                'data' in peer_count_json and
-                'connected' in peer_count_json['data']
-                ):
-                bn_connected_peers = int(peer_count_json['data']['connected'])
+                bn_connected_peers = 0
+                if (
+                    peer_count_json and
+                    'data' in peer_count_json and
+                    'connected' in peer_count_json['data']
+                    ):
+                    bn_connected_peers = int(peer_count_json['data']['connected'])
             
-            bn_has_few_peers = bn_connected_peers >= BN_MIN_FEW_PEERS
+                bn_has_few_peers = bn_connected_peers >= BN_MIN_FEW_PEERS
 
-            if bn_is_syncing or bn_has_few_peers:
-                set_percentage(100)
-            else:
-                set_percentage(10 + round(min(bn_connected_peers / BN_MIN_FEW_PEERS, 1.0) * 90.0))
+                if bn_is_syncing or bn_has_few_peers:
+                    set_percentage(100)
+                else:
+                    set_percentage(10 + round(min(bn_connected_peers / BN_MIN_FEW_PEERS, 1.0) * 90.0))
+
+                bn_sync_estimator.add_sample(bn_head_slot, bn_sync_distance)
 
-            change_status((
+                health_history.record({
+                    HEALTH_SERIES_CONSENSUS_PEERS: bn_connected_peers,
+                    HEALTH_SERIES_CONSENSUS_SYNC_DISTANCE: bn_sync_distance
+                })
+
+                poller.update(bn_connected_peers >= BN_MIN_FEW_PEERS / 2, bn_head_slot,
+                    bn_is_syncing)
+
+                bn_details_status = '\n'.join(filter(None, [
+                    bn_sync_estimator.format_status(),
+                    bn_metrics.format_status(bn_metrics.scrape())
+                ]))
+
+                change_status((
 f'''
 Syncing: {bn_is_syncing} (Head slot: {bn_head_slot}, Sync distance: {bn_sync_distance})
 Connected Peers: {bn_connected_peers}
+{bn_details_status}
 '''         ).strip())
 
-            if bn_is_syncing or bn_has_few_peers:
-                bn_is_working = True
-                return {
-                    'bn_is_working': bn_is_working,
-                    'bn_is_syncing': bn_is_syncing,
-                    'bn_head_slot': bn_head_slot,
-                    'bn_sync_distance': bn_sync_distance,
-                    'bn_connected_peers': bn_connected_peers
-                }
-            else:
-                set_result({
-                    'bn_is_working': bn_is_working,
-                    'bn_is_syncing': bn_is_syncing,
-                    'bn_head_slot': bn_head_slot,
-                    'bn_sync_distance': bn_sync_distance,
-                    'bn_connected_peers': bn_connected_peers
-                })
+                if bn_is_syncing or bn_has_few_peers:
+                    bn_is_working = True
+                    return {
+                        'bn_is_working': bn_is_working,
+                        'bn_is_syncing': bn_is_syncing,
+                        'bn_head_slot': bn_head_slot,
+                        'bn_sync_distance': bn_sync_distance,
+                        'bn_connected_peers': bn_connected_peers
+                    }
+                else:
+                    set_result({
+                        'bn_is_working': bn_is_working,
+                        'bn_is_syncing': bn_is_syncing,
+                        'bn_head_slot': bn_head_slot,
+                        'bn_sync_distance': bn_sync_distance,
+                        'bn_connected_peers': bn_connected_peers
+                    })
 
     result = progress_log_dialog(
         title='Verifying proper Lighthouse beacon node service installation',
@@ -2295,6 +2326,8 @@ Do you want to skip generating new keys?
         generated_keys['deposit_data_path'] is not None or
         len(generated_keys['keystore_paths']) > 0
     ):
+        key_manifest = get_key_manifest(generated_keys, log)
+
         result = button_dialog(
             title='Validator keys already created',
             text=(
@@ -2302,7 +2335,7 @@ f'''
 It seems like validator keys have already been created. Here are some
 details found:
 
-Number of keystores: {len(generated_keys['keystore_paths'])}
+{key_manifest.format_summary()}
 Deposit data file: {generated_keys['deposit_data_path']}
 Location: {validator_keys_path}
 
@@ -2632,6 +2665,95 @@ Do you want to skip installing the eth2.0-deposit-cli binary?
 
     return actual_keys
 
+def get_lighthouse_imported_public_keys(validators_directory):
+    # Return the set of public keys imported in the Lighthouse validators directory. Lighthouse
+    # stores each imported keystore in a directory named after its public key.
+
+    imported_public_keys = set()
+
+    validators_directory = Path(validators_directory)
+    if not validators_directory.is_dir():
+        return imported_public_keys
+
+    with os.scandir(validators_directory) as dir_it:
+        for entry in dir_it:
+            if entry.is_dir() and re.fullmatch(r'0x[0-9a-f]{96}', entry.name.lower()):
+                imported_public_keys.add(entry.name.lower())
+
+    return imported_public_keys
+
+def import_lighthouse_keystores(network, keys, lighthouse_datadir, keystore_password):
+    # Import all the keystores with a single password in a single non-interactive Lighthouse
+    # call while showing its progress. Return True if the import completed, False if it failed
+    # and None if it was cancelled.
+
+    keystore_count = len(keys['keystore_paths'])
+
+    def importing_callback(set_percentage, log_text, change_status, set_result, get_exited):
+        process = subprocess.Popen([
+            LIGHTHOUSE_INSTALLED_PATH, '--network', network, 'account', 'validator', 'import',
+            '--directory', keys['validator_keys_path'], '--datadir', lighthouse_datadir,
+            '--reuse-password', '--stdin-inputs'
+            ], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            text=True, bufsize=1)
+
+        process.stdin.write(keystore_password + '\n')
+        process.stdin.close()
+
+        processed_count = 0
+
+        for line in process.stdout:
+            if get_exited():
+                process.terminate()
+                break
+
+            line = line.rstrip()
+            if line == '':
+                continue
+
+            log_text(line)
+
+            if (
+                line.startswith('Successfully imported keystore') or
+                line.startswith('Skipping import of keystore')):
+                processed_count = processed_count + 1
+                set_percentage(min(100, int(processed_count * 100 / keystore_count)))
+                change_status(f'Imported keystores: {processed_count} / {keystore_count}')
+
+        process.wait()
+
+        if get_exited():
+            return
+
+        return {
+            'returncode': process.returncode,
+            'processed_count': processed_count
+        }
+
+    result = progress_log_dialog(
+        title='Importing keystores',
+        text=(
+f'''
+Importing your {keystore_count} keystore(s) into the lighthouse validator client.
+'''     ),
+        status_text=f'Imported keystores: 0 / {keystore_count}',
+        run_callback=importing_callback
+    ).run()
+
+    if not result:
+        log.warning('Keystore import was cancelled.')
+        return None
+
+    if result['returncode'] != 0:
+        log.error(f'Lighthouse was unable to import the keystores. Return code: '
+            f'{result["returncode"]}. Make sure you entered the right password.')
+        time.sleep(5)
+        return False
+
+    log.info(f'Lighthouse processed {result["processed_count"]} keystore(s).')
+
+    return True
+
 def install_lighthouse_validator(network, keys):
     # Import keystore(s) and configure the Lighthouse validator client
 
@@ -2760,27 +2882,101 @@ this directory will also remove any key imported previously.
     # Import keystore(s) if we have some
     lighthouse_datadir = Path('/var/lib/lighthouse')
 
+    key_manifest = get_key_manifest(keys, log)
+    key_manifest.log_issues(log)
+    keystore_public_keys = key_manifest.keystores
+
     if len(keys['keystore_paths']) > 0:
-        subprocess.run([
-            LIGHTHOUSE_INSTALLED_PATH, '--network', network, 'account', 'validator', 'import',
-            '--directory', keys['validator_keys_path'], '--datadir', lighthouse_datadir])
+        result = button_dialog(
+            title='Keystore import mode',
+            text=(
+f'''
+We found {len(keys['keystore_paths'])} keystore(s) to import.
+
+With the bulk import, you enter the password for your keystores once and
+they are all imported in a single pass with a progress bar. This requires
+all your keystores to use the same password, which is the case when they
+were generated during the keys generation step.
+
+With the interactive import, the lighthouse validator client will ask for
+the password of each keystore.
+'''         ),
+            buttons=[
+                ('Bulk', 1),
+                ('Interactive', 2),
+                ('Quit', False)
+            ]
+        ).run()
+
+        if not result:
+            return result
+
+        if result == 1:
+            imported = False
+            while not imported:
+                keystore_password = input_dialog(
+                    title='Enter your keystore password',
+                    text=(
+'''
+Please enter the password you used to create your keystore(s). It is not
+your mnemonic. It will be used for all the keystores being imported.
+
+* Press the tab key to switch between the controls below
+'''                 ),
+                    password=True).run()
+
+                if not keystore_password:
+                    return False
+
+                failures = verify_keystores_password(keys['keystore_paths'], keystore_password,
+                    log)
+                if failures is None:
+                    return False
+
+                if len(failures) > 0:
+                    failures_text = '\n'.join(f'{Path(keystore_path).name}: {error}'
+                        for keystore_path, error in failures[:5])
+                    if len(failures) > 5:
+                        failures_text = failures_text + f'\n... and {len(failures) - 5} more'
+
+                    result = button_dialog(
+                        title='Keystore password verification failed',
+                        text=(
+f'''
+{len(failures)} keystore(s) could not be decrypted with the password you entered:
+
+{failures_text}
+
+Make sure to enter the password you used when creating your keystore(s).
+'''             ),
+                        buttons=[
+                            ('Retry', True),
+                            ('Quit', False)
+                        ]
+                    ).run()
+
+                    if not result:
+                        return result
+
+                    continue
+
+                imported = import_lighthouse_keystores(network, keys, lighthouse_datadir,
+                    keystore_password)
+                if imported is None:
+                    return False
+        else:
+            subprocess.run([
+                LIGHTHOUSE_INSTALLED_PATH, '--network', network, 'account', 'validator', 'import',
+                '--directory', keys['validator_keys_path'], '--datadir', lighthouse_datadir])
     else:
         log.warning('No keystore files found to import. We\'ll guess they were already imported '
             'for now.')
         time.sleep(5)
 
     # Check for correct keystore(s) import
-    public_keys = []
+    imported_public_keys = get_lighthouse_imported_public_keys(lighthouse_datadir_vc)
+    public_keys = sorted(imported_public_keys)
 
-    process_result = subprocess.run([
-        LIGHTHOUSE_INSTALLED_PATH, '--network', network, 'account', 'validator', 'list',
-        '--datadir', lighthouse_datadir
-        ], capture_output=True, text=True)
-    if process_result.returncode == 0:
-        process_output = process_result.stdout
-        public_keys = re.findall(r'0x[0-9a-f]{96}\s', process_output)
-        public_keys = list(map(lambda x: x.strip(), public_keys))
-        
     if len(public_keys) == 0:
         # We have no key imported
 
@@ -2800,9 +2996,38 @@ validator client.
 
         return False
 
+    missing_public_keys = [public_key for public_key in keystore_public_keys
+        if public_key not in imported_public_keys]
+
+    if len(missing_public_keys) > 0:
+        missing_public_keys_text = '\n'.join(missing_public_keys[:5])
+        if len(missing_public_keys) > 5:
+            missing_public_keys_text = (missing_public_keys_text +
+                f'\n... and {len(missing_public_keys) - 5} more')
+
+        result = button_dialog(
+            title='Missing validator keys',
+            text=(
+f'''
+{len(missing_public_keys)} of your {len(keystore_public_keys)} keystore(s) were not imported by the
+lighthouse validator client:
+
+{missing_public_keys_text}
+
+We cannot continue here without all your validator keys imported. Your
+keystore(s) have been kept in {keys['validator_keys_path']}.
+'''             ),
+            buttons=[
+                ('Quit', False)
+            ]
+        ).run()
+
+        return False
+
     # Clean up generated keys
-    for keystore_path in keys['keystore_paths']:
-        os.unlink(keystore_path)
+    for public_key in keystore_public_keys:
+        for keystore_path in key_manifest.get_keystore_paths(public_key):
+            os.unlink(keystore_path)
 
     # Make sure validators directory is owned by the right user/group
     subprocess.run([
@@ -3046,199 +3271,238 @@ $ sudo journalctl -ru {lighthouse_bn_service_name}
 
             set_percentage(1)
 
-            journalctl_cursor = None
-
-            while True:
-
-                if get_exited():
-                    return {
-                        'bn_is_fully_sync': bn_is_fully_sync,
-                        'bn_is_syncing': bn_is_syncing,
-                        'bn_head_slot': bn_head_slot,
-                        'bn_sync_distance': bn_sync_distance,
-                        'bn_connected_peers': bn_connected_peers
-                    }
-
-                # Output logs
-                command = []
-                first_display = True
-                if journalctl_cursor is None:
-                    command = ['journalctl', '--no-pager', '--show-cursor', '-q', '-n', '25',
-                        '-u', lighthouse_bn_service_name]
-                else:
-                    command = ['journalctl', '--no-pager', '--show-cursor', '-q',
-                        '--after-cursor=' + journalctl_cursor, '-u', lighthouse_bn_service_name]
-                    first_display = False
-
-                process_result = subprocess.run(command, capture_output=True, text=True)
-
-                process_output = ''
-                if process_result.returncode == 0:
-                    process_output = process_result.stdout
-                else:
-                    log_text(f'Return code: {process_result.returncode} while calling journalctl.')
-
-                # Parse journalctl cursor and remove it from process_output
-                log_length = len(process_output)
-                if log_length > 0:
-                    result = re.search(r'-- cursor: (?P<cursor>[^\n]+)', process_output)
-                    if result:
-                        journalctl_cursor = result.group('cursor')
-                        process_output = (
-                            process_output[:result.start()] +
-                            process_output[result.end():])
-                        process_output = process_output.rstrip()
-                
-                        log_length = len(process_output)
+            bn_sync_estimator = SyncProgressEstimator('lighthouse_bn', 'slots', get_save_directory())
+            health_history = HealthHistory(get_save_directory())
+            service_watcher = SystemdUnitWatcher([lighthouse_bn_service_name])
+            poller = PollingScheduler(get_exited, interrupt=service_watcher.has_changes)
+            bn_metrics = MetricsScraper(LIGHTHOUSE_BN_METRICS_URL, LIGHTHOUSE_BN_METRICS_SERIES)
+
+            log_displayed = False
+
+            with JournalFollower(lighthouse_bn_service_name) as journal, \
+                    service_watcher, \
+                    BeaconEventsSubscriber(local_lighthouse_bn_http_base) as bn_events:
+                # Output logs, also called while waiting so that they are shown as they come
+                def output_logs():
+                    nonlocal log_displayed
+
+                    if journal.error is not None:
+                        log_text(journal.error)
+                        journal.error = None
+
+                    journal_text = journal.get_text()
+                    if len(journal_text) > 0:
+                        if log_displayed:
+                            journal_text = '\n' + journal_text
+                        log_text(journal_text)
+                        log_displayed = True
+
+                while True:
+
+                    if get_exited():
+                        return {
+                            'bn_is_fully_sync': bn_is_fully_sync,
+                            'bn_is_syncing': bn_is_syncing,
+                            'bn_head_slot': bn_head_slot,
+                            'bn_sync_distance': bn_sync_distance,
+                            'bn_connected_peers': bn_connected_peers
+                        }
+
+                    # Output logs
+                    output_logs()
+
+                    if not poller.wait(on_tick=output_logs):
+                        continue
 
-                if log_length > 0:
-                    if not first_display and process_output[0] != '\n':
-                        process_output = '\n' + process_output
-                    log_text(process_output)
+                    # React right away when the service crashes or fails
+                    service_failed = False
+                    for unit, active_state, sub_state in service_watcher.get_changes():
+                        log_text(f'\nService {unit} is now {active_state} ({sub_state}).')
+                        poller.reset()
+                        if active_state == 'failed':
+                            service_failed = True
+
+                    if service_failed:
+                        return {
+                            'bn_is_fully_sync': bn_is_fully_sync,
+                            'bn_is_syncing': bn_is_syncing,
+                            'bn_head_slot': bn_head_slot,
+                            'bn_sync_distance': bn_sync_distance,
+                            'bn_connected_peers': bn_connected_peers
+                        }
                 
-                lighthouse_bn_syncing_query = BN_SYNCING_EP
-                lighthouse_bn_query_url = local_lighthouse_bn_http_base + lighthouse_bn_syncing_query
-                headers = {
-                    'accept': 'application/json'
-                }
-                try:
-                    response = httpx.get(lighthouse_bn_query_url, headers=headers)
-                except httpx.RequestError as exception:
-                    log_text(f'Exception: {exception} while querying Lighthouse beacon node.')
-                    continue
-
-                if response.status_code != 200:
-                    log_text(
-                        f'Status code: {response.status_code} while querying Lighthouse beacon node.')
-                    continue
+                    syncing_data = bn_events.get_syncing()
+                    if syncing_data is not None:
+                        syncing_json = {'data': syncing_data}
+                    else:
+                        # No recent head event, fallback on polling the syncing endpoint
+                        lighthouse_bn_syncing_query = BN_SYNCING_EP
+                        lighthouse_bn_query_url = local_lighthouse_bn_http_base + lighthouse_bn_syncing_query
+                        headers = {
+                            'accept': 'application/json'
+                        }
+                        try:
+                            response = httpx.get(lighthouse_bn_query_url, headers=headers)
+                        except httpx.RequestError as exception:
+                            log_text(f'Exception: {exception} while querying Lighthouse beacon node.')
+                            continue
+
+                        if response.status_code != 200:
+                            log_text(
+                                f'Status code: {response.status_code} while querying Lighthouse beacon node.')
+                            continue
             
-                response_json = response.json()
-                syncing_json = response_json
-
-                lighthouse_bn_peer_count_query = BN_PEER_COUNT_EP
-                lighthouse_bn_query_url = (
-                    local_lighthouse_bn_http_base + lighthouse_bn_peer_count_query)
-                headers = {
-                    'accept': 'application/json'
-                }
-                try:
-                    response = httpx.get(lighthouse_bn_query_url, headers=headers)
-                except httpx.RequestError as exception:
-                    log_text(f'Exception: {exception} while querying Lighthouse beacon node.')
-                    continue
+                        response_json = response.json()
+                        syncing_json = response_json
+
+                    lighthouse_bn_peer_count_query = BN_PEER_COUNT_EP
+                    lighthouse_bn_query_url = (
+                        local_lighthouse_bn_http_base + lighthouse_bn_peer_count_query)
+                    headers = {
+                        'accept': 'application/json'
+                    }
+                    try:
+                        response = httpx.get(lighthouse_bn_query_url, headers=headers)
+                    except httpx.RequestError as exception:
+                        log_text(f'Exception: {exception} while querying Lighthouse beacon node.')
+                        continue
 
-                if response.status_code != 200:
-                    log_text(
-                        f'Status code: {response.status_code} while querying Lighthouse beacon node.')
-                    continue
+                    if response.status_code != 200:
+                        log_text(
+                            f'Status code: {response.status_code} while querying Lighthouse beacon node.')
+                        continue
 
-                response_json = response.json()
-                peer_count_json = response_json
+                    response_json = response.json()
+                    peer_count_json = response_json
 
-                if (
-                    syncing_json and
-                    'data' in syncing_json and
-                    'is_syncing' in syncing_json['data']
-                    ):
-                    bn_is_syncing = bool(syncing_json['data']['is_syncing'])
-                else:
-                    bn_is_syncing = False
+                    if (
+                        syncing_json and
+                        'data' in syncing_json and
+                        'is_syncing' in syncing_json['data']
+                        ):
+                        bn_is_syncing = bool(syncing_json['data']['is_syncing'])
+                    else:
+                        bn_is_syncing = False
                 
-                if (
-                    syncing_json and
-                    'data' in syncing_json and
-                    'head_slot' in syncing_json['data']
-                    ):
-                    bn_head_slot = int(syncing_json['data']['head_slot'])
-                else:
-                    bn_head_slot = UNKNOWN_VALUE
+                    if (
+                        syncing_json and
+                        'data' in syncing_json and
+                        'head_slot' in syncing_json['data']
+                        ):
+                        bn_head_slot = int(syncing_json['data']['head_slot'])
+                    else:
+                        bn_head_slot = UNKNOWN_VALUE
+
+                    if (
+                        syncing_json and
+                        'data' in syncing_json and
+                        'sync_distance' in syncing_json['data']
+                        ):
+                        bn_sync_distance = int(syncing_json['data']['sync_distance'])
+                    else:
+                        bn_sync_distance = UNKNOWN_VALUE
+
+                    bn_connected_peers = 0
+                    if (
+                        peer_count_json and
+                        'data' in peer_count_json and
+                        'connected' in peer_count_json['data']
+                        ):
+                        bn_connected_peers = int(peer_count_json['data']['connected'])
+
+                    bn_is_fully_sync = (
+                        type(bn_sync_distance) == int and
+                        bn_sync_distance <= BN_SYNCED_MAX_DISTANCE)
+
+                    if bn_is_fully_sync:
+                        set_percentage(100)
+                    else:
+                        if type(bn_sync_distance) == int and type(bn_head_slot) == int:
+                            max_head = bn_sync_distance + bn_head_slot
+                            set_percentage(round(bn_head_slot / max_head * 100.0))
+                        else:
+                            set_percentage(1)
 
-                if (
-                    syncing_json and
-                    'data' in syncing_json and
-                    'sync_distance' in syncing_json['data']
-                    ):
-                    bn_sync_distance = int(syncing_json['data']['sync_distance'])
-                else:
-                    bn_sync_distance = UNKNOWN_VALUE
+                    bn_sync_estimator.add_sample(bn_head_slot, bn_sync_distance)
 
-                bn_connected_peers = 0
-                if (
-                    peer_count_json and
-                    'data' in peer_count_json and
-                    'connected' in peer_count_json['data']
-                    ):
-                    bn_connected_peers = int(peer_count_json['data']['connected'])
+                    health_history.record({
+                        HEALTH_SERIES_CONSENSUS_PEERS: bn_connected_peers,
+                        HEALTH_SERIES_CONSENSUS_SYNC_DISTANCE: bn_sync_distance
+                    })
 
-                bn_is_fully_sync = bn_sync_distance == 0
+                    poller.update(
+                        type(bn_sync_distance) == int and bn_sync_distance <= 2 * SLOTS_PER_EPOCH,
+                        bn_head_slot, bn_is_syncing)
 
-                if bn_is_fully_sync:
-                    set_percentage(100)
-                else:
-                    if type(bn_sync_distance) == int and type(bn_head_slot) == int:
-                        max_head = bn_sync_distance + bn_head_slot
-                        set_percentage(round(bn_head_slot / max_head * 100.0))
-                    else:
-                        set_percentage(1)
+                    bn_details_status = '\n'.join(filter(None, [
+                        bn_sync_estimator.format_status(),
+                        bn_metrics.format_status(bn_metrics.scrape())
+                    ]))
 
-                change_status((
+                    change_status((
 f'''
 Syncing: {bn_is_syncing} (Head slot: {bn_head_slot}, Sync distance: {bn_sync_distance})
 Connected Peers: {bn_connected_peers}
+{bn_details_status}
 '''             ).strip())
 
-                if bn_is_fully_sync:
-                    return {
-                        'bn_is_fully_sync': bn_is_fully_sync,
-                        'bn_is_syncing': bn_is_syncing,
-                        'bn_head_slot': bn_head_slot,
-                        'bn_sync_distance': bn_sync_distance,
-                        'bn_connected_peers': bn_connected_peers
-                    }
-                else:
-                    set_result({
-                        'bn_is_fully_sync': bn_is_fully_sync,
-                        'bn_is_syncing': bn_is_syncing,
-                        'bn_head_slot': bn_head_slot,
-                        'bn_sync_distance': bn_sync_distance,
-                        'bn_connected_peers': bn_connected_peers
-                    })
-                
-                time.sleep(1)
+                    if bn_is_fully_sync:
+                        return {
+                            'bn_is_fully_sync': bn_is_fully_sync,
+                            'bn_is_syncing': bn_is_syncing,
+                            'bn_head_slot': bn_head_slot,
+                            'bn_sync_distance': bn_sync_distance,
+                            'bn_connected_peers': bn_connected_peers
+                        }
+                    else:
+                        set_result({
+                            'bn_is_fully_sync': bn_is_fully_sync,
+                            'bn_is_syncing': bn_is_syncing,
+                            'bn_head_slot': bn_head_slot,
+                            'bn_sync_distance': bn_sync_distance,
+                            'bn_connected_peers': bn_connected_peers
+                        })
 
         unknown_joining_queue = 'no join queue information found'
 
         network_queue_info = unknown_joining_queue
 
-        headers = {
-            'accept': 'application/json'
-        }
+        # Use the local beacon node for the join queue when it is synced
+        validators_entering = get_bn_activation_queue(local_lighthouse_bn_http_base, log)
 
-        beaconcha_in_queue_query_url = (
-            BEACONCHA_IN_URLS[network] + BEACONCHA_VALIDATOR_QUEUE_API_URL)
-        try:
-            response = httpx.get(beaconcha_in_queue_query_url, headers=headers,
-                follow_redirects=True)
+        if validators_entering is None:
+            headers = {
+                'accept': 'application/json'
+            }
 
-            if response.status_code != 200:
-                log.error(f'Status code: {response.status_code} while querying beaconcha.in.')
-            else:
-                response_json = response.json()
-                if (
-                    response_json and
-                    'data' in response_json and
-                    'beaconchain_entering' in response_json['data']):
+            beaconcha_in_queue_query_url = (
+                BEACONCHA_IN_URLS[network] + BEACONCHA_VALIDATOR_QUEUE_API_URL)
+            try:
+                response = httpx.get(beaconcha_in_queue_query_url, headers=headers,
+                    follow_redirects=True)
 
-                    validators_entering = int(response_json['data']['beaconchain_entering'])
-                    waiting_td = timedelta(days=validators_entering / 900.0)
+                if response.status_code != 200:
+                    log.error(f'Status code: {response.status_code} while querying '
+                        f'beaconcha.in.')
+                else:
+                    response_json = response.json()
+                    if (
+                        response_json and
+                        'data' in response_json and
+                        'beaconchain_entering' in response_json['data']):
 
-                    network_queue_info = (
-                        f'{validators_entering} validators waiting to join '
-                        f'[{humanize.naturaldelta(waiting_td)}]'
-                    )
+                        validators_entering = int(response_json['data']['beaconchain_entering'])
 
-        except httpx.RequestError as exception:
-            log.error(f'Exception: {exception} while querying beaconcha.in.')
+            except httpx.RequestError as exception:
+                log.error(f'Exception: {exception} while querying beaconcha.in.')
+
+        if validators_entering is not None:
+            waiting_td = timedelta(days=validators_entering / 900.0)
+
+            network_queue_info = (
+                f'{validators_entering} validators waiting to join '
+                f'[{humanize.naturaldelta(waiting_td)}]'
+            )
 
         result = progress_log_dialog(
             title='Verifying Lighthouse beacon node syncing status',
@@ -3314,6 +3578,41 @@ Connected Peers: {syncing_status['bn_connected_peers']}
     launchpad_url = LAUNCHPAD_URLS[network]
     currency = NETWORK_CURRENCY[network]
 
+    # Validate the deposit data against our keys and the selected network
+    expected_public_keys = get_lighthouse_imported_public_keys(
+        Path('/var/lib/lighthouse/validators'))
+    if len(expected_public_keys) == 0:
+        expected_public_keys = None
+
+    deposit_issues = validate_deposit_data(keys['deposit_data_path'], network,
+        expected_public_keys, log)
+    if deposit_issues is None:
+        return False
+
+    if len(deposit_issues) > 0:
+        deposit_issues_text = '\n'.join(deposit_issues[:5])
+        if len(deposit_issues) > 5:
+            deposit_issues_text = (deposit_issues_text +
+                f'\n... and {len(deposit_issues) - 5} more')
+
+        result = button_dialog(
+            title='Invalid deposit data',
+            text=(
+f'''
+We found {len(deposit_issues)} issue(s) in your deposit data file:
+
+{deposit_issues_text}
+
+Doing a deposit with this file could lose your funds. We cannot continue
+here. Make sure to check your deposit data file and your keys.
+'''         ),
+            buttons=[
+                ('Quit', False)
+            ]
+        ).run()
+
+        return False
+
     # Create an easily accessible copy of the deposit file
     deposit_file_copy_path = Path('/tmp', 'deposit_data.json')
     shutil.copyfile(keys['deposit_data_path'], deposit_file_copy_path)
@@ -3349,26 +3648,22 @@ When you are done with the deposit(s), click the "I'm done" button below.
     if not result:
         return result
 
-    public_keys = []
+    # The keystores were removed after being imported. Only use the public keys from the
+    # deposit data file we validated and gave to the launchpad.
+    key_manifest = KeyManifest([], [keys['deposit_data_path']], log)
+    key_manifest.log_issues(log)
+    public_keys = key_manifest.deposit_public_keys
 
-    with open(keys['deposit_data_path'], 'r') as deposit_data_file:
-        deposit_data = json.loads(deposit_data_file.read(204800))
-        
-        for validator_data in deposit_data:
-            if 'pubkey' not in validator_data:
-                continue
-            public_key = validator_data['pubkey']
-            public_keys.append('0x' + public_key)
-    
     if len(public_keys) == 0:
         log.error('No public key(s) found in the deposit file.')
         return False
 
-    # Verify that the deposit was done correctly using beaconcha.in API
-    validator_deposits = get_bc_validator_deposits(network, public_keys, log)
+    # Verify that the deposit was done correctly using the local beacon node and beaconcha.in
+    # API for the validators it does not know yet
+    validator_deposits = get_validator_deposits(network, local_lighthouse_bn_http_base, public_keys, log)
 
     if type(validator_deposits) is not list and not validator_deposits:
-        log.error('Unable to get validator(s) deposits from beaconcha.in')
+        log.error('Unable to get validator(s) deposits')
         return False
 
     while len(validator_deposits) == 0:
@@ -3403,10 +3698,11 @@ deposit(s).
         if not result:
             return result
 
-        validator_deposits = get_bc_validator_deposits(network, public_keys, log)
+        validator_deposits = get_validator_deposits(network, local_lighthouse_bn_http_base, public_keys,
+            log)
 
         if type(validator_deposits) is not list and not validator_deposits:
-            log.error('Unable to get validator(s) deposits from beaconcha.in')
+            log.error('Unable to get validator(s) deposits')
             return False
     
     # Check if all the deposit(s) were done for each validator
@@ -3441,10 +3737,11 @@ deposit(s).
         if not result:
             return result
 
-        validator_deposits = get_bc_validator_deposits(network, public_keys, log)
+        validator_deposits = get_validator_deposits(network, local_lighthouse_bn_http_base, public_keys,
+            log)
 
         if type(validator_deposits) is not list and not validator_deposits:
-            log.error('Unable to get validator(s) deposits from beaconcha.in')
+            log.error('Unable to get validator(s) deposits')
             return False
 
     # Clean up deposit data file
@@ -2,25 +2,58 @@ import subprocess
 import httpx
 import re
 import time
+import sys
+import json
+import os
+import shlex
+import shutil
+import hashlib
+
+import humanize
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from functools import partial
 
 from packaging.version import parse as parse_version, Version
 
 from prompt_toolkit.formatted_text import HTML
-from prompt_toolkit.shortcuts import button_dialog
+from prompt_toolkit.shortcuts import button_dialog, radiolist_dialog
 
 from pathlib import Path
 
+from ethwizard import __version__
+
+from ethwizard.platforms.common import (
+    GethRPCClient,
+    GethRPCError,
+    MetricsScraper,
+    HealthHistory,
+    find_restart_window,
+    progress_log_dialog
+)
+
 from ethwizard.platforms.ubuntu.common import (
     log,
     save_state,
     quit_app,
-    get_systemd_service_details,
-    is_package_installed
+    get_systemd_services_details,
+    is_package_installed,
+    get_apt_sources,
+    get_apt_lists_age,
+    update_apt_sources,
+    run_process_group,
+    write_apt_lists_stamp,
+    get_apt_lists_package_versions,
+    get_save_directory,
+    get_lighthouse_version_store,
+    install_lighthouse_release
 )
 
 from ethwizard.constants import (
     CTX_SELECTED_EXECUTION_CLIENT,
     CTX_SELECTED_CONSENSUS_CLIENT,
+    CTX_PUBLIC_KEYS,
     EXECUTION_CLIENT_GETH,
     CONSENSUS_CLIENT_LIGHTHOUSE,
     WIZARD_COMPLETED_STEP_ID,
@@ -35,14 +68,48 @@ from ethwizard.constants import (
     MAINTENANCE_CHECK_AGAIN_SOON,
     MAINTENANCE_START_SERVICE,
     MAINTENANCE_REINSTALL_CLIENT,
+    MAINTENANCE_ROLLBACK_CLIENT,
+    MAINTENANCE_TASKS_DESCRIPTION,
     LIGHTHOUSE_BN_SYSTEMD_SERVICE_NAME,
     LIGHTHOUSE_VC_SYSTEMD_SERVICE_NAME,
     LIGHTHOUSE_LATEST_RELEASE,
-    LIGHTHOUSE_INSTALLED_DIRECTORY,
+    GETH_METRICS_URL,
+    GETH_METRICS_SERIES,
+    LIGHTHOUSE_BN_METRICS_URL,
+    LIGHTHOUSE_BN_METRICS_SERIES,
+    LIGHTHOUSE_VC_METRICS_URL,
+    LIGHTHOUSE_VC_METRICS_SERIES,
     LIGHTHOUSE_INSTALLED_PATH,
+    SERVICE_RESTART_TIMEOUT,
     LIGHTHOUSE_PRIME_PGP_KEY_ID,
     BN_VERSION_EP,
+    BN_SYNCING_EP,
     PGP_KEY_SERVERS,
+    PROBE_TIMEOUT,
+    APT_PROBE_TIMEOUT,
+    APT_UPDATE_TIMEOUT,
+    CLIENT_DETAILS_TIMEOUT,
+    GETH_APT_PACKAGE,
+    ETHEREUM_PPA_SOURCE_GLOB,
+    ETHEREUM_PPA_LISTS_GLOB,
+    ETHEREUM_PPA_LISTS_STAMP_NAME,
+    APT_LISTS_MAX_AGE,
+    MAINTENANCE_SNAPSHOT_FILE,
+    MAINTENANCE_SNAPSHOT_MAX_AGE,
+    MONITOR_SYSTEMD_SERVICE_NAME,
+    MONITOR_SYSTEMD_TIMER_NAME,
+    MONITOR_PREFERENCE_FILE,
+    MONITOR_SERVICE_DEFINITION,
+    MONITOR_TIMER_DEFINITION,
+    HEALTH_SERIES_EXECUTION_PEERS,
+    HEALTH_SERIES_EXECUTION_SYNC_DISTANCE,
+    HEALTH_SERIES_EXECUTION_DB_SIZE,
+    HEALTH_SERIES_EXECUTION_VERSION,
+    HEALTH_SERIES_CONSENSUS_PEERS,
+    HEALTH_SERIES_CONSENSUS_SYNC_DISTANCE,
+    HEALTH_SERIES_CONSENSUS_DB_SIZE,
+    HEALTH_SERIES_CONSENSUS_VERSION,
+    HEALTH_SERIES_DISK_FREE
 )
 
 def enter_maintenance(context):
@@ -60,21 +127,521 @@ def enter_maintenance(context):
     if context is None:
         log.error('Missing context.')
         return False
-    
+
+    configure_monitor_timer()
+
     return show_dashboard(context)
 
-def show_dashboard(context):
+def run_monitor(context):
+    # Background monitor entry point for Ubuntu.
+    # Run the maintenance checks without any interaction, save a status snapshot and emit alerts
+    # for new maintenance tasks.
+
+    if context is None:
+        log.error('Missing context.')
+        return False
+
+    context = use_default_client(context)
+
+    if context is None:
+        log.error('Missing context.')
+        return False
+
+    previous_snapshot = load_status_snapshot(max_age=None)
+    previous_alerts = set()
+    if previous_snapshot is not None:
+        previous_alerts = set(previous_snapshot.get('alerts', []))
+
+    status = get_maintenance_status(context)
+    if not status:
+        return False
+
+    record_health_history(status)
+
+    alerts = get_maintenance_alerts(status)
+    for alert in alerts:
+        if alert in previous_alerts:
+            log.info(f'Maintenance task still pending: {alert}')
+        else:
+            log.warning(f'Maintenance needed: {alert}')
+
+    if len(alerts) == 0 and len(previous_alerts) > 0:
+        log.info('All maintenance tasks have been resolved.')
+
+    return save_status_snapshot(status, alerts)
+
+def load_monitor_preference():
+    # Return True if the user wants the background maintenance monitor, False if they do not
+    # and None if they were never asked
+
+    preference_path = get_save_directory().joinpath(MONITOR_PREFERENCE_FILE)
+    if not preference_path.is_file():
+        return None
+
+    try:
+        with open(preference_path, 'r', encoding='utf8') as preference_file:
+            preference = json.load(preference_file)
+    except (OSError, ValueError) as exception:
+        log.warning(f'Unable to read the monitor preference. Exception: {exception}')
+        return None
+
+    if type(preference) is not dict or type(preference.get('enabled')) is not bool:
+        return None
+
+    return preference['enabled']
+
+def save_monitor_preference(enabled):
+    # Save whether the user wants the background maintenance monitor
+
+    preference_path = get_save_directory().joinpath(MONITOR_PREFERENCE_FILE)
+
+    try:
+        with open(preference_path, 'w', encoding='utf8') as preference_file:
+            json.dump({'enabled': enabled}, preference_file)
+    except OSError as exception:
+        log.warning(f'Unable to save the monitor preference. Exception: {exception}')
+
+def configure_monitor_timer():
+    # Ask the user once if they want the background maintenance monitor and keep its systemd
+    # timer in line with their choice
+
+    enabled = load_monitor_preference()
+
+    if enabled is None:
+        enabled = ask_monitor_preference()
+        if enabled is None:
+            return
+        save_monitor_preference(enabled)
+
+    if enabled:
+        if not install_monitor_timer():
+            log.warning('Unable to install the background maintenance monitor.')
+    else:
+        remove_monitor_timer()
+
+def ask_monitor_preference():
+    # Ask the user if they want the background maintenance monitor. Return None if the dialog
+    # was cancelled.
+
+    enabled = load_monitor_preference()
+    current_state = 'enabled' if enabled else 'disabled'
+    if enabled is None:
+        current_state = 'not configured'
+
+    return button_dialog(
+        title='Background maintenance monitor',
+        text=(
+f'''
+The background maintenance monitor checks your clients every 15 minutes
+with a systemd timer ({MONITOR_SYSTEMD_TIMER_NAME}) running as root. It
+keeps a status snapshot so this dashboard opens quickly and it logs alerts
+when maintenance tasks are needed. It never performs maintenance by
+itself.
+
+The monitor is currently {current_state}. You can change this later with
+the Monitor button on the maintenance dashboard.
+
+Do you want to enable the background maintenance monitor?
+'''     ),
+        buttons=[
+            ('Enable', True),
+            ('Disable', False),
+            ('Cancel', None)
+        ]
+    ).run()
+
+def get_monitor_command():
+    # Return the command and the working directory used to run the wizard in monitor mode
+
+    if getattr(sys, 'frozen', False):
+        return [sys.executable, '--monitor'], Path(sys.executable).parent
+
+    entry_point = Path(os.path.abspath(sys.argv[0]))
+
+    if entry_point.name == '__main__.py':
+        # Started with python -m ethwizard from a source directory
+        return [sys.executable, '-m', 'ethwizard', '--monitor'], entry_point.parents[1]
+
+    # Started from the ethwizard zipapp or from a script
+    return [sys.executable, str(entry_point), '--monitor'], entry_point.parent
+
+def install_monitor_timer():
+    # Install or update the systemd timer that runs the background maintenance monitor
+
+    monitor_command, working_directory = get_monitor_command()
+
+    unit_definitions = {
+        MONITOR_SYSTEMD_SERVICE_NAME: MONITOR_SERVICE_DEFINITION.format(
+            working_directory=working_directory, command=shlex.join(monitor_command)),
+        MONITOR_SYSTEMD_TIMER_NAME: MONITOR_TIMER_DEFINITION
+    }
+
+    updated_units = False
+
+    for unit_name, unit_definition in unit_definitions.items():
+        unit_path = Path('/etc/systemd/system/' + unit_name)
+
+        current_definition = None
+        if unit_path.is_file():
+            with open(unit_path, 'r') as unit_file:
+                current_definition = unit_file.read()
+
+        if current_definition == unit_definition:
+            continue
+
+        try:
+            with open(unit_path, 'w') as unit_file:
+                unit_file.write(unit_definition)
+        except OSError as exception:
+            log.error(f'Unable to write {unit_path}. Exception: {exception}')
+            return False
+
+        updated_units = True
+
+    if updated_units:
+        log.info('Installing the background maintenance monitor...')
+
+        subprocess.run([
+            'systemctl', 'daemon-reload'])
+
+    process_result = subprocess.run([
+        'systemctl', 'enable', '--now', MONITOR_SYSTEMD_TIMER_NAME])
+
+    return process_result.returncode == 0
+
+def remove_monitor_timer():
+    # Stop, disable and remove the background maintenance monitor systemd units if they exist
+
+    unit_paths = [Path('/etc/systemd/system/' + unit_name) for unit_name in (
+        MONITOR_SYSTEMD_TIMER_NAME, MONITOR_SYSTEMD_SERVICE_NAME)]
+
+    if not any(unit_path.is_file() for unit_path in unit_paths):
+        return True
+
+    log.info('Removing the background maintenance monitor...')
+
+    subprocess.run([
+        'systemctl', 'disable', '--now', MONITOR_SYSTEMD_TIMER_NAME])
+
+    for unit_path in unit_paths:
+        try:
+            unit_path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as exception:
+            log.error(f'Unable to remove {unit_path}. Exception: {exception}')
+            return False
+
+    subprocess.run([
+        'systemctl', 'daemon-reload'])
+
+    return True
+
+def get_status_snapshot_path():
+    # Return the path of the maintenance status snapshot file
+    return get_save_directory().joinpath(MAINTENANCE_SNAPSHOT_FILE)
+
+def load_status_snapshot(max_age=MAINTENANCE_SNAPSHOT_MAX_AGE):
+    # Load the latest maintenance status snapshot. Return None if there is no snapshot or if it
+    # is older than max_age seconds.
+
+    snapshot_path = get_status_snapshot_path()
+    if not snapshot_path.is_file():
+        return None
+
+    try:
+        with open(snapshot_path, 'r', encoding='utf8') as snapshot_file:
+            snapshot = json.load(snapshot_file)
+    except (OSError, ValueError) as exception:
+        log.warning(f'Unable to read maintenance status snapshot. Exception: {exception}')
+        return None
+
+    if type(snapshot) is not dict or type(snapshot.get('timestamp')) not in (int, float):
+        return None
+
+    if max_age is not None and time.time() - snapshot['timestamp'] > max_age:
+        return None
+
+    return snapshot
+
+def save_status_snapshot(status, alerts=None):
+    # Save a maintenance status snapshot for the dashboard and for external tooling. The
+    # snapshot is written to a temporary file and moved in place so readers never see a partial
+    # file.
+
+    if alerts is None:
+        alerts = get_maintenance_alerts(status)
+
+    snapshot = dict(status)
+    snapshot['timestamp'] = time.time()
+    snapshot['wizard_version'] = __version__
+    snapshot['alerts'] = alerts
+
+    snapshot_path = get_status_snapshot_path()
+    temporary_path = snapshot_path.with_name(snapshot_path.name + '.tmp')
+
+    try:
+        with open(temporary_path, 'w', encoding='utf8') as snapshot_file:
+            json.dump(snapshot, snapshot_file, indent=2)
+        os.replace(temporary_path, snapshot_path)
+    except OSError as exception:
+        log.error(f'Unable to save maintenance status snapshot. Exception: {exception}')
+        return False
+
+    return True
+
+def record_health_history(status):
+    # Record the gathered client details in the local health history
+
+    execution_client_details = status['execution_client_details']
+    consensus_client_details = status['consensus_client_details']
+
+    execution_metrics = execution_client_details.get('metrics_values', {})
+    consensus_metrics = consensus_client_details.get('bn_metrics_values', {})
+
+    values = {
+        HEALTH_SERIES_EXECUTION_PEERS: execution_metrics.get('peers'),
+        HEALTH_SERIES_EXECUTION_DB_SIZE: execution_metrics.get('db_size'),
+        HEALTH_SERIES_CONSENSUS_PEERS: consensus_metrics.get('peers'),
+        HEALTH_SERIES_CONSENSUS_DB_SIZE: consensus_metrics.get('db_size')
+    }
+
+    for series, client_details in (
+        (HEALTH_SERIES_EXECUTION_SYNC_DISTANCE, execution_client_details),
+        (HEALTH_SERIES_CONSENSUS_SYNC_DISTANCE, consensus_client_details)):
+        if type(client_details.get('sync_distance')) == int:
+            values[series] = client_details['sync_distance']
+
+    try:
+        values[HEALTH_SERIES_DISK_FREE] = shutil.disk_usage('/var/lib').free
+    except OSError:
+        pass
+
+    history = HealthHistory(get_save_directory())
+    history.record(values)
+
+    for series, client_details in (
+        (HEALTH_SERIES_EXECUTION_VERSION, execution_client_details),
+        (HEALTH_SERIES_CONSENSUS_VERSION, consensus_client_details)):
+        running_version = client_details['versions']['running']
+        if running_version != UNKNOWN_VALUE:
+            history.record_change(series, running_version)
+
+    if history.error is not None:
+        log.warning(history.error)
+
+def format_health_trends():
+    # Return the health trends section for the dashboard or an empty string without history
+
+    history = HealthHistory(get_save_directory())
+
+    trends = [
+        history.format_trend(HEALTH_SERIES_EXECUTION_PEERS, 'Geth peers'),
+        history.format_trend(HEALTH_SERIES_EXECUTION_SYNC_DISTANCE, 'Geth blocks behind'),
+        history.format_trend(HEALTH_SERIES_CONSENSUS_PEERS, 'Lighthouse peers'),
+        history.format_trend(HEALTH_SERIES_CONSENSUS_SYNC_DISTANCE, 'Lighthouse slots behind'),
+        history.format_trend(HEALTH_SERIES_DISK_FREE, 'Free disk space',
+            formatter=lambda value: humanize.naturalsize(value, binary=True))
+    ]
+
+    trends = [trend for trend in trends if trend != '']
+    if len(trends) == 0:
+        return ''
+
+    return '<b>Trends</b> (last 24 hours)\n' + '\n'.join(trends) + '\n\n'
+
+def get_maintenance_alerts(status):
+    # Return a description for each pending maintenance task in this status
+
+    alerts = []
+
+    clients = (
+        (status['execution_client'], status['execution_client_details']),
+        (status['consensus_client'], status['consensus_client_details'])
+    )
+
+    for client, client_details in clients:
+        next_step = client_details['next_step']
+        if next_step != MAINTENANCE_DO_NOTHING:
+            alerts.append(
+                f'{client}: {MAINTENANCE_TASKS_DESCRIPTION.get(next_step, UNKNOWN_VALUE)}')
+
+    return alerts
+
+def show_dashboard(context, use_snapshot=True, metrics_scrapers=None):
     # Show simple dashboard
 
+    # Metrics scrapers are kept for the whole dashboard session since CPU usage is measured
+    # between two scrapes
+    if metrics_scrapers is None:
+        metrics_scrapers = {}
+
+    selected_execution_client = CTX_SELECTED_EXECUTION_CLIENT
+    selected_consensus_client = CTX_SELECTED_CONSENSUS_CLIENT
+
+    current_execution_client = context[selected_execution_client]
+    current_consensus_client = context[selected_consensus_client]
+
+    # Use the snapshot from the background monitor if it is recent enough
+
+    status = None
+
+    if use_snapshot:
+        snapshot = load_status_snapshot()
+        if (
+            snapshot is not None and
+            snapshot.get('execution_client') == current_execution_client and
+            snapshot.get('consensus_client') == current_consensus_client
+            ):
+            status = snapshot
+            log.info('Using the maintenance status snapshot from the background monitor.')
+
+    if status is None:
+        status = get_maintenance_status(context, metrics_scrapers=metrics_scrapers)
+        if not status:
+            return False
+
+        save_status_snapshot(status)
+        record_health_history(status)
+        status['timestamp'] = time.time()
+
+    execution_client_details = status['execution_client_details']
+    consensus_client_details = status['consensus_client_details']
+    maintenance_needed = status['maintenance_needed']
+
+    # Build the dashboard with the details we have
+
+    buttons = [
+        ('Refresh', 2),
+        ('Quit', False),
+    ]
+
+    maintenance_message = 'Nothing is needed in terms of maintenance.'
+
+    if maintenance_needed:
+        buttons = [
+            ('Maintain', 1),
+            ('Refresh', 2),
+            ('Quit', False),
+        ]
+
+        maintenance_message = 'Some maintenance tasks are pending. Select maintain to perform them.'
+
+    # Offer to roll back to a previous version when we have one in the version store
+
+    if (
+        current_consensus_client == CONSENSUS_CLIENT_LIGHTHOUSE and
+        len(get_lighthouse_version_store().get_rollback_versions()) > 0
+        ):
+        buttons.insert(len(buttons) - 1, ('Rollback', 3))
+
+    buttons.insert(len(buttons) - 1, ('Monitor', 4))
+
+    trends_section = format_health_trends()
+
+    status_age = humanize.naturaldelta(max(time.time() - status['timestamp'], 0))
+
+    ec_section = (f'<b>Geth</b> details (I: {execution_client_details["versions"]["installed"]}, '
+        f'R: {execution_client_details["versions"]["running"]}, '
+        f'A: {execution_client_details["versions"]["available"]}, '
+        f'L: {execution_client_details["versions"]["latest"]})\n'
+        f'Service is running: {execution_client_details["service"]["running"]}\n'
+        f'{format_metrics_line(execution_client_details["metrics"])}'
+        f'<b>Maintenance task</b>: {MAINTENANCE_TASKS_DESCRIPTION.get(execution_client_details["next_step"], UNKNOWN_VALUE)}')
+
+    cc_section = (f'<b>Lighthouse</b> details (I: {consensus_client_details["versions"]["installed"]}, '
+        f'R: {consensus_client_details["versions"]["running"]}, '
+        f'L: {consensus_client_details["versions"]["latest"]})\n'
+        f'Running services - Beacon node: {consensus_client_details["bn_service"]["running"]}, Validator client: {consensus_client_details["vc_service"]["running"]}\n'
+        f'{format_metrics_line(consensus_client_details["bn_metrics"])}'
+        f'{format_metrics_line(consensus_client_details["vc_metrics"])}'
+        f'<b>Maintenance task</b>: {MAINTENANCE_TASKS_DESCRIPTION.get(consensus_client_details["next_step"], UNKNOWN_VALUE)}')
+
+    result = button_dialog(
+        title='Maintenance Dashboard',
+        text=(HTML(
+f'''
+Here are some details about your Ethereum clients as of {status_age} ago.
+
+{ec_section}
+
+{cc_section}
+
+{trends_section}{maintenance_message}
+
+Versions legend - I: Installed, R: Running, A: Available, L: Latest
+'''             )),
+        buttons=buttons
+    ).run()
+
+    if not result:
+        return False
+    
+    if result == 1:
+        if perform_maintenance(current_execution_client, execution_client_details,
+            current_consensus_client, consensus_client_details,
+            context.get(CTX_PUBLIC_KEYS, [])):
+            return show_dashboard(context, use_snapshot=False,
+                metrics_scrapers=metrics_scrapers)
+        else:
+            log.error('We could not perform all the maintenance tasks.')
+            return False
+
+    if result == 2:
+        return show_dashboard(context, use_snapshot=False,
+            metrics_scrapers=metrics_scrapers)
+
+    if result == 4:
+        enabled = ask_monitor_preference()
+        if enabled is not None:
+            save_monitor_preference(enabled)
+            configure_monitor_timer()
+        return show_dashboard(context, metrics_scrapers=metrics_scrapers)
+
+    if result == 3:
+        rollback_execution_client_details = dict(execution_client_details,
+            next_step=MAINTENANCE_DO_NOTHING)
+        rollback_consensus_client_details = dict(consensus_client_details,
+            next_step=MAINTENANCE_ROLLBACK_CLIENT)
+
+        if perform_maintenance(current_execution_client, rollback_execution_client_details,
+            current_consensus_client, rollback_consensus_client_details):
+            return show_dashboard(context, use_snapshot=False,
+                metrics_scrapers=metrics_scrapers)
+        else:
+            log.error('We could not roll back the consensus client.')
+            return False
+
+def get_maintenance_status(context, metrics_scrapers=None):
+    # Gather the clients details and find out which maintenance tasks are needed
+
     selected_execution_client = CTX_SELECTED_EXECUTION_CLIENT
     selected_consensus_client = CTX_SELECTED_CONSENSUS_CLIENT
 
     current_execution_client = context[selected_execution_client]
     current_consensus_client = context[selected_consensus_client]
 
-    # Get execution client details
+    # Get execution and consensus client details concurrently, querying all the services state
+    # with a single systemctl call
 
-    execution_client_details = get_execution_client_details(current_execution_client)
+    log.info('Gathering client details...')
+
+    services_details = get_systemd_services_details([
+        GETH_SYSTEMD_SERVICE_NAME,
+        LIGHTHOUSE_BN_SYSTEMD_SERVICE_NAME,
+        LIGHTHOUSE_VC_SYSTEMD_SERVICE_NAME
+    ])
+
+    clients_details = run_probes({
+        'execution client details': partial(get_execution_client_details,
+            current_execution_client, services_details=services_details,
+            metrics_scrapers=metrics_scrapers),
+        'consensus client details': partial(get_consensus_client_details,
+            current_consensus_client, services_details=services_details,
+            metrics_scrapers=metrics_scrapers)
+    }, default_timeout=CLIENT_DETAILS_TIMEOUT, failed_value=False)
+
+    execution_client_details = clients_details['execution client details']
     if not execution_client_details:
         log.error('Unable to get execution client details.')
         return False
@@ -127,7 +694,7 @@ def show_dashboard(context):
 
     # Get consensus client details
 
-    consensus_client_details = get_consensus_client_details(current_consensus_client)
+    consensus_client_details = clients_details['consensus client details']
     if not consensus_client_details:
         log.error('Unable to get consensus client details.')
         return False
@@ -179,71 +746,105 @@ def show_dashboard(context):
         execution_client_details['next_step'] != MAINTENANCE_DO_NOTHING or
         consensus_client_details['next_step'] != MAINTENANCE_DO_NOTHING)
 
-    # Build the dashboard with the details we have
-
-    maintenance_tasks_description = {
-        MAINTENANCE_DO_NOTHING: 'Nothing to perform here. Everything is good.',
-        MAINTENANCE_RESTART_SERVICE: 'Service needs to be restarted.',
-        MAINTENANCE_UPGRADE_CLIENT: 'Client needs to be upgraded.',
-        MAINTENANCE_CHECK_AGAIN_SOON: 'Check again. Client update should be available soon.',
-        MAINTENANCE_START_SERVICE: 'Service needs to be started.',
-        MAINTENANCE_REINSTALL_CLIENT: 'Client needs to be reinstalled.',
+    return {
+        'execution_client': current_execution_client,
+        'consensus_client': current_consensus_client,
+        'execution_client_details': execution_client_details,
+        'consensus_client_details': consensus_client_details,
+        'maintenance_needed': maintenance_needed
     }
 
-    buttons = [
-        ('Quit', False),
-    ]
+# Probes that were still running when run_probes gave up on them, with their names
+lingering_probes = {}
 
-    maintenance_message = 'Nothing is needed in terms of maintenance.'
+def wait_for_lingering_probes(timeout=APT_UPDATE_TIMEOUT + PROBE_TIMEOUT):
+    # Wait for the probes that run_probes gave up on, like a slow apt update, so that they do
+    # not hold the apt lock while we install packages. Return False if some are still running.
 
-    if maintenance_needed:
-        buttons = [
-            ('Maintain', 1),
-            ('Quit', False),
-        ]
+    probes = dict(lingering_probes)
+    if len(probes) == 0:
+        return True
 
-        maintenance_message = 'Some maintenance tasks are pending. Select maintain to perform them.'
+    log.info('Waiting for ' + ', '.join(probes.values()) + ' to finish...')
+    done, not_done = wait(list(probes.keys()), timeout=timeout)
+    for future in done:
+        lingering_probes.pop(future, None)
 
-    ec_section = (f'<b>Geth</b> details (I: {execution_client_details["versions"]["installed"]}, '
-        f'R: {execution_client_details["versions"]["running"]}, '
-        f'A: {execution_client_details["versions"]["available"]}, '
-        f'L: {execution_client_details["versions"]["latest"]})\n'
-        f'Service is running: {execution_client_details["service"]["running"]}\n'
-        f'<b>Maintenance task</b>: {maintenance_tasks_description.get(execution_client_details["next_step"], UNKNOWN_VALUE)}')
+    if len(not_done) > 0:
+        log.error('Still waiting for ' + ', '.join(probes[future] for future in not_done) + '.')
+        return False
 
-    cc_section = (f'<b>Lighthouse</b> details (I: {consensus_client_details["versions"]["installed"]}, '
-        f'R: {consensus_client_details["versions"]["running"]}, '
-        f'L: {consensus_client_details["versions"]["latest"]})\n'
-        f'Running services - Beacon node: {consensus_client_details["bn_service"]["running"]}, Validator client: {consensus_client_details["vc_service"]["running"]}\n'
-        f'<b>Maintenance task</b>: {maintenance_tasks_description.get(consensus_client_details["next_step"], UNKNOWN_VALUE)}')
+    return True
 
-    result = button_dialog(
-        title='Maintenance Dashboard',
-        text=(HTML(
-f'''
-Here are some details about your Ethereum clients.
+def run_probes(probes, default_timeout=PROBE_TIMEOUT, timeouts=None, failed_value=UNKNOWN_VALUE):
+    # Run probes concurrently and return their results by name. Results are logged as they
+    # arrive. A probe that fails or that does not finish within its timeout gets failed_value as
+    # result. Threads cannot be stopped so probes running external commands should also stop
+    # them within their timeout. Probes still running are kept in lingering_probes.
 
-{ec_section}
+    if timeouts is None:
+        timeouts = {}
 
-{cc_section}
+    results = {}
 
-{maintenance_message}
+    executor = ThreadPoolExecutor(max_workers=len(probes))
+    start_time = time.monotonic()
 
-Versions legend - I: Installed, R: Running, A: Available, L: Latest
-'''             )),
-        buttons=buttons
-    ).run()
+    futures = {}
+    deadlines = {}
+    for name, probe in probes.items():
+        future = executor.submit(probe)
+        futures[future] = name
+        deadlines[future] = start_time + timeouts.get(name, default_timeout)
 
-    if not result:
-        return False
-    
-    if result == 1:
-        if perform_maintenance(current_execution_client, execution_client_details,
-            current_consensus_client, consensus_client_details):
-            return show_dashboard(context)
-        else:
-            log.error('We could not perform all the maintenance tasks.')
-            return False
+    pending = set(futures.keys())
+
+    try:
+        while len(pending) > 0:
+            next_deadline = min(deadlines[future] for future in pending)
+            done, pending = wait(pending, timeout=max(next_deadline - time.monotonic(), 0),
+                return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                except Exception as exception:
+                    log.error(f'Probe for {name} failed. Exception: {exception}')
+                    results[name] = failed_value
+                log.info(f'Got {name} ({len(results)}/{len(probes)})')
+
+            now = time.monotonic()
+            for future in list(pending):
+                if deadlines[future] <= now:
+                    name = futures[future]
+                    log.warning(f'Probe for {name} did not finish in time.')
+                    results[name] = failed_value
+                    pending.remove(future)
+    finally:
+        # cancel_futures is only available from Python 3.9
+        for future, name in futures.items():
+            if not future.cancel() and not future.done():
+                lingering_probes[future] = name
+                future.add_done_callback(lambda future: lingering_probes.pop(future, None))
+        executor.shutdown(wait=False)
+
+    return results
+
+def get_metrics_scraper(metrics_scrapers, url, series):
+    # Return the metrics scraper for this URL, reusing the one from metrics_scrapers if we
+    # already have one
+    if metrics_scrapers is None:
+        return MetricsScraper(url, series)
+    if url not in metrics_scrapers:
+        metrics_scrapers[url] = MetricsScraper(url, series)
+    return metrics_scrapers[url]
+
+def format_metrics_line(metrics_status):
+    # Return a dashboard line for some metrics status or an empty string
+    if not metrics_status:
+        return ''
+    return f'{metrics_status}\n'
 
 def is_version(value):
     # Return true if this is a packaging version
@@ -257,7 +858,8 @@ def is_service_running(service_details):
         service_details['SubState'] == 'running'
     )
 
-def get_execution_client_details(execution_client):
+def get_execution_client_details(execution_client, services_details=None,
+    metrics_scrapers=None):
     # Get the details for the current execution client
 
     if execution_client == EXECUTION_CLIENT_GETH:
@@ -274,14 +876,19 @@ def get_execution_client_details(execution_client):
                 'running': UNKNOWN_VALUE,
                 'available': UNKNOWN_VALUE,
                 'latest': UNKNOWN_VALUE
-            }
+            },
+            'sync_distance': UNKNOWN_VALUE,
+            'metrics': '',
+            'metrics_values': {}
         }
         
         # Check for existing systemd service
         geth_service_exists = False
         geth_service_name = GETH_SYSTEMD_SERVICE_NAME
 
-        service_details = get_systemd_service_details(geth_service_name)
+        if services_details is None or geth_service_name not in services_details:
+            services_details = get_systemd_services_details([geth_service_name])
+        service_details = services_details[geth_service_name]
 
         if service_details['LoadState'] == 'loaded':
             geth_service_exists = True
@@ -295,10 +902,30 @@ def get_execution_client_details(execution_client):
         details['service']['sub'] = service_details['SubState']
         details['service']['running'] = is_service_running(service_details)
 
-        details['versions']['installed'] = get_geth_installed_version()
-        details['versions']['running'] = get_geth_running_version()
-        details['versions']['available'] = get_geth_available_version()
-        details['versions']['latest'] = get_geth_latest_version()
+        geth_metrics = get_metrics_scraper(metrics_scrapers, GETH_METRICS_URL,
+            GETH_METRICS_SERIES)
+
+        results = run_probes({
+            'Geth installed version': get_geth_installed_version,
+            'Geth running version': get_geth_running_version,
+            'Geth available version': get_geth_available_version,
+            'Geth latest version': get_geth_latest_version,
+            'Geth sync distance': get_geth_sync_distance,
+            'Geth metrics': geth_metrics.scrape
+        }, timeouts={
+            'Geth available version': APT_PROBE_TIMEOUT
+        })
+
+        details['versions']['installed'] = results['Geth installed version']
+        details['versions']['running'] = results['Geth running version']
+        details['versions']['available'] = results['Geth available version']
+        details['versions']['latest'] = results['Geth latest version']
+
+        details['sync_distance'] = results['Geth sync distance']
+
+        if results['Geth metrics'] not in (UNKNOWN_VALUE, None):
+            details['metrics'] = geth_metrics.format_status(results['Geth metrics'])
+            details['metrics_values'] = results['Geth metrics']
 
         return details
 
@@ -336,33 +963,12 @@ def get_geth_running_version():
 
     log.info('Getting Geth running version...')
 
-    local_geth_jsonrpc_url = 'http://127.0.0.1:8545'
-    request_json = {
-        'jsonrpc': '2.0',
-        'method': 'web3_clientVersion',
-        'id': 67
-    }
-    headers = {
-        'Content-Type': 'application/json'
-    }
     try:
-        response = httpx.post(local_geth_jsonrpc_url, json=request_json, headers=headers)
-    except httpx.RequestError as exception:
-        log.error(f'Cannot connect to Geth. Exception: {exception}')
-        return UNKNOWN_VALUE
-
-    if response.status_code != 200:
-        log.error(f'Unexpected status code from {local_geth_jsonrpc_url}. Status code: '
-            f'{response.status_code}')
-        return UNKNOWN_VALUE
-    
-    response_json = response.json()
-
-    if 'result' not in response_json:
-        log.error(f'Unexpected JSON response from {local_geth_jsonrpc_url}. result not found.')
+        with GethRPCClient() as geth_rpc:
+            version_agent = geth_rpc.get_client_version()
+    except GethRPCError as exception:
+        log.error(f'Cannot get Geth client version. {exception}')
         return UNKNOWN_VALUE
-    
-    version_agent = response_json['result']
 
     # Version agent should look like: Geth/v1.10.12-stable-6c4dc6c3/linux-amd64/go1.17.2
     result = re.search(r'Geth/v(?P<version>[^-/]+)(-(?P<stable>[^-/]+))?(-(?P<commit>[^-/]+))?',
@@ -377,32 +983,70 @@ def get_geth_running_version():
 
     return running_version
 
-def get_geth_available_version():
+def get_geth_sync_distance():
+    # Get how many blocks Geth is behind
+
+    log.info('Getting Geth sync distance...')
+
+    try:
+        with GethRPCClient() as geth_rpc:
+            sync_status = geth_rpc.get_sync_status()
+    except GethRPCError as exception:
+        log.error(f'Unable to get Geth sync status. {exception}')
+        return UNKNOWN_VALUE
+
+    if not sync_status.is_syncing:
+        return 0
+
+    if type(sync_status.current_block) != int or type(sync_status.highest_block) != int:
+        return UNKNOWN_VALUE
+
+    return max(sync_status.highest_block - sync_status.current_block, 0)
+
+def get_geth_available_version(max_age=APT_LISTS_MAX_AGE):
     # Get the available version for Geth, potentially for update
 
     log.info('Getting Geth available version...')
 
-    subprocess.run(['apt', '-y', 'update'])
-    process_result = subprocess.run(['apt-cache', 'policy', 'geth'], capture_output=True,
-        text=True)
-    
-    if process_result.returncode != 0:
-        log.error(f'Unexpected return code from apt-cache. Return code: '
-            f'{process_result.returncode}')
-        return UNKNOWN_VALUE
-    
-    process_output = process_result.stdout
-    result = re.search(r'Candidate: (?P<version>[^\+]+)', process_output)
-    if not result:
-        log.error(f'Cannot parse {process_output} for Geth candidate version.')
+    refresh_ethereum_ppa_lists(max_age, timeout=APT_UPDATE_TIMEOUT)
+
+    versions = get_apt_lists_package_versions(ETHEREUM_PPA_LISTS_GLOB, GETH_APT_PACKAGE)
+    if len(versions) == 0:
+        log.error('Cannot find any Geth version in the Ethereum PPA lists.')
         return UNKNOWN_VALUE
-    
-    available_version = result.group('version')
+
+    # Versions should look like: 1.10.17+build27878+focal
+    available_version = None
+    for version in versions:
+        version = version.split('+')[0]
+        if (available_version is None or
+            parse_version(version) > parse_version(available_version)):
+            available_version = version
 
     log.info(f'Geth available version is {available_version}')
 
     return available_version
 
+def refresh_ethereum_ppa_lists(max_age=APT_LISTS_MAX_AGE, timeout=None):
+    # Only refresh the Ethereum PPA lists when they are older than max_age. The refresh is
+    # stopped if it takes longer than timeout.
+
+    lists_age = get_apt_lists_age(ETHEREUM_PPA_LISTS_STAMP_NAME)
+    if lists_age is not None and lists_age <= max_age:
+        log.info(f'Ethereum PPA lists are fresh enough ({round(lists_age)} seconds old).')
+        return True
+
+    ppa_sources = get_apt_sources(ETHEREUM_PPA_SOURCE_GLOB)
+    if len(ppa_sources) == 0:
+        log.warning('Cannot find the Ethereum PPA apt source. Updating all apt sources.')
+        if run_process_group(['apt', '-y', 'update'], timeout=timeout) != 0:
+            return False
+        write_apt_lists_stamp(ETHEREUM_PPA_LISTS_STAMP_NAME)
+        return True
+
+    return update_apt_sources(ppa_sources, stamp_name=ETHEREUM_PPA_LISTS_STAMP_NAME,
+        timeout=timeout)
+
 def get_geth_latest_version():
     # Get the latest stable version for Geth, potentially not available yet for update
 
@@ -441,7 +1085,8 @@ def get_geth_latest_version():
 
     return latest_version
 
-def get_consensus_client_details(consensus_client):
+def get_consensus_client_details(consensus_client, services_details=None,
+    metrics_scrapers=None):
     # Get the details for the current consensus client
 
     if consensus_client == CONSENSUS_CLIENT_LIGHTHOUSE:
@@ -463,14 +1108,27 @@ def get_consensus_client_details(consensus_client):
                 'installed': UNKNOWN_VALUE,
                 'running': UNKNOWN_VALUE,
                 'latest': UNKNOWN_VALUE
-            }
+            },
+            'sync_distance': UNKNOWN_VALUE,
+            'bn_metrics': '',
+            'vc_metrics': '',
+            'bn_metrics_values': {},
+            'vc_metrics_values': {}
         }
         
         # Check for existing systemd services
         lighthouse_bn_service_exists = False
         lighthouse_bn_service_name = LIGHTHOUSE_BN_SYSTEMD_SERVICE_NAME
 
-        service_details = get_systemd_service_details(lighthouse_bn_service_name)
+        lighthouse_vc_service_name = LIGHTHOUSE_VC_SYSTEMD_SERVICE_NAME
+
+        if services_details is None or not (
+            lighthouse_bn_service_name in services_details and
+            lighthouse_vc_service_name in services_details):
+            services_details = get_systemd_services_details([
+                lighthouse_bn_service_name, lighthouse_vc_service_name])
+
+        service_details = services_details[lighthouse_bn_service_name]
 
         if service_details['LoadState'] == 'loaded':
             lighthouse_bn_service_exists = True
@@ -482,9 +1140,8 @@ def get_consensus_client_details(consensus_client):
             details['bn_service']['running'] = is_service_running(service_details)
 
         lighthouse_vc_service_exists = False
-        lighthouse_vc_service_name = LIGHTHOUSE_VC_SYSTEMD_SERVICE_NAME
 
-        service_details = get_systemd_service_details(lighthouse_vc_service_name)
+        service_details = services_details[lighthouse_vc_service_name]
 
         if service_details['LoadState'] == 'loaded':
             lighthouse_vc_service_exists = True
@@ -495,9 +1152,34 @@ def get_consensus_client_details(consensus_client):
             details['vc_service']['sub'] = service_details['SubState']
             details['vc_service']['running'] = is_service_running(service_details)
 
-        details['versions']['installed'] = get_lighthouse_installed_version()
-        details['versions']['running'] = get_lighthouse_running_version()
-        details['versions']['latest'] = get_lighthouse_latest_version()
+        bn_metrics = get_metrics_scraper(metrics_scrapers, LIGHTHOUSE_BN_METRICS_URL,
+            LIGHTHOUSE_BN_METRICS_SERIES)
+        vc_metrics = get_metrics_scraper(metrics_scrapers, LIGHTHOUSE_VC_METRICS_URL,
+            LIGHTHOUSE_VC_METRICS_SERIES)
+
+        results = run_probes({
+            'Lighthouse installed version': get_lighthouse_installed_version,
+            'Lighthouse running version': get_lighthouse_running_version,
+            'Lighthouse latest version': get_lighthouse_latest_version,
+            'Lighthouse sync distance': get_lighthouse_sync_distance,
+            'Lighthouse beacon node metrics': bn_metrics.scrape,
+            'Lighthouse validator client metrics': vc_metrics.scrape
+        })
+
+        details['versions']['installed'] = results['Lighthouse installed version']
+        details['versions']['running'] = results['Lighthouse running version']
+        details['versions']['latest'] = results['Lighthouse latest version']
+
+        details['sync_distance'] = results['Lighthouse sync distance']
+
+        if results['Lighthouse beacon node metrics'] not in (UNKNOWN_VALUE, None):
+            details['bn_metrics'] = bn_metrics.format_status(
+                results['Lighthouse beacon node metrics'], title='Beacon node metrics')
+            details['bn_metrics_values'] = results['Lighthouse beacon node metrics']
+        if results['Lighthouse validator client metrics'] not in (UNKNOWN_VALUE, None):
+            details['vc_metrics'] = vc_metrics.format_status(
+                results['Lighthouse validator client metrics'], title='Validator client metrics')
+            details['vc_metrics_values'] = results['Lighthouse validator client metrics']
 
         return details
 
@@ -569,6 +1251,36 @@ def get_lighthouse_running_version():
 
     return running_version
 
+def get_lighthouse_sync_distance():
+    # Get how many slots the Lighthouse beacon node is behind
+
+    log.info('Getting Lighthouse sync distance...')
+
+    local_lighthouse_bn_syncing_url = 'http://127.0.0.1:5052' + BN_SYNCING_EP
+
+    try:
+        response = httpx.get(local_lighthouse_bn_syncing_url)
+    except httpx.RequestError as exception:
+        log.error(f'Cannot connect to Lighthouse. Exception: {exception}')
+        return UNKNOWN_VALUE
+
+    if response.status_code != 200:
+        log.error(f'Unexpected status code from {local_lighthouse_bn_syncing_url}. Status code: '
+            f'{response.status_code}')
+        return UNKNOWN_VALUE
+
+    response_json = response.json()
+
+    if 'data' not in response_json or 'sync_distance' not in response_json['data']:
+        log.error(f'Unexpected JSON response from {local_lighthouse_bn_syncing_url}. '
+            f'sync_distance not found.')
+        return UNKNOWN_VALUE
+
+    try:
+        return int(response_json['data']['sync_distance'])
+    except (TypeError, ValueError):
+        return UNKNOWN_VALUE
+
 def get_lighthouse_latest_version():
     # Get the latest version for Lighthouse
 
@@ -608,19 +1320,21 @@ def get_lighthouse_latest_version():
     return latest_version
 
 def perform_maintenance(execution_client, execution_client_details, consensus_client,
-    consensus_client_details):
-    # Perform all the maintenance tasks
+    consensus_client_details, public_keys=None):
+    # Perform all the maintenance tasks. Restarts are delayed to a window without validator
+    # duties for these public keys.
 
     if execution_client == EXECUTION_CLIENT_GETH:
         # Geth maintenance tasks
 
         if execution_client_details['next_step'] == MAINTENANCE_RESTART_SERVICE:
-            log.info('Restarting Geth service...')
+            if wait_for_restart_window(public_keys):
+                log.info('Restarting Geth service...')
 
-            subprocess.run(['systemctl', 'restart', GETH_SYSTEMD_SERVICE_NAME])
+                subprocess.run(['systemctl', 'restart', GETH_SYSTEMD_SERVICE_NAME])
 
         elif execution_client_details['next_step'] == MAINTENANCE_UPGRADE_CLIENT:
-            if not upgrade_geth():
+            if not upgrade_geth(public_keys):
                 log.error('We could not upgrade the Geth client.')
                 return False
             
@@ -639,13 +1353,14 @@ def perform_maintenance(execution_client, execution_client_details, consensus_cl
         # Lighthouse maintenance tasks
 
         if consensus_client_details['next_step'] == MAINTENANCE_RESTART_SERVICE:
-            log.info('Restarting Lighthouse services...')
+            if wait_for_restart_window(public_keys):
+                log.info('Restarting Lighthouse services...')
 
-            subprocess.run(['systemctl', 'restart', LIGHTHOUSE_BN_SYSTEMD_SERVICE_NAME,
-                LIGHTHOUSE_VC_SYSTEMD_SERVICE_NAME])
+                subprocess.run(['systemctl', 'restart', LIGHTHOUSE_BN_SYSTEMD_SERVICE_NAME,
+                    LIGHTHOUSE_VC_SYSTEMD_SERVICE_NAME])
 
         elif consensus_client_details['next_step'] == MAINTENANCE_UPGRADE_CLIENT:
-            if not upgrade_lighthouse():
+            if not upgrade_lighthouse(public_keys):
                 log.error('We could not upgrade the Lighthouse client.')
                 return False
             
@@ -657,25 +1372,276 @@ def perform_maintenance(execution_client, execution_client_details, consensus_cl
 
         elif consensus_client_details['next_step'] == MAINTENANCE_REINSTALL_CLIENT:
             log.warn('TODO: Reinstalling client is to be implemented.')
+
+        elif consensus_client_details['next_step'] == MAINTENANCE_ROLLBACK_CLIENT:
+            if not rollback_lighthouse():
+                log.error('We could not roll back the Lighthouse client.')
+                return False
     else:
         log.error(f'Unknown consensus client {consensus_client}.')
         return False
 
     return True
 
-def upgrade_geth():
-    # Upgrade the Geth client
+def wait_for_restart_window(public_keys):
+    # Offer to wait for the longest window without validator duties in the current and next
+    # epoch before restarting a client. Return True when the restart should happen now and
+    # False if the user cancelled it. Return True right away if there are no keys or if no
+    # window could be found.
+
+    if not public_keys:
+        return True
+
+    log.info('Looking for a restart window without validator duties...')
+
+    restart_window = find_restart_window('http://127.0.0.1:5052', public_keys, log)
+    if restart_window is None:
+        log.warning('Unable to find a restart window without validator duties. Restarting now.')
+        return True
+
+    log.info(f'Restart window is {restart_window.format()}.')
+
+    delay = restart_window.start_time - time.time()
+    if delay <= 0 and not restart_window.has_sync_duty:
+        return True
+
+    sync_duty_text = ''
+    if restart_window.has_sync_duty:
+        sync_duty_text = ('\nYour validator is part of the current sync committee. Any restart '
+            'will miss\nsome sync committee messages.\n')
+
+    wait_text = 'The window is open right now.'
+    if delay > 0:
+        wait_text = f'The window opens in {humanize.naturaldelta(delay)}.'
+
+    result = button_dialog(
+        title='Restart window',
+        text=(
+f'''
+Restarting a client while your validator has duties will miss them. The
+best restart window without validator duties is:
+
+{restart_window.format()}
+
+{wait_text}
+{sync_duty_text}
+Do you want to wait for this window, restart now or cancel the restart?
+'''     ),
+        buttons=[
+            ('Wait', 1),
+            ('Restart now', 2),
+            ('Cancel', False)
+        ]
+    ).run()
+
+    if not result:
+        log.warning('Restart was cancelled.')
+        return False
+
+    if result == 2:
+        log.info('Restarting now without waiting for the restart window.')
+        return True
+
+    def waiting_callback(set_percentage, log_text, change_status, set_result, get_exited):
+        # Wait in small slices so that the dialog can be exited at any time
+        total_delay = max(restart_window.start_time - time.time(), 0.001)
+
+        while not get_exited():
+            remaining = restart_window.start_time - time.time()
+            if remaining <= 0:
+                set_percentage(100)
+                return True
+
+            set_percentage(round((total_delay - remaining) / total_delay * 100.0))
+            change_status(f'Restarting in {humanize.naturaldelta(remaining)} '
+                f'({int(remaining)} seconds)')
+            time.sleep(min(0.5, remaining))
+
+    result = progress_log_dialog(
+        title='Waiting for the restart window',
+        text=(
+f'''
+Waiting for the restart window without validator duties:
+
+{restart_window.format()}
+
+The restart will happen as soon as the window opens. Use the Cancel button
+to cancel the restart.
+'''     ),
+        status_text='Waiting for the restart window',
+        quit_text='Cancel',
+        run_callback=waiting_callback
+    ).run()
+
+    if not result:
+        log.warning('Restart was cancelled while waiting for the restart window.')
+        return False
+
+    return True
+
+def get_apt_upgrade_candidate(package):
+    # Return the candidate version of an apt package if it differs from the installed one
+
+    process_result = subprocess.run(['apt-cache', 'policy', package], capture_output=True,
+        text=True)
+    if process_result.returncode != 0:
+        log.error(f'Unable to get the apt policy for {package}. Output: '
+            f'{process_result.stdout}{process_result.stderr}')
+        return None
+
+    installed = re.search(r'^\s*Installed: (?P<version>\S+)', process_result.stdout, re.MULTILINE)
+    candidate = re.search(r'^\s*Candidate: (?P<version>\S+)', process_result.stdout, re.MULTILINE)
+    if not candidate or candidate.group('version') == '(none)':
+        return None
+
+    if installed and installed.group('version') == candidate.group('version'):
+        return None
+
+    return candidate.group('version')
+
+def verify_cached_apt_package(package, version):
+    # Verify the package file downloaded in the apt cache against the size and SHA256 hash
+    # listed in the signed apt lists and make sure it is a readable Debian package.
+
+    process_result = subprocess.run(['apt-cache', 'show', f'{package}={version}'],
+        capture_output=True, text=True)
+    if process_result.returncode != 0:
+        log.error(f'Unable to get the apt record for {package} {version}. Output: '
+            f'{process_result.stdout}{process_result.stderr}')
+        return False
+
+    record = process_result.stdout.split('\n\n')[0]
+    fields = {}
+    for field in ('Architecture', 'Size', 'SHA256'):
+        result = re.search(r'^' + field + r': (?P<value>\S+)', record, re.MULTILINE)
+        if not result:
+            log.error(f'Missing {field} field in the apt record for {package} {version}.')
+            return False
+        fields[field] = result.group('value')
+
+    # apt quotes the colon of an epoch when naming the files it downloads
+    archive_name = (f'{package}_{version.replace(":", "%3a")}_'
+        f'{fields["Architecture"]}.deb')
+    archive_path = Path('/var/cache/apt/archives', archive_name)
+    if not archive_path.is_file():
+        log.error(f'Cannot find the downloaded package at {archive_path}.')
+        return False
+
+    archive_size = archive_path.stat().st_size
+    if archive_size != int(fields['Size']):
+        log.error(f'Unexpected size for {archive_path}. Expected {fields["Size"]} bytes, got '
+            f'{archive_size} bytes.')
+        return False
+
+    sha256 = hashlib.sha256()
+    with open(archive_path, 'rb') as archive_file:
+        for chunk in iter(lambda: archive_file.read(1024 * 1024), b''):
+            sha256.update(chunk)
+
+    if sha256.hexdigest().lower() != fields['SHA256'].lower():
+        log.error(f'Unexpected SHA256 hash for {archive_path}. Expected {fields["SHA256"]}, got '
+            f'{sha256.hexdigest()}.')
+        return False
+
+    process_result = subprocess.run(['dpkg-deb', '--info', str(archive_path)],
+        capture_output=True, text=True)
+    if process_result.returncode != 0:
+        log.error(f'{archive_path} is not a valid Debian package. Output: '
+            f'{process_result.stdout}{process_result.stderr}')
+        return False
+
+    return True
+
+def upgrade_geth(public_keys=None):
+    # Upgrade the Geth client. Packages are downloaded and verified while the service keeps
+    # running, then they are installed and the service is restarted in a tight window.
     log.info('Upgrading Geth client...')
 
-    subprocess.run(['apt', '-y', 'update'])
-    subprocess.run(['apt', '-y', 'install', 'geth'])
+    phase_durations = {}
+
+    if not wait_for_lingering_probes():
+        log.error('A previous apt probe is still running. Try again later.')
+        return False
+
+    phase_start = time.monotonic()
+    if not refresh_ethereum_ppa_lists(max_age=0):
+        log.warning('Unable to refresh the Ethereum PPA lists. Using the current ones.')
+    phase_durations['refresh'] = time.monotonic() - phase_start
+
+    # Download phase
+
+    log.info('Downloading Geth packages...')
+    phase_start = time.monotonic()
+    process_result = subprocess.run([
+        'apt', '-y', 'install', '--download-only', GETH_APT_PACKAGE])
+    phase_durations['download'] = time.monotonic() - phase_start
+
+    if process_result.returncode != 0:
+        log.error('Unable to download the Geth packages.')
+        return False
+
+    # Verify phase. Check the downloaded package in the apt cache against the size and hash
+    # from the signed lists before stopping anything.
+
+    log.info('Verifying Geth packages...')
+    phase_start = time.monotonic()
+    candidate_version = get_apt_upgrade_candidate(GETH_APT_PACKAGE)
+    if candidate_version is None:
+        log.warning('There is no Geth package to upgrade. Leaving the Geth service alone.')
+        return True
+
+    package_verified = verify_cached_apt_package(GETH_APT_PACKAGE, candidate_version)
+    phase_durations['verify'] = time.monotonic() - phase_start
+
+    if not package_verified:
+        log.error(f'Unable to verify the downloaded Geth {candidate_version} package.')
+        return False
+
+    log.info(f'Geth {candidate_version} is downloaded and ready to be installed.')
+
+    # Install and restart phases
+
+    if not wait_for_restart_window(public_keys):
+        log.warning('Geth upgrade was cancelled. The downloaded package stays in the apt cache.')
+        return True
+
+    log.info('Installing Geth packages...')
+    phase_start = time.monotonic()
+    process_result = subprocess.run([
+        'apt', '-y', '--no-download', 'install', GETH_APT_PACKAGE])
+    phase_durations['install'] = time.monotonic() - phase_start
+
+    if process_result.returncode != 0:
+        log.error('Unable to install the Geth packages.')
+        return False
 
     log.info('Restarting Geth service...')
+    downtime_start = time.monotonic()
     subprocess.run(['systemctl', 'restart', GETH_SYSTEMD_SERVICE_NAME])
 
+    service_running = wait_for_services_running([GETH_SYSTEMD_SERVICE_NAME],
+        SERVICE_RESTART_TIMEOUT)
+    rpc_available = service_running and wait_for_geth_rpc(
+        max(SERVICE_RESTART_TIMEOUT - (time.monotonic() - downtime_start), 0))
+    phase_durations['restart'] = time.monotonic() - downtime_start
+
+    log.info('Geth upgrade phases: ' + ', '.join(f'{phase} {duration:.1f}s'
+        for phase, duration in phase_durations.items()))
+
+    if not service_running:
+        log.error(f'Geth service is not running {phase_durations["restart"]:.1f} seconds after '
+            f'restarting it.')
+        return False
+
+    if rpc_available:
+        log.info(f'Execution client downtime was {phase_durations["restart"]:.1f} seconds.')
+    else:
+        log.warning(f'Geth RPC is still not available {phase_durations["restart"]:.1f} seconds '
+            f'after restarting the service.')
+
     return True
 
-def upgrade_lighthouse():
+def upgrade_lighthouse(public_keys=None):
     # Upgrade the Lighthouse client
     log.info('Upgrading Lighthouse client...')
 
@@ -825,27 +1791,156 @@ binary after {retry_count} retries.
             'We will stop here to protect you.')
         return False
     
-    # Stopping Lighthouse services before updating the binary
-    log.info('Stopping Lighthouse services...')
-    subprocess.run(['systemctl', 'stop', LIGHTHOUSE_BN_SYSTEMD_SERVICE_NAME,
-        LIGHTHOUSE_VC_SYSTEMD_SERVICE_NAME])
-
-    # Extracting the Lighthouse binary archive
-    log.info('Updating Lighthouse binary...')
-    subprocess.run([
-        'tar', 'xvf', binary_path, '--directory', LIGHTHOUSE_INSTALLED_DIRECTORY])
-    
-    # Restarting Lighthouse services after updating the binary
-    log.info('Starting Lighthouse services...')
-    subprocess.run(['systemctl', 'start', LIGHTHOUSE_BN_SYSTEMD_SERVICE_NAME,
-        LIGHTHOUSE_VC_SYSTEMD_SERVICE_NAME])
+    # Extract and verify the new Lighthouse binary while the services are still running. The
+    # running services keep using the old binary until they are restarted.
+    installed_version = install_lighthouse_release(binary_path, release_json.get('tag_name'))
 
     # Remove download leftovers
     binary_path.unlink()
     signature_path.unlink()
 
+    if installed_version is None:
+        return False
+
+    # Restarting Lighthouse services to use the new binary
+    if not wait_for_restart_window(public_keys):
+        log.warning('Lighthouse services were not restarted. They will use the new version on '
+            'their next restart.')
+        return True
+
+    return restart_lighthouse_services()
+
+def restart_lighthouse_services():
+    # Restart the Lighthouse services and report how long they were down
+
+    log.info('Restarting Lighthouse services...')
+    downtime_start = time.monotonic()
+
+    subprocess.run(['systemctl', 'restart', LIGHTHOUSE_BN_SYSTEMD_SERVICE_NAME,
+        LIGHTHOUSE_VC_SYSTEMD_SERVICE_NAME])
+
+    services_running = wait_for_services_running([LIGHTHOUSE_BN_SYSTEMD_SERVICE_NAME,
+        LIGHTHOUSE_VC_SYSTEMD_SERVICE_NAME], SERVICE_RESTART_TIMEOUT)
+    services_downtime = time.monotonic() - downtime_start
+
+    if not services_running:
+        log.error(f'Lighthouse services are not running {services_downtime:.1f} seconds after '
+            f'restarting them.')
+        return False
+
+    api_available = wait_for_lighthouse_api(max(SERVICE_RESTART_TIMEOUT - services_downtime, 0))
+    api_downtime = time.monotonic() - downtime_start
+
+    if api_available:
+        log.info(f'Lighthouse services were restarted in {services_downtime:.1f} seconds and the '
+            f'beacon node API was back after {api_downtime:.1f} seconds.')
+    else:
+        log.warning(f'Lighthouse services were restarted in {services_downtime:.1f} seconds but '
+            f'the beacon node API is still not available after {api_downtime:.1f} seconds.')
+
     return True
 
+def rollback_lighthouse():
+    # Switch back to a previous Lighthouse version from the version store and restart the
+    # services right away
+
+    store = get_lighthouse_version_store()
+
+    rollback_versions = store.get_rollback_versions()
+    if len(rollback_versions) == 0:
+        log.error('There is no previous Lighthouse version to roll back to.')
+        return False
+
+    active_version = store.get_active_version()
+
+    rollback_version = radiolist_dialog(
+        title='Lighthouse rollback',
+        text=(
+f'''
+Which Lighthouse version do you want to roll back to? The Lighthouse
+services will be restarted right away.
+
+Current version: {active_version}
+'''     ),
+        values=[(version, version) for version in rollback_versions],
+        ok_text='Roll back',
+        cancel_text='Cancel'
+    ).run()
+
+    if not rollback_version:
+        return False
+
+    log.info(f'Rolling back Lighthouse from {active_version} to {rollback_version}...')
+
+    try:
+        activated = store.activate(rollback_version)
+    except OSError as exception:
+        log.error(f'Unable to switch the Lighthouse binary. Exception: {exception}')
+        return False
+
+    if not activated:
+        log.error(f'Unable to activate Lighthouse version {rollback_version}.')
+        return False
+
+    return restart_lighthouse_services()
+
+def wait_for_services_running(services, timeout):
+    # Wait for these systemd services to be running. Return True if they are all running before
+    # the timeout.
+
+    deadline = time.monotonic() + timeout
+
+    while True:
+        services_details = get_systemd_services_details(services)
+        if all(is_service_running(service_details)
+            for service_details in services_details.values()):
+            return True
+
+        if time.monotonic() >= deadline:
+            return False
+
+        time.sleep(0.5)
+
+def wait_for_geth_rpc(timeout):
+    # Wait for the local Geth JSON-RPC API to answer. Return True if it answered before the
+    # timeout.
+
+    deadline = time.monotonic() + timeout
+
+    with GethRPCClient() as geth_rpc:
+        while True:
+            try:
+                geth_rpc.get_client_version()
+                return True
+            except GethRPCError:
+                pass
+
+            if time.monotonic() >= deadline:
+                return False
+
+            time.sleep(1)
+
+def wait_for_lighthouse_api(timeout):
+    # Wait for the local Lighthouse beacon node API to answer. Return True if it answered before
+    # the timeout.
+
+    local_lighthouse_bn_version_url = 'http://127.0.0.1:5052' + BN_VERSION_EP
+
+    deadline = time.monotonic() + timeout
+
+    while True:
+        try:
+            response = httpx.get(local_lighthouse_bn_version_url, timeout=5.0)
+            if response.status_code == 200:
+                return True
+        except httpx.RequestError:
+            pass
+
+        if time.monotonic() >= deadline:
+            return False
+
+        time.sleep(1)
+
 def use_default_client(context):
     # Set the default clients in context if they are not provided
 
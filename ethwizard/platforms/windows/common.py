@@ -1,12 +1,13 @@
 import os
 import sys
 import json
+import codecs
 
 import logging
 
 from pathlib import Path
 
-from typing import Optional
+from typing import Optional, Union
 
 from ethwizard import __version__
 
@@ -37,6 +38,18 @@ def save_state(step_id: str, context: dict) -> bool:
 
     return True
 
+def get_save_directory() -> Optional[Path]:
+    # Return the directory where we can save files for the wizard
+
+    app_data = Path(os.getenv('LOCALAPPDATA', os.getenv('APPDATA', '')))
+    if not app_data.is_dir():
+        return None
+
+    app_dir = app_data.joinpath('eth-wizard')
+    app_dir.mkdir(parents=True, exist_ok=True)
+
+    return app_dir
+
 def load_state() -> Optional[dict]:
     # Load wizard state
 
@@ -100,4 +113,152 @@ def init_logging():
 
         log.addHandler(fh)
 
-    log.info(f'Starting eth-wizard version {__version__}')
\ No newline at end of file
+    log.info(f'Starting eth-wizard version {__version__}')
+
+def open_shared_log_file(path: Union[str, Path]):
+    # Open a log file for reading in binary mode while letting the writer rename or delete it.
+    # NSSM rotates its log files by renaming them which fails if we keep a handle opened with
+    # the default Python sharing mode on Windows.
+
+    if os.name != 'nt':
+        return open(path, 'rb')
+
+    import ctypes
+    import msvcrt
+
+    from ctypes import wintypes
+
+    GENERIC_READ = 0x80000000
+    FILE_SHARE_READ = 0x00000001
+    FILE_SHARE_WRITE = 0x00000002
+    FILE_SHARE_DELETE = 0x00000004
+    OPEN_EXISTING = 3
+    FILE_ATTRIBUTE_NORMAL = 0x80
+    INVALID_HANDLE_VALUE = wintypes.HANDLE(-1).value
+
+    kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    kernel32.CreateFileW.restype = wintypes.HANDLE
+    kernel32.CreateFileW.argtypes = (wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD,
+        wintypes.LPVOID, wintypes.DWORD, wintypes.DWORD, wintypes.HANDLE)
+
+    handle = kernel32.CreateFileW(str(path), GENERIC_READ,
+        FILE_SHARE_READ | FILE_SHARE_WRITE | FILE_SHARE_DELETE, None, OPEN_EXISTING,
+        FILE_ATTRIBUTE_NORMAL, None)
+    if handle == INVALID_HANDLE_VALUE:
+        raise ctypes.WinError(ctypes.get_last_error())
+
+    fd = msvcrt.open_osfhandle(handle, os.O_RDONLY | os.O_BINARY)
+    return os.fdopen(fd, 'rb')
+
+class LogTailer():
+    # Incrementally read a service log file that might get rotated or truncated. The file handle
+    # is kept open between reads, rotation is detected by file identity and truncation by size.
+    # Reads are bounded so that a burst of logs does not return megabytes of text in one call.
+
+    def __init__(self, path: Union[str, Path], chunk_size: int = 64 * 1024,
+        max_read_size: int = 1024 * 1024, encoding: str = 'utf8'):
+
+        self.path = Path(path)
+        self.chunk_size = chunk_size
+        self.max_read_size = max_read_size
+        self.encoding = encoding
+
+        self._file = None
+        self._identity = None
+        self._position = 0
+        self._decoder = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._identity = None
+        self._position = 0
+        self._decoder = None
+
+    def read(self) -> str:
+        # Return the new text found in the log file since the last call
+
+        if self._file is None and not self._open():
+            return ''
+
+        output = []
+        remaining = self.max_read_size
+
+        path_identity = self._path_identity()
+        if path_identity is not None and path_identity != self._identity:
+            # The log file was rotated. Drain what is left in the old file before switching.
+            data = self._read_bytes(remaining)
+            remaining = remaining - len(data)
+            output.append(self._decode(data, final=True))
+
+            if remaining <= 0:
+                return ''.join(output)
+
+            self.close()
+            if not self._open():
+                return ''.join(output)
+        else:
+            try:
+                current_size = os.fstat(self._file.fileno()).st_size
+            except OSError as exception:
+                log.warning(f'Unable to stat log file {self.path}. Exception: {exception}')
+                self.close()
+                return ''
+
+            if current_size < self._position:
+                # The log file was truncated, start over from the beginning.
+                self._file.seek(0)
+                self._position = 0
+                self._decoder = codecs.getincrementaldecoder(self.encoding)(errors='replace')
+
+        data = self._read_bytes(remaining)
+        output.append(self._decode(data))
+
+        return ''.join(output)
+
+    def _open(self) -> bool:
+        if not self.path.is_file():
+            return False
+
+        try:
+            self._file = open_shared_log_file(self.path)
+            self._identity = self._file_identity(os.fstat(self._file.fileno()))
+        except OSError as exception:
+            log.warning(f'Unable to open log file {self.path}. Exception: {exception}')
+            self._file = None
+            return False
+
+        self._position = 0
+        self._decoder = codecs.getincrementaldecoder(self.encoding)(errors='replace')
+        return True
+
+    def _path_identity(self):
+        try:
+            return self._file_identity(os.stat(self.path))
+        except OSError:
+            return None
+
+    def _file_identity(self, stat_result):
+        return (stat_result.st_dev, stat_result.st_ino)
+
+    def _read_bytes(self, limit: int) -> bytes:
+        data = []
+        while limit > 0:
+            chunk = self._file.read(min(self.chunk_size, limit))
+            if not chunk:
+                break
+            data.append(chunk)
+            limit = limit - len(chunk)
+            self._position = self._position + len(chunk)
+
+        return b''.join(data)
+
+    def _decode(self, data: bytes, final: bool = False) -> str:
+        return self._decoder.decode(data, final)
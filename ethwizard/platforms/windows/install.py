@@ -40,16 +40,29 @@ from ethwizard.platforms.common import (
     input_dialog_default,
     progress_log_dialog,
     search_for_generated_keys,
+    KeyManifest,
+    verify_keystores_password,
+    validate_deposit_data,
     select_keys_directory,
-    get_bc_validator_deposits,
+    get_validator_deposits,
+    get_bn_activation_queue,
     test_open_ports,
     show_whats_next,
     show_public_keys,
     Step,
-    test_context_variable
+    test_context_variable,
+    GethRPCClient,
+    GethRPCError,
+    BeaconEventsSubscriber,
+    GethEventsSubscriber,
+    SyncProgressEstimator,
+    PollingScheduler,
+    MetricsScraper,
+    HealthHistory,
+    VersionStore
 )
 
-from ethwizard.platforms.windows.common import log, quit_app
+from ethwizard.platforms.windows.common import log, quit_app, LogTailer, get_save_directory
 
 from prompt_toolkit.formatted_text import HTML
 from prompt_toolkit.shortcuts import button_dialog, input_dialog
@@ -1315,138 +1328,116 @@ To examine your geth service logs, inspect the following file:
 
         set_percentage(10)
 
-        err_log_read_index = 0
+        exe_sync_estimator = SyncProgressEstimator('geth', 'blocks', get_save_directory())
+        health_history = HealthHistory(get_save_directory())
+        poller = PollingScheduler(get_exited)
+        exe_metrics = MetricsScraper(GETH_METRICS_URL, GETH_METRICS_SERIES)
 
-        while True:
+        with LogTailer(geth_stderr_log_path) as err_log_tailer, \
+                GethRPCClient() as geth_rpc, \
+                GethEventsSubscriber() as geth_events:
+            # Output logs, also called while waiting so that they are shown as they come
+            def output_logs():
+                err_log_text = err_log_tailer.read()
 
-            if get_exited():
-                return {
-                    'exe_is_working': exe_is_working,
-                    'exe_is_syncing': exe_is_syncing,
-                    'exe_starting_block': exe_starting_block,
-                    'exe_current_block': exe_current_block,
-                    'exe_highest_block': exe_highest_block,
-                    'exe_connected_peers': exe_connected_peers
-                }
-
-            # Output logs
-            err_log_text = ''
-            with open(geth_stderr_log_path, 'r', encoding='utf8') as log_file:
-                log_file.seek(err_log_read_index)
-                err_log_text = log_file.read()
-                err_log_read_index = log_file.tell()
+                err_log_length = len(err_log_text)
+                if err_log_length > 0:
+                    log_text(err_log_text)
 
-            err_log_length = len(err_log_text)
-            if err_log_length > 0:
-                log_text(err_log_text)
+            while True:
 
-            time.sleep(1)
-            
-            local_geth_jsonrpc_url = 'http://127.0.0.1:8545'
-            request_json = {
-                'jsonrpc': '2.0',
-                'method': 'eth_syncing',
-                'id': 1
-            }
-            headers = {
-                'Content-Type': 'application/json'
-            }
-            try:
-                response = httpx.post(local_geth_jsonrpc_url, json=request_json, headers=headers)
-            except httpx.RequestError as exception:
-                log_text(f'Exception: {exception} while querying Geth.')
-                continue
+                if get_exited():
+                    return {
+                        'exe_is_working': exe_is_working,
+                        'exe_is_syncing': exe_is_syncing,
+                        'exe_starting_block': exe_starting_block,
+                        'exe_current_block': exe_current_block,
+                        'exe_highest_block': exe_highest_block,
+                        'exe_connected_peers': exe_connected_peers
+                    }
 
-            if response.status_code != 200:
-                log_text(
-                    f'Status code: {response.status_code} while querying Geth.')
-                continue
-        
-            response_json = response.json()
-            syncing_json = response_json
+                # Output logs
+                output_logs()
 
-            local_geth_jsonrpc_url = 'http://127.0.0.1:8545'
-            request_json = {
-                'jsonrpc': '2.0',
-                'method': 'net_peerCount',
-                'id': 1
-            }
-            headers = {
-                'Content-Type': 'application/json'
-            }
-            try:
-                response = httpx.post(local_geth_jsonrpc_url, json=request_json, headers=headers)
-            except httpx.RequestError as exception:
-                log_text(f'Exception: {exception} while querying Geth.')
-                continue
+                if not poller.wait(on_tick=output_logs):
+                    continue
+            
+                sync_status = geth_events.get_sync_status()
+                try:
+                    if sync_status is not None:
+                        exe_connected_peers = geth_rpc.get_peer_count()
+                    else:
+                        # Websocket events are not available, fallback on polling over HTTP
+                        geth_status = geth_rpc.get_status()
+                        sync_status = geth_status.sync_status
+                        exe_connected_peers = geth_status.connected_peers
+                except GethRPCError as exception:
+                    log_text(f'{exception} while querying Geth.')
+                    continue
 
-            if response.status_code != 200:
-                log_text(
-                    f'Status code: {response.status_code} while querying Geth.')
-                continue
+                exe_is_syncing = sync_status.is_syncing
+                exe_starting_block = sync_status.starting_block
+                exe_current_block = sync_status.current_block
+                exe_highest_block = sync_status.highest_block
+            
+                exe_has_few_peers = exe_connected_peers >= EXE_MIN_FEW_PEERS
 
-            response_json = response.json()
-            peer_count_json = response_json
+                if exe_is_syncing or exe_has_few_peers:
+                    set_percentage(100)
+                else:
+                    set_percentage(10 +
+                        round(min(exe_connected_peers / EXE_MIN_FEW_PEERS, 1.0) * 90.0))
 
-            exe_starting_block = UNKNOWN_VALUE
-            exe_current_block = UNKNOWN_VALUE
-            exe_highest_block = UNKNOWN_VALUE
-            if (
-                syncing_json and
-                'result' in syncing_json and
-                syncing_json['result']
-                ):
-                exe_is_syncing = True
-                if 'startingBlock' in syncing_json['result']:
-                    exe_starting_block = int(syncing_json['result']['startingBlock'], 16)
-                if 'currentBlock' in syncing_json['result']:
-                    exe_current_block = int(syncing_json['result']['currentBlock'], 16)
-                if 'highestBlock' in syncing_json['result']:
-                    exe_highest_block = int(syncing_json['result']['highestBlock'], 16)
-            else:
-                exe_is_syncing = False
+                if (
+                    exe_is_syncing and
+                    type(exe_current_block) == int and
+                    type(exe_highest_block) == int
+                    ):
+                    exe_sync_estimator.add_sample(exe_current_block,
+                        exe_highest_block - exe_current_block)
+
+                health_history.record({
+                    HEALTH_SERIES_EXECUTION_PEERS: exe_connected_peers,
+                    HEALTH_SERIES_EXECUTION_SYNC_DISTANCE: (exe_highest_block - exe_current_block
+                        if exe_is_syncing and type(exe_current_block) == int and
+                            type(exe_highest_block) == int
+                        else None)
+                })
 
-            exe_connected_peers = 0
-            if (
-                peer_count_json and
-                'result' in peer_count_json and
-                peer_count_json['result']
-                ):
-                exe_connected_peers = int(peer_count_json['result'], 16)
-            
-            exe_has_few_peers = exe_connected_peers >= EXE_MIN_FEW_PEERS
+                poller.update(exe_connected_peers >= EXE_MIN_FEW_PEERS / 2,
+                    exe_current_block, exe_is_syncing)
 
-            if exe_is_syncing or exe_has_few_peers:
-                set_percentage(100)
-            else:
-                set_percentage(10 +
-                    round(min(exe_connected_peers / EXE_MIN_FEW_PEERS, 1.0) * 90.0))
+                exe_details_status = '\n'.join(filter(None, [
+                    exe_sync_estimator.format_status(),
+                    exe_metrics.format_status(exe_metrics.scrape())
+                ]))
 
-            change_status((
+                change_status((
 f'''
 Syncing: {exe_is_syncing} (Starting: {exe_starting_block}, Current: {exe_current_block}, Highest: {exe_highest_block})
 Connected Peers: {exe_connected_peers}
+{exe_details_status}
 '''         ).strip())
 
-            if exe_is_syncing or exe_has_few_peers:
-                exe_is_working = True
-                return {
-                    'exe_is_working': exe_is_working,
-                    'exe_is_syncing': exe_is_syncing,
-                    'exe_starting_block': exe_starting_block,
-                    'exe_current_block': exe_current_block,
-                    'exe_highest_block': exe_highest_block,
-                    'exe_connected_peers': exe_connected_peers
-                }
-            else:
-                set_result({
-                    'exe_is_working': exe_is_working,
-                    'exe_is_syncing': exe_is_syncing,
-                    'exe_starting_block': exe_starting_block,
-                    'exe_current_block': exe_current_block,
-                    'exe_highest_block': exe_highest_block,
-                    'exe_connected_peers': exe_connected_peers
-                })
+                if exe_is_syncing or exe_has_few_peers:
+                    exe_is_working = True
+                    return {
+                        'exe_is_working': exe_is_working,
+                        'exe_is_syncing': exe_is_syncing,
+                        'exe_starting_block': exe_starting_block,
+                        'exe_current_block': exe_current_block,
+                        'exe_highest_block': exe_highest_block,
+                        'exe_connected_peers': exe_connected_peers
+                    }
+                else:
+                    set_result({
+                        'exe_is_working': exe_is_working,
+                        'exe_is_syncing': exe_is_syncing,
+                        'exe_starting_block': exe_starting_block,
+                        'exe_current_block': exe_current_block,
+                        'exe_highest_block': exe_highest_block,
+                        'exe_connected_peers': exe_connected_peers
+                    })
 
     result = progress_log_dialog(
         title='Verifying proper Geth service installation',
@@ -2128,16 +2119,29 @@ Do you want to skip installing the teku binary distribution?
             log.error('No files found in teku archive. We cannot continue.')
             return False
         
-        # Move all those extracted files into their final destination
-        if teku_path.is_dir():
+        # Move the extracted files into the version store and point the teku directory to them
+        # with a junction so we can switch back to a previous version quickly
+        teku_store = VersionStore(base_directory.joinpath('bin', 'versions', 'teku'), teku_path)
+
+        if teku_path.is_dir() and not teku_path.is_symlink() and not teku_store.is_junction():
             shutil.rmtree(teku_path)
-        teku_path.mkdir(parents=True, exist_ok=True)
 
         archive_extracted_dir = download_path.joinpath(Path(archive_members[0]).parts[0])
+        teku_store_version = archive_extracted_dir.name
 
-        with os.scandir(archive_extracted_dir) as it:
-            for diritem in it:
-                shutil.move(diritem.path, teku_path)
+        try:
+            teku_store.add_version(archive_extracted_dir, teku_store_version)
+            teku_store_activated = teku_store.activate(teku_store_version)
+        except OSError as exception:
+            log.error(f'Unable to install teku in {teku_store.root}. Exception {exception}')
+            return False
+
+        if not teku_store_activated:
+            log.error(f'Unable to create the teku junction in {teku_path}. We cannot continue.')
+            return False
+
+        for removed_version in teku_store.prune():
+            log.info(f'Removed old teku version {removed_version}.')
             
         # Make sure teku was installed properly
         teku_found = False
@@ -2495,148 +2499,171 @@ To examine your teku service logs, inspect the following files:
 
         set_percentage(10)
 
-        out_log_read_index = 0
-        err_log_read_index = 0
+        bn_sync_estimator = SyncProgressEstimator('teku', 'slots', get_save_directory())
+        health_history = HealthHistory(get_save_directory())
+        poller = PollingScheduler(get_exited)
+        bn_metrics = MetricsScraper(TEKU_METRICS_URL, TEKU_METRICS_SERIES)
 
-        while True:
+        with LogTailer(teku_stdout_log_path) as out_log_tailer, \
+                LogTailer(teku_stderr_log_path) as err_log_tailer, \
+                BeaconEventsSubscriber(local_teku_http_base) as bn_events:
+            # Output logs, also called while waiting so that they are shown as they come
+            def output_logs():
+                out_log_text = out_log_tailer.read()
 
-            if get_exited():
-                return {
-                    'bn_is_working': bn_is_working,
-                    'bn_is_syncing': bn_is_syncing,
-                    'bn_head_slot': bn_head_slot,
-                    'bn_sync_distance': bn_sync_distance,
-                    'bn_connected_peers': bn_connected_peers
-                }
+                err_log_text = err_log_tailer.read()
 
-            # Output logs
-            out_log_text = ''
-            with open(teku_stdout_log_path, 'r', encoding='utf8') as log_file:
-                log_file.seek(out_log_read_index)
-                out_log_text = log_file.read()
-                out_log_read_index = log_file.tell()
-            
-            err_log_text = ''
-            with open(teku_stderr_log_path, 'r', encoding='utf8') as log_file:
-                log_file.seek(err_log_read_index)
-                err_log_text = log_file.read()
-                err_log_read_index = log_file.tell()
-            
-            out_log_length = len(out_log_text)
-            if out_log_length > 0:
-                log_text(out_log_text)
+                out_log_length = len(out_log_text)
+                if out_log_length > 0:
+                    log_text(out_log_text)
 
-            err_log_length = len(err_log_text)
-            if err_log_length > 0:
-                log_text(err_log_text)
+                err_log_length = len(err_log_text)
+                if err_log_length > 0:
+                    log_text(err_log_text)
+
+            while True:
+
+                if get_exited():
+                    return {
+                        'bn_is_working': bn_is_working,
+                        'bn_is_syncing': bn_is_syncing,
+                        'bn_head_slot': bn_head_slot,
+                        'bn_sync_distance': bn_sync_distance,
+                        'bn_connected_peers': bn_connected_peers
+                    }
+
+                # Output logs
+                output_logs()
 
-            time.sleep(1)
+                if not poller.wait(on_tick=output_logs):
+                    continue
             
-            teku_syncing_query = BN_SYNCING_EP
-            teku_query_url = local_teku_http_base + teku_syncing_query
-            headers = {
-                'accept': 'application/json'
-            }
-            try:
-                response = httpx.get(teku_query_url, headers=headers)
-            except httpx.RequestError as exception:
-                log_text(f'Exception: {exception} while querying Teku.')
-                continue
+                syncing_data = bn_events.get_syncing()
+                if syncing_data is not None:
+                    syncing_json = {'data': syncing_data}
+                else:
+                    # No recent head event, fallback on polling the syncing endpoint
+                    teku_syncing_query = BN_SYNCING_EP
+                    teku_query_url = local_teku_http_base + teku_syncing_query
+                    headers = {
+                        'accept': 'application/json'
+                    }
+                    try:
+                        response = httpx.get(teku_query_url, headers=headers)
+                    except httpx.RequestError as exception:
+                        log_text(f'Exception: {exception} while querying Teku.')
+                        continue
 
-            if response.status_code != 200:
-                log_text(f'Status code: {response.status_code} while querying Teku.')
-                continue
+                    if response.status_code != 200:
+                        log_text(f'Status code: {response.status_code} while querying Teku.')
+                        continue
         
-            response_json = response.json()
-            syncing_json = response_json
+                    response_json = response.json()
+                    syncing_json = response_json
 
-            teku_peers_query = BN_PEERS_EP
-            teku_query_url = local_teku_http_base + teku_peers_query
-            headers = {
-                'accept': 'application/json'
-            }
-            try:
-                response = httpx.get(teku_query_url, headers=headers)
-            except httpx.RequestError as exception:
-                log_text(f'Exception: {exception} while querying Teku.')
-                continue
+                teku_peers_query = BN_PEERS_EP
+                teku_query_url = local_teku_http_base + teku_peers_query
+                headers = {
+                    'accept': 'application/json'
+                }
+                try:
+                    response = httpx.get(teku_query_url, headers=headers)
+                except httpx.RequestError as exception:
+                    log_text(f'Exception: {exception} while querying Teku.')
+                    continue
 
-            if response.status_code != 200:
-                log_text(f'Status code: {response.status_code} while querying Teku.')
-                continue
+                if response.status_code != 200:
+                    log_text(f'Status code: {response.status_code} while querying Teku.')
+                    continue
 
-            response_json = response.json()
-            peers_json = response_json
+                response_json = response.json()
+                peers_json = response_json
 
-            if (
-                syncing_json and
-                'data' in syncing_json and
-                'is_syncing' in syncing_json['data']
-                ):
-                bn_is_syncing = bool(syncing_json['data']['is_syncing'])
-            else:
-                bn_is_syncing = False
+                if (
+                    syncing_json and
+                    'data' in syncing_json and
+                    'is_syncing' in syncing_json['data']
+                    ):
+                    bn_is_syncing = bool(syncing_json['data']['is_syncing'])
+                else:
+                    bn_is_syncing = False
             
-            if (
-                syncing_json and
-                'data' in syncing_json and
-                'head_slot' in syncing_json['data']
-                ):
-                bn_head_slot = syncing_json['data']['head_slot']
-            else:
-                bn_head_slot = UNKNOWN_VALUE
+                if (
+                    syncing_json and
+                    'data' in syncing_json and
+                    'head_slot' in syncing_json['data']
+                    ):
+                    bn_head_slot = syncing_json['data']['head_slot']
+                else:
+                    bn_head_slot = UNKNOWN_VALUE
 
-            if (
-                syncing_json and
-                'data' in syncing_json and
-                'sync_distance' in syncing_json['data']
-                ):
-                bn_sync_distance = syncing_json['data']['sync_distance']
-            else:
-                bn_sync_distance = UNKNOWN_VALUE
+                if (
+                    syncing_json and
+                    'data' in syncing_json and
+                    'sync_distance' in syncing_json['data']
+                    ):
+                    bn_sync_distance = syncing_json['data']['sync_distance']
+                else:
+                    bn_sync_distance = UNKNOWN_VALUE
 
-            bn_connected_peers = 0
-            if (
-                peers_json and
-                'data' in peers_json and
-                type(peers_json['data']) is list
-                ):
-                for peer in peers_json['data']:
-                    if 'state' not in peer:
-                        continue
-                    if peer['state'] == 'connected':
-                        bn_connected_peers = bn_connected_peers + 1
+                bn_connected_peers = 0
+                if (
+                    peers_json and
+                    'data' in peers_json and
+                    type(peers_json['data']) is list
+                    ):
+                    for peer in peers_json['data']:
+                        if 'state' not in peer:
+                            continue
+                        if peer['state'] == 'connected':
+                            bn_connected_peers = bn_connected_peers + 1
             
-            bn_has_few_peers = bn_connected_peers >= BN_MIN_FEW_PEERS
+                bn_has_few_peers = bn_connected_peers >= BN_MIN_FEW_PEERS
 
-            if bn_is_syncing or bn_has_few_peers:
-                set_percentage(100)
-            else:
-                set_percentage(10 + round(min(bn_connected_peers / BN_MIN_FEW_PEERS, 1.0) * 90.0))
+                if bn_is_syncing or bn_has_few_peers:
+                    set_percentage(100)
+                else:
+                    set_percentage(10 + round(min(bn_connected_peers / BN_MIN_FEW_PEERS, 1.0) * 90.0))
+
+                bn_sync_estimator.add_sample(bn_head_slot, bn_sync_distance)
 
-            change_status((
+                health_history.record({
+                    HEALTH_SERIES_CONSENSUS_PEERS: bn_connected_peers,
+                    HEALTH_SERIES_CONSENSUS_SYNC_DISTANCE: bn_sync_distance
+                })
+
+                poller.update(bn_connected_peers >= BN_MIN_FEW_PEERS / 2, bn_head_slot,
+                    bn_is_syncing)
+
+                bn_details_status = '\n'.join(filter(None, [
+                    bn_sync_estimator.format_status(),
+                    bn_metrics.format_status(bn_metrics.scrape())
+                ]))
+
+                change_status((
 f'''
 Syncing: {bn_is_syncing} (Head slot: {bn_head_slot}, Sync distance: {bn_sync_distance})
 Connected Peers: {bn_connected_peers}
+{bn_details_status}
 '''         ).strip())
 
-            if bn_is_syncing or bn_has_few_peers:
-                bn_is_working = True
-                return {
-                    'bn_is_working': bn_is_working,
-                    'bn_is_syncing': bn_is_syncing,
-                    'bn_head_slot': bn_head_slot,
-                    'bn_sync_distance': bn_sync_distance,
-                    'bn_connected_peers': bn_connected_peers
-                }
-            else:
-                set_result({
-                    'bn_is_working': bn_is_working,
-                    'bn_is_syncing': bn_is_syncing,
-                    'bn_head_slot': bn_head_slot,
-                    'bn_sync_distance': bn_sync_distance,
-                    'bn_connected_peers': bn_connected_peers
-                })
+                if bn_is_syncing or bn_has_few_peers:
+                    bn_is_working = True
+                    return {
+                        'bn_is_working': bn_is_working,
+                        'bn_is_syncing': bn_is_syncing,
+                        'bn_head_slot': bn_head_slot,
+                        'bn_sync_distance': bn_sync_distance,
+                        'bn_connected_peers': bn_connected_peers
+                    }
+                else:
+                    set_result({
+                        'bn_is_working': bn_is_working,
+                        'bn_is_syncing': bn_is_syncing,
+                        'bn_head_slot': bn_head_slot,
+                        'bn_sync_distance': bn_sync_distance,
+                        'bn_connected_peers': bn_connected_peers
+                    })
 
     result = progress_log_dialog(
         title='Verifying proper Teku service installation',
@@ -2724,10 +2751,14 @@ def obtain_keys(base_directory, network):
     generated_keys = search_for_generated_keys(keys_path)
 
     deposit_data_file = 'unknown'
+    deposit_data_paths = generated_keys['deposit_data_paths']
     if target_deposit_data_path.is_file():
         deposit_data_file = target_deposit_data_path
+        deposit_data_paths = [target_deposit_data_path]
     elif generated_keys['deposit_data_path'] is not None:
         deposit_data_file = generated_keys['deposit_data_path']
+
+    key_manifest = KeyManifest(generated_keys['keystore_paths'], deposit_data_paths, log)
     
     if (
         len(generated_keys['keystore_paths']) > 0 or
@@ -2740,7 +2771,7 @@ f'''
 It seems like validator keys have already been created. Here are some
 details found:
 
-Number of keystores: {len(generated_keys['keystore_paths'])}
+{key_manifest.format_summary()}
 Number of associated password files: {len(generated_keys['password_paths'])}
 Deposit data file: {deposit_data_file}
 Location: {keys_path}
@@ -3126,9 +3157,11 @@ Do you want to skip installing the eth2.0-deposit-cli binary?
     os.rename(actual_keys['deposit_data_path'], target_deposit_data_path)
 
     # Generate password files
-    keystore_password = input_dialog(
-        title='Enter your keystore password',
-        text=(
+    keystore_password_verified = False
+    while not keystore_password_verified:
+        keystore_password = input_dialog(
+            title='Enter your keystore password',
+            text=(
 f'''
 Please enter the password you used to create your keystore with the
 eth2.0-deposit-cli tool:
@@ -3138,11 +3171,45 @@ validator keys when starting. Permissions will be changed so that only
 the local system account can access the keys and the password file.
 
 * Press the tab key to switch between the controls below
-'''     ),
-        password=True).run()
+'''         ),
+            password=True).run()
 
-    if not keystore_password:
-        return False
+        if not keystore_password:
+            return False
+
+        failures = verify_keystores_password(actual_keys['keystore_paths'], keystore_password,
+            log)
+        if failures is None:
+            return False
+
+        if len(failures) > 0:
+            failures_text = '\n'.join(
+                f'{Path(keystore_path).name}: {error}' for keystore_path, error in failures[:5])
+            if len(failures) > 5:
+                failures_text = failures_text + f'\n... and {len(failures) - 5} more'
+
+            result = button_dialog(
+                title='Keystore password verification failed',
+                text=(
+f'''
+{len(failures)} keystore(s) could not be decrypted with the password you entered:
+
+{failures_text}
+
+Make sure to enter the password you used when creating your keystore(s).
+'''         ),
+                buttons=[
+                    ('Retry', True),
+                    ('Quit', False)
+                ]
+            ).run()
+
+            if not result:
+                return result
+
+            continue
+
+        keystore_password_verified = True
 
     with os.scandir(keys_path) as it:
         for entry in it:
@@ -3338,185 +3405,218 @@ To examine your teku service logs, inspect the following files:
 
             set_percentage(1)
 
-            out_log_read_index = 0
-            err_log_read_index = 0
+            bn_sync_estimator = SyncProgressEstimator('teku', 'slots', get_save_directory())
+            health_history = HealthHistory(get_save_directory())
+            poller = PollingScheduler(get_exited)
+            bn_metrics = MetricsScraper(TEKU_METRICS_URL, TEKU_METRICS_SERIES)
 
-            while True:
+            with LogTailer(teku_stdout_log_path) as out_log_tailer, \
+                    LogTailer(teku_stderr_log_path) as err_log_tailer, \
+                    BeaconEventsSubscriber(local_teku_http_base) as bn_events:
+                # Output logs, also called while waiting so that they are shown as they come
+                def output_logs():
+                    out_log_text = out_log_tailer.read()
 
-                if get_exited():
-                    return {
-                        'bn_is_fully_sync': bn_is_fully_sync,
-                        'bn_is_syncing': bn_is_syncing,
-                        'bn_head_slot': bn_head_slot,
-                        'bn_sync_distance': bn_sync_distance,
-                        'bn_connected_peers': bn_connected_peers
-                    }
+                    err_log_text = err_log_tailer.read()
 
-                # Output logs
-                out_log_text = ''
-                with open(teku_stdout_log_path, 'r', encoding='utf8') as log_file:
-                    log_file.seek(out_log_read_index)
-                    out_log_text = log_file.read()
-                    out_log_read_index = log_file.tell()
-                
-                err_log_text = ''
-                with open(teku_stderr_log_path, 'r', encoding='utf8') as log_file:
-                    log_file.seek(err_log_read_index)
-                    err_log_text = log_file.read()
-                    err_log_read_index = log_file.tell()
-                
-                out_log_length = len(out_log_text)
-                if out_log_length > 0:
-                    log_text(out_log_text)
+                    out_log_length = len(out_log_text)
+                    if out_log_length > 0:
+                        log_text(out_log_text)
 
-                err_log_length = len(err_log_text)
-                if err_log_length > 0:
-                    log_text(err_log_text)
+                    err_log_length = len(err_log_text)
+                    if err_log_length > 0:
+                        log_text(err_log_text)
+
+                while True:
+
+                    if get_exited():
+                        return {
+                            'bn_is_fully_sync': bn_is_fully_sync,
+                            'bn_is_syncing': bn_is_syncing,
+                            'bn_head_slot': bn_head_slot,
+                            'bn_sync_distance': bn_sync_distance,
+                            'bn_connected_peers': bn_connected_peers
+                        }
+
+                    # Output logs
+                    output_logs()
+
+                    if not poller.wait(on_tick=output_logs):
+                        continue
                 
-                teku_syncing_query = BN_SYNCING_EP
-                teku_query_url = local_teku_http_base + teku_syncing_query
-                headers = {
-                    'accept': 'application/json'
-                }
-                try:
-                    response = httpx.get(teku_query_url, headers=headers)
-                except httpx.RequestError as exception:
-                    log_text(f'Exception: {exception} while querying Teku.')
-                    continue
+                    syncing_data = bn_events.get_syncing()
+                    if syncing_data is not None:
+                        syncing_json = {'data': syncing_data}
+                    else:
+                        # No recent head event, fallback on polling the syncing endpoint
+                        teku_syncing_query = BN_SYNCING_EP
+                        teku_query_url = local_teku_http_base + teku_syncing_query
+                        headers = {
+                            'accept': 'application/json'
+                        }
+                        try:
+                            response = httpx.get(teku_query_url, headers=headers)
+                        except httpx.RequestError as exception:
+                            log_text(f'Exception: {exception} while querying Teku.')
+                            continue
 
-                if response.status_code != 200:
-                    log_text(f'Status code: {response.status_code} while querying Teku.')
-                    continue
+                        if response.status_code != 200:
+                            log_text(f'Status code: {response.status_code} while querying Teku.')
+                            continue
             
-                response_json = response.json()
-                syncing_json = response_json
+                        response_json = response.json()
+                        syncing_json = response_json
 
-                teku_peers_query = BN_PEERS_EP
-                teku_query_url = local_teku_http_base + teku_peers_query
-                headers = {
-                    'accept': 'application/json'
-                }
-                try:
-                    response = httpx.get(teku_query_url, headers=headers)
-                except httpx.RequestError as exception:
-                    log_text(f'Exception: {exception} while querying Teku.')
-                    continue
+                    teku_peers_query = BN_PEERS_EP
+                    teku_query_url = local_teku_http_base + teku_peers_query
+                    headers = {
+                        'accept': 'application/json'
+                    }
+                    try:
+                        response = httpx.get(teku_query_url, headers=headers)
+                    except httpx.RequestError as exception:
+                        log_text(f'Exception: {exception} while querying Teku.')
+                        continue
 
-                if response.status_code != 200:
-                    log_text(f'Status code: {response.status_code} while querying Teku.')
-                    continue
+                    if response.status_code != 200:
+                        log_text(f'Status code: {response.status_code} while querying Teku.')
+                        continue
 
-                response_json = response.json()
-                peers_json = response_json
+                    response_json = response.json()
+                    peers_json = response_json
 
-                if (
-                    syncing_json and
-                    'data' in syncing_json and
-                    'is_syncing' in syncing_json['data']
-                    ):
-                    bn_is_syncing = bool(syncing_json['data']['is_syncing'])
-                else:
-                    bn_is_syncing = False
+                    if (
+                        syncing_json and
+                        'data' in syncing_json and
+                        'is_syncing' in syncing_json['data']
+                        ):
+                        bn_is_syncing = bool(syncing_json['data']['is_syncing'])
+                    else:
+                        bn_is_syncing = False
                 
-                if (
-                    syncing_json and
-                    'data' in syncing_json and
-                    'head_slot' in syncing_json['data']
-                    ):
-                    bn_head_slot = int(syncing_json['data']['head_slot'])
-                else:
-                    bn_head_slot = UNKNOWN_VALUE
-
-                if (
-                    syncing_json and
-                    'data' in syncing_json and
-                    'sync_distance' in syncing_json['data']
-                    ):
-                    bn_sync_distance = int(syncing_json['data']['sync_distance'])
-                else:
-                    bn_sync_distance = UNKNOWN_VALUE
-
-                bn_connected_peers = 0
-                if (
-                    peers_json and
-                    'data' in peers_json and
-                    type(peers_json['data']) is list
-                    ):
-                    for peer in peers_json['data']:
-                        if 'state' not in peer:
-                            continue
-                        if peer['state'] == 'connected':
-                            bn_connected_peers = bn_connected_peers + 1
+                    if (
+                        syncing_json and
+                        'data' in syncing_json and
+                        'head_slot' in syncing_json['data']
+                        ):
+                        bn_head_slot = int(syncing_json['data']['head_slot'])
+                    else:
+                        bn_head_slot = UNKNOWN_VALUE
+
+                    if (
+                        syncing_json and
+                        'data' in syncing_json and
+                        'sync_distance' in syncing_json['data']
+                        ):
+                        bn_sync_distance = int(syncing_json['data']['sync_distance'])
+                    else:
+                        bn_sync_distance = UNKNOWN_VALUE
+
+                    bn_connected_peers = 0
+                    if (
+                        peers_json and
+                        'data' in peers_json and
+                        type(peers_json['data']) is list
+                        ):
+                        for peer in peers_json['data']:
+                            if 'state' not in peer:
+                                continue
+                            if peer['state'] == 'connected':
+                                bn_connected_peers = bn_connected_peers + 1
                 
-                bn_is_fully_sync = bn_sync_distance == 0
+                    bn_is_fully_sync = (
+                        type(bn_sync_distance) == int and
+                        bn_sync_distance <= BN_SYNCED_MAX_DISTANCE)
 
-                if bn_is_fully_sync:
-                    set_percentage(100)
-                else:
-                    if type(bn_sync_distance) == int and type(bn_head_slot) == int:
-                        max_head = bn_sync_distance + bn_head_slot
-                        set_percentage(round(bn_head_slot / max_head * 100.0))
+                    if bn_is_fully_sync:
+                        set_percentage(100)
                     else:
-                        set_percentage(1)
+                        if type(bn_sync_distance) == int and type(bn_head_slot) == int:
+                            max_head = bn_sync_distance + bn_head_slot
+                            set_percentage(round(bn_head_slot / max_head * 100.0))
+                        else:
+                            set_percentage(1)
 
-                change_status((
+                    bn_sync_estimator.add_sample(bn_head_slot, bn_sync_distance)
+
+                    health_history.record({
+                        HEALTH_SERIES_CONSENSUS_PEERS: bn_connected_peers,
+                        HEALTH_SERIES_CONSENSUS_SYNC_DISTANCE: bn_sync_distance
+                    })
+
+                    poller.update(
+                        type(bn_sync_distance) == int and bn_sync_distance <= 2 * SLOTS_PER_EPOCH,
+                        bn_head_slot, bn_is_syncing)
+
+                    bn_details_status = '\n'.join(filter(None, [
+                        bn_sync_estimator.format_status(),
+                        bn_metrics.format_status(bn_metrics.scrape())
+                    ]))
+
+                    change_status((
 f'''
 Syncing: {bn_is_syncing} (Head slot: {bn_head_slot}, Sync distance: {bn_sync_distance})
 Connected Peers: {bn_connected_peers}
+{bn_details_status}
 '''         ).strip())
 
-                if bn_is_fully_sync:
-                    return {
-                        'bn_is_fully_sync': bn_is_fully_sync,
-                        'bn_is_syncing': bn_is_syncing,
-                        'bn_head_slot': bn_head_slot,
-                        'bn_sync_distance': bn_sync_distance,
-                        'bn_connected_peers': bn_connected_peers
-                    }
-                else:
-                    set_result({
-                        'bn_is_fully_sync': bn_is_fully_sync,
-                        'bn_is_syncing': bn_is_syncing,
-                        'bn_head_slot': bn_head_slot,
-                        'bn_sync_distance': bn_sync_distance,
-                        'bn_connected_peers': bn_connected_peers
-                    })
-                
-                time.sleep(1)
+                    if bn_is_fully_sync:
+                        return {
+                            'bn_is_fully_sync': bn_is_fully_sync,
+                            'bn_is_syncing': bn_is_syncing,
+                            'bn_head_slot': bn_head_slot,
+                            'bn_sync_distance': bn_sync_distance,
+                            'bn_connected_peers': bn_connected_peers
+                        }
+                    else:
+                        set_result({
+                            'bn_is_fully_sync': bn_is_fully_sync,
+                            'bn_is_syncing': bn_is_syncing,
+                            'bn_head_slot': bn_head_slot,
+                            'bn_sync_distance': bn_sync_distance,
+                            'bn_connected_peers': bn_connected_peers
+                        })
 
         unknown_joining_queue = 'no join queue information found'
 
         network_queue_info = unknown_joining_queue
 
-        headers = {
-            'accept': 'application/json'
-        }
+        # Use the local beacon node for the join queue when it is synced
+        validators_entering = get_bn_activation_queue(local_teku_http_base, log)
 
-        beaconcha_in_queue_query_url = (
-            BEACONCHA_IN_URLS[network] + BEACONCHA_VALIDATOR_QUEUE_API_URL)
-        try:
-            response = httpx.get(beaconcha_in_queue_query_url, headers=headers,
-                follow_redirects=True)
+        if validators_entering is None:
+            headers = {
+                'accept': 'application/json'
+            }
 
-            if response.status_code != 200:
-                log.error(f'Status code: {response.status_code} while querying beaconcha.in.')
-            else:
-                response_json = response.json()
-                if (
-                    response_json and
-                    'data' in response_json and
-                    'beaconchain_entering' in response_json['data']):
+            beaconcha_in_queue_query_url = (
+                BEACONCHA_IN_URLS[network] + BEACONCHA_VALIDATOR_QUEUE_API_URL)
+            try:
+                response = httpx.get(beaconcha_in_queue_query_url, headers=headers,
+                    follow_redirects=True)
+
+                if response.status_code != 200:
+                    log.error(f'Status code: {response.status_code} while querying '
+                        f'beaconcha.in.')
+                else:
+                    response_json = response.json()
+                    if (
+                        response_json and
+                        'data' in response_json and
+                        'beaconchain_entering' in response_json['data']):
 
-                    validators_entering = int(response_json['data']['beaconchain_entering'])
-                    waiting_td = timedelta(days=validators_entering / 900.0)
+                        validators_entering = int(response_json['data']['beaconchain_entering'])
 
-                    network_queue_info = (
-                        f'{validators_entering} validators waiting to join '
-                        f'[{humanize.naturaldelta(waiting_td)}]'
-                    )
+            except httpx.RequestError as exception:
+                log.error(f'Exception: {exception} while querying beaconcha.in.')
 
-        except httpx.RequestError as exception:
-            log.error(f'Exception: {exception} while querying beaconcha.in.')
+        if validators_entering is not None:
+            waiting_td = timedelta(days=validators_entering / 900.0)
+
+            network_queue_info = (
+                f'{validators_entering} validators waiting to join '
+                f'[{humanize.naturaldelta(waiting_td)}]'
+            )
 
         result = progress_log_dialog(
             title='Verifying Teku syncing status',
@@ -3599,6 +3699,39 @@ Connected Peers: {syncing_status['bn_connected_peers']}
             f'was an issue somewhere during the installation.')
         return False
 
+    # Validate the deposit data against our keys and the selected network
+    expected_public_keys = set(KeyManifest(keys['keystore_paths'], [], log).keystores)
+    if len(expected_public_keys) == 0:
+        expected_public_keys = None
+
+    deposit_issues = validate_deposit_data(deposit_file_path, network, expected_public_keys, log)
+    if deposit_issues is None:
+        return False
+
+    if len(deposit_issues) > 0:
+        deposit_issues_text = '\n'.join(deposit_issues[:5])
+        if len(deposit_issues) > 5:
+            deposit_issues_text = (deposit_issues_text +
+                f'\n... and {len(deposit_issues) - 5} more')
+
+        result = button_dialog(
+            title='Invalid deposit data',
+            text=(
+f'''
+We found {len(deposit_issues)} issue(s) in your deposit data file:
+
+{deposit_issues_text}
+
+Doing a deposit with this file could lose your funds. We cannot continue
+here. Make sure to check your deposit data file and your keys.
+'''         ),
+            buttons=[
+                ('Quit', False)
+            ]
+        ).run()
+
+        return False
+
     # TODO: Create an alternative way to easily obtain the deposit file with a simple HTTP server
 
     result = button_dialog(
@@ -3629,26 +3762,20 @@ When you are done with the deposit(s), click the "I'm done" button below.
     if not result:
         return result
 
-    public_keys = []
+    key_manifest = KeyManifest([], [deposit_file_path], log)
+    key_manifest.log_issues(log)
+    public_keys = key_manifest.deposit_public_keys
 
-    with open(deposit_file_path, 'r', encoding='utf8') as deposit_data_file:
-        deposit_data = json.loads(deposit_data_file.read(204800))
-        
-        for validator_data in deposit_data:
-            if 'pubkey' not in validator_data:
-                continue
-            public_key = validator_data['pubkey']
-            public_keys.append('0x' + public_key)
-    
     if len(public_keys) == 0:
         log.error('No public key(s) found in the deposit file.')
         return False
 
-    # Verify that the deposit was done correctly using beaconcha.in API
-    validator_deposits = get_bc_validator_deposits(network, public_keys, log)
+    # Verify that the deposit was done correctly using the local beacon node and beaconcha.in
+    # API for the validators it does not know yet
+    validator_deposits = get_validator_deposits(network, local_teku_http_base, public_keys, log)
 
     if type(validator_deposits) is not list and not validator_deposits:
-        log.error('Unable to get validator(s) deposits from beaconcha.in')
+        log.error('Unable to get validator(s) deposits')
         return False
 
     while len(validator_deposits) == 0:
@@ -3683,10 +3810,11 @@ deposit(s).
         if not result:
             return result
 
-        validator_deposits = get_bc_validator_deposits(network, public_keys, log)
+        validator_deposits = get_validator_deposits(network, local_teku_http_base, public_keys,
+            log)
 
         if type(validator_deposits) is not list and not validator_deposits:
-            log.error('Unable to get validator(s) deposits from beaconcha.in')
+            log.error('Unable to get validator(s) deposits')
             return False
     
     # Check if all the deposit(s) were done for each validator
@@ -3721,10 +3849,11 @@ deposit(s).
         if not result:
             return result
 
-        validator_deposits = get_bc_validator_deposits(network, public_keys, log)
+        validator_deposits = get_validator_deposits(network, local_teku_http_base, public_keys,
+            log)
 
         if type(validator_deposits) is not list and not validator_deposits:
-            log.error('Unable to get validator(s) deposits from beaconcha.in')
+            log.error('Unable to get validator(s) deposits')
             return False
 
     # Clean up deposit data file
@@ -4279,19 +4408,15 @@ To examine your prometheus service logs, inspect the following file:
         return False
 
     # Iterate over the logs and output them for around 10 seconds
-    err_log_read_index = 0
-    for i in range(2):
-        err_log_text = ''
-        with open(prometheus_stderr_log_path, 'r', encoding='utf8') as log_file:
-            log_file.seek(err_log_read_index)
-            err_log_text = log_file.read()
-            err_log_read_index = log_file.tell()
-
-        err_log_length = len(err_log_text)
-        if err_log_length > 0:
-            print(err_log_text, end='')
+    with LogTailer(prometheus_stderr_log_path) as err_log_tailer:
+        for i in range(2):
+            err_log_text = err_log_tailer.read()
 
-        time.sleep(5)
+            err_log_length = len(err_log_text)
+            if err_log_length > 0:
+                print(err_log_text, end='')
+
+            time.sleep(5)
 
     # Do a simple query on Prometheus to see if it's working properly
     local_prometheus_query_url = 'http://localhost:9090/api/v1/query'
@@ -5488,19 +5613,15 @@ To examine your grafana service logs, inspect the following file:
         return False
 
     # Iterate over the logs and output them for around 10 seconds
-    err_log_read_index = 0
-    for i in range(2):
-        err_log_text = ''
-        with open(grafana_stdout_log_path, 'r', encoding='utf8') as log_file:
-            log_file.seek(err_log_read_index)
-            err_log_text = log_file.read()
-            err_log_read_index = log_file.tell()
-
-        err_log_length = len(err_log_text)
-        if err_log_length > 0:
-            print(err_log_text, end='')
+    with LogTailer(grafana_stdout_log_path) as err_log_tailer:
+        for i in range(2):
+            err_log_text = err_log_tailer.read()
 
-        time.sleep(5)
+            err_log_length = len(err_log_text)
+            if err_log_length > 0:
+                print(err_log_text, end='')
+
+            time.sleep(5)
 
     # Test if Grafana is working properly
     local_grafana_url = 'http://localhost:3000/login'
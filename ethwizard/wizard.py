@@ -1,4 +1,5 @@
 import sys
+import argparse
 
 from ethwizard import __version__
 
@@ -13,7 +14,8 @@ from ethwizard.platforms import (
     quit_app,
     get_save_state,
     get_load_state,
-    enter_maintenance
+    enter_maintenance,
+    run_monitor
 )
 
 from ethwizard.platforms.common import StepSequence, is_completed_state
@@ -21,8 +23,14 @@ from ethwizard.platforms.common import StepSequence, is_completed_state
 def run():
     # Main entry point for the wizard.
 
+    arguments = parse_arguments()
+
     platform = supported_platform()
 
+    if arguments.monitor:
+        # Run the background maintenance monitor without any interaction
+        run_monitor_mode(platform)
+
     if not platform:
         # This is not a supported platform
         show_unsupported_platform()
@@ -90,6 +98,44 @@ def run():
     sequence.run_from_start()
     quit_app(platform)
 
+def parse_arguments():
+    # Parse the command line arguments
+
+    parser = argparse.ArgumentParser(prog='eth-wizard',
+        description='Setup assistant to become a validator on the Ethereum network.')
+    parser.add_argument('--version', action='version', version=f'%(prog)s {__version__}')
+    parser.add_argument('--monitor', action='store_true',
+        help=('run the maintenance checks once without any interaction and save a status '
+            'snapshot (used by the background maintenance monitor)'))
+
+    return parser.parse_args()
+
+def run_monitor_mode(platform):
+    # Run the maintenance checks once for a completed installation and exit with a status code
+
+    if not platform:
+        print('eth-wizard has no support for your platform.', file=sys.stderr)
+        sys.exit(1)
+
+    init_logging(platform)
+
+    if not has_su_perm(platform):
+        sys.exit(1)
+
+    saved_state = get_load_state(platform)()
+    if (
+        saved_state is None or
+        'context' not in saved_state or
+        not is_completed_state(saved_state)
+        ):
+        print('No completed installation found. Nothing to monitor.', file=sys.stderr)
+        sys.exit(1)
+
+    if not run_monitor(platform, saved_state['context']):
+        sys.exit(1)
+
+    sys.exit(0)
+
 def show_welcome():
     # Show a welcome message about this wizard
 